@@ -0,0 +1,691 @@
+#!/usr/bin/env python3
+"""Compression engine micro-benchmarks.
+
+Runs the individual CWAMInspiredCompressor stages on synthetic frames and
+prints timing tables, so performance work can be compared before/after.
+
+Usage:
+    python scripts/benchmark_compression.py saliency --width 1920 --height 1080
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import logging
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from flashrecord.capture_backends import create_capture_backend  # noqa: E402
+from flashrecord.capture_region import resolve_region  # noqa: E402
+from flashrecord.capture_sources import SyntheticBackend  # noqa: E402
+from flashrecord.compression import (  # noqa: E402
+    CWAMInspiredCompressor,
+    InverseColormap,
+    SaliencyTables,
+)
+from flashrecord.frame_store import FrameRing  # noqa: E402
+from flashrecord.live_encoder import LiveEncoder  # noqa: E402
+from flashrecord.output_backends import (  # noqa: E402
+    GifBackend,
+    available_backends,
+    get_backend,
+)
+from flashrecord.screen_recorder import ScreenRecorder  # noqa: E402
+
+
+def synthetic_gray(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Screen-like grayscale frame: flat panels, text-like noise rows, gradients."""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width), 235.0, dtype=np.float32)
+    img[:, : width // 4] = 40.0  # dark sidebar
+    rows = rng.integers(0, 256, (height // 2, width // 2)).astype(np.float32)
+    img[height // 4 : height // 4 + rows.shape[0], width // 3 : width // 3 + rows.shape[1]] = rows
+    img[-height // 8 :, :] = np.linspace(0, 255, width, dtype=np.float32)
+    return img
+
+
+def synthetic_frames(n: int, width: int, height: int) -> list[Image.Image]:
+    """RGB screen-like frames with a moving noisy window."""
+    base = synthetic_gray(width, height).astype(np.uint8)
+    frames = []
+    for i in range(n):
+        gray = np.roll(base, shift=(i * 7) % width, axis=1)
+        frames.append(Image.fromarray(np.stack([gray, gray, 255 - gray], axis=-1)))
+    return frames
+
+
+def screen_recording_frames(n: int, width: int, height: int) -> list[Image.Image]:
+    """Mostly static desktop: gradient wallpaper, a window, and a small moving region."""
+    rng = np.random.default_rng(0)
+    base = np.zeros((height, width, 3), dtype=np.uint8)
+    base[..., 0] = np.linspace(30, 200, width, dtype=np.uint8)[None, :]
+    base[..., 1] = np.linspace(60, 160, height, dtype=np.uint8)[:, None]
+    base[..., 2] = 120
+    win_h, win_w = height // 2, width // 2
+    base[height // 4 : height // 4 + win_h, width // 4 : width // 4 + win_w] = 245
+    text = rng.integers(0, 2, (win_h // 4, win_w // 2)).astype(np.uint8) * 200
+    base[height // 4 + 8 : height // 4 + 8 + text.shape[0], width // 4 + 8 :][
+        :, : text.shape[1]
+    ] = text[..., None]
+
+    box = max(8, min(width, height) // 8)
+    frames = []
+    for i in range(n):
+        arr = base.copy()
+        x = (i * 5) % max(1, width - box)
+        arr[height - box - 4 : height - 4, x : x + box] = (220, 40, 40)
+        frames.append(Image.fromarray(arr))
+    return frames
+
+
+def mixed_content_frames(n: int, width: int, height: int, scene_len: int) -> list[Image.Image]:
+    """Recording that switches between a dark terminal, a bright browser and a photo."""
+    rng = np.random.default_rng(0)
+    terminal = np.full((height, width, 3), (18, 20, 24), dtype=np.uint8)
+    glyphs = rng.integers(0, 2, (height // 2, width // 2)).astype(bool)
+    terminal[: glyphs.shape[0], : glyphs.shape[1]][glyphs] = (90, 220, 110)
+
+    browser = np.full((height, width, 3), 250, dtype=np.uint8)
+    browser[: height // 10] = (60, 110, 200)
+    for k in range(6):
+        y = height // 6 + k * height // 9
+        browser[y : y + height // 24, width // 8 : width // 8 + width // 2] = rng.integers(
+            0, 120, 3
+        )
+
+    yy, xx = np.mgrid[0:height, 0:width]
+    photo = np.stack(
+        [
+            128 + 120 * np.sin(xx / 37.0),
+            128 + 120 * np.sin(yy / 23.0 + xx / 91.0),
+            128 + 120 * np.cos((xx + yy) / 53.0),
+        ],
+        axis=-1,
+    ).astype(np.uint8)
+
+    scenes = [terminal, browser, photo]
+    box = max(8, min(width, height) // 10)
+    frames = []
+    for i in range(n):
+        arr = scenes[(i // scene_len) % len(scenes)].copy()
+        x = (i * 7) % max(1, width - box)
+        arr[height - box - 4 : height - 4, x : x + box] = (230, 200, 40)
+        frames.append(Image.fromarray(arr))
+    return frames
+
+
+def gif_backend(delta: bool = True, workers: int = 1) -> GifBackend:
+    """The registered GIF backend, configured as compress_to_target configures it."""
+    backend = copy.copy(get_backend("gif"))
+    backend.delta = delta
+    backend.workers = workers
+    return backend
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Best wall time of `repeat` runs in seconds."""
+    times: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def loop_saliency(img: np.ndarray, tile_size: int) -> np.ndarray:
+    """Per-tile Python loop saliency: the pre-vectorization baseline."""
+    h, w = img.shape
+    saliency = np.zeros((max(1, h // tile_size), max(1, w // tile_size)), dtype=np.float32)
+    edges = np.array(
+        Image.fromarray(img.astype(np.uint8)).filter(ImageFilter.FIND_EDGES), dtype=np.float32
+    )
+    for ty in range(saliency.shape[0]):
+        for tx in range(saliency.shape[1]):
+            y, x = ty * tile_size, tx * tile_size
+            tile = img[y : y + tile_size, x : x + tile_size]
+            if tile.size < tile_size * tile_size // 4:
+                continue
+            hist, _ = np.histogram(tile, bins=32, range=(0, 255))
+            p = hist / (hist.sum() + 1e-12)
+            entropy = float(-(p * np.log2(p + 1e-12)).sum())
+            edge_density = float(np.mean(edges[y : y + tile_size, x : x + tile_size]))
+            saliency[ty, tx] = 0.5 * float(np.var(tile)) + 0.3 * edge_density + 0.2 * entropy
+    if saliency.max() > 0:
+        saliency = saliency / saliency.max()
+    return saliency
+
+
+def bench_saliency(args: argparse.Namespace) -> int:
+    img = synthetic_gray(args.width, args.height).astype(np.uint8)
+
+    print(f"[*] Single-scale saliency on {args.width}x{args.height} (best of {args.repeat})")
+    tables = SaliencyTables(img)
+    build_s = best_of(lambda: SaliencyTables(img), args.repeat)
+    print(f"[*] Summed-area table build (fine + coarse levels): {build_s * 1000:.1f} ms")
+    print(f"{'tile':>6} {'loop ms':>10} {'table ms':>10} {'speedup':>8} {'max diff':>10}")
+    for tile in args.tiles:
+        ref = loop_saliency(img, tile)
+        table = tables.saliency(tile_size=tile)
+        loop_s = best_of(lambda t=tile: loop_saliency(img, t), args.repeat)
+        table_s = best_of(lambda t=tile: tables.saliency(tile_size=t), args.repeat)
+        print(
+            f"{tile:>6} {loop_s * 1000:>10.1f} {table_s * 1000:>10.1f} "
+            f"{loop_s / table_s:>7.1f}x {float(np.abs(ref - table).max()):>10.2e}"
+        )
+    return 0
+
+
+def bench_saliency_pool(args: argparse.Namespace) -> int:
+    frames = synthetic_frames(args.frames, args.width, args.height)
+
+    print(f"[*] CW saliency maps: {args.frames} frames at {args.width}x{args.height}")
+    print(f"{'workers':>8} {'seconds':>10} {'fps':>8} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        compressor = CWAMInspiredCompressor(workers=workers)
+        elapsed = best_of(lambda c=compressor: c._compute_cw_saliency_maps(frames), args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>8} {elapsed:>10.2f} {args.frames / elapsed:>8.1f} "
+            f"{baseline / elapsed:>7.1f}x"
+        )
+    return 0
+
+
+def bench_palette_threads(args: argparse.Namespace) -> int:
+    frames = synthetic_frames(args.frames, args.width, args.height)
+    compressor = CWAMInspiredCompressor()
+    pal = compressor._build_global_palette(frames[:: max(1, len(frames) // 16)], colors=256)
+
+    print(f"[*] Global palette application: {args.frames} frames at {args.width}x{args.height}")
+    print(f"{'threads':>8} {'seconds':>10} {'fps':>8} {'speedup':>8}")
+    baseline = None
+    for threads in args.threads:
+        compressor.threads = threads
+        elapsed = best_of(
+            lambda: compressor._apply_global_palette(frames, pal, dither=True), args.repeat
+        )
+        baseline = baseline or elapsed
+        print(
+            f"{threads:>8} {elapsed:>10.2f} {args.frames / elapsed:>8.1f} "
+            f"{baseline / elapsed:>7.1f}x"
+        )
+    return 0
+
+
+def bench_palette_build(args: argparse.Namespace) -> int:
+    compressor = CWAMInspiredCompressor()
+    all_frames = synthetic_frames(max(args.frames), args.width, args.height)
+
+    print(f"[*] Global palette build at {args.width}x{args.height}, {args.colors} colors")
+    print(f"{'frames':>8} {'ms':>10}")
+    for n in args.frames:
+        frames = all_frames[:n]
+        elapsed = best_of(
+            lambda f=frames: compressor._build_global_palette(f, colors=args.colors), args.repeat
+        )
+        print(f"{n:>8} {elapsed * 1000:>10.1f}")
+    return 0
+
+
+def bench_palette_map(args: argparse.Namespace) -> int:
+    frames = synthetic_frames(args.frames, args.width, args.height)
+    compressor = CWAMInspiredCompressor()
+    pal = compressor._build_global_palette(frames, colors=256)
+    arrays = [np.asarray(f) for f in frames]
+
+    build_s = best_of(lambda: InverseColormap(pal), args.repeat)
+    lut = InverseColormap(pal)
+    palette_img = Image.new("P", (1, 1))
+    palette_img.putpalette(pal)
+
+    cases = [
+        ("pillow fs", lambda: [f.quantize(palette=palette_img, dither=1) for f in frames]),
+        ("pillow none", lambda: [f.quantize(palette=palette_img, dither=0) for f in frames]),
+        ("lut none", lambda: [lut.map(a) for a in arrays]),
+        ("lut ordered", lambda: [lut.map_ordered(a) for a in arrays]),
+    ]
+
+    print(f"[*] Palette mapping: {args.frames} frames at {args.width}x{args.height}")
+    print(f"[*] InverseColormap build (64^3): {build_s * 1000:.1f} ms")
+    print(f"{'path':>12} {'ms/frame':>10}")
+    for name, fn in cases:
+        elapsed = best_of(fn, args.repeat)
+        print(f"{name:>12} {elapsed * 1000 / args.frames:>10.2f}")
+    return 0
+
+
+def bench_dither(args: argparse.Namespace) -> int:
+    frames = screen_recording_frames(args.frames, args.width, args.height)
+    compressor = CWAMInspiredCompressor()
+    pal = compressor._build_global_palette(frames, colors=args.colors)
+    durations = [100] * len(frames)
+
+    print(f"[*] Dither modes: {args.frames} frames at {args.width}x{args.height}")
+    print(f"{'mode':>16} {'quantize ms':>12} {'encode ms':>10} {'size KB':>10}")
+    for mode in args.modes:
+        compressor._lut_cache.clear()  # Include the lookup table build in the timing
+        start = time.perf_counter()
+        qframes = compressor._apply_global_palette(frames, pal, dither=mode)
+        quantize_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = gif_backend().encode(qframes, durations)
+        encode_s = time.perf_counter() - start
+
+        print(
+            f"{mode:>16} {quantize_s * 1000:>12.1f} {encode_s * 1000:>10.1f} "
+            f"{len(data) / 1024:>10.1f}"
+        )
+    return 0
+
+
+def bench_gif_delta(args: argparse.Namespace) -> int:
+    frames = screen_recording_frames(args.frames, args.width, args.height)
+    compressor = CWAMInspiredCompressor()
+    pal = compressor._build_global_palette(frames, colors=256)
+    qframes = compressor._apply_global_palette(frames, pal, dither="ordered")
+    durations = [100] * len(qframes)
+
+    print(f"[*] GIF encoding: {args.frames} frames at {args.width}x{args.height}")
+    print(f"{'mode':>8} {'encode ms':>10} {'size KB':>10}")
+    for name, delta in (("full", False), ("delta", True)):
+        backend = gif_backend(delta=delta)
+        data = backend.encode(qframes, durations)
+        elapsed = best_of(lambda b=backend: b.encode(qframes, durations), args.repeat)
+        print(f"{name:>8} {elapsed * 1000:>10.1f} {len(data) / 1024:>10.1f}")
+    return 0
+
+
+def bench_gif_encode(args: argparse.Namespace) -> int:
+    frames = synthetic_frames(args.frames, args.width, args.height)
+    compressor = CWAMInspiredCompressor()
+    pal = compressor._build_global_palette(frames, colors=256)
+    qframes = compressor._apply_global_palette(frames, pal, dither="ordered")
+    durations = [100] * len(qframes)
+
+    print(f"[*] Parallel LZW encoding: {args.frames} frames at {args.width}x{args.height}")
+    print(f"{'workers':>8} {'encode ms':>10} {'size KB':>10} {'speedup':>8}")
+    baseline = None
+    expected = None
+    for workers in args.workers:
+        backend = gif_backend(workers=workers)
+        data = backend.encode(qframes, durations)
+        expected = expected or data
+        if data != expected:
+            print(f"[!] workers={workers} produced different bytes")
+            return 1
+        elapsed = best_of(lambda b=backend: b.encode(qframes, durations), args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>8} {elapsed * 1000:>10.1f} {len(data) / 1024:>10.1f} "
+            f"{baseline / elapsed:>7.1f}x"
+        )
+    return 0
+
+
+def bench_target(args: argparse.Namespace) -> int:
+    frames = screen_recording_frames(args.frames, args.width, args.height)
+
+    print(f"[*] compress_to_target: {args.frames} frames at {args.width}x{args.height}")
+    print(
+        f"{'target MB':>10} {'seconds':>8} {'iters':>6} {'encodes':>8} "
+        f"{'predicted MB':>13} {'actual MB':>10}"
+    )
+    for target in args.targets:
+        compressor = CWAMInspiredCompressor(quality="high")
+        start = time.perf_counter()
+        _, meta = compressor.compress_to_target(frames, target_mb=target, dither=args.dither)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{target:>10.2f} {elapsed:>8.2f} {meta['iteration']:>6} {meta['full_encodes']:>8} "
+            f"{meta['predicted_mb']:>13.3f} {meta['size_mb']:>10.3f}"
+        )
+    return 0
+
+
+def bench_scenes(args: argparse.Namespace) -> int:
+    frames = mixed_content_frames(args.frames, args.width, args.height, args.scene_len)
+
+    print(
+        f"[*] Scene palettes: {args.frames} frames at {args.width}x{args.height}, "
+        f"scene every {args.scene_len} frames"
+    )
+    print(
+        f"{'palette':>8} {'seconds':>8} {'size KB':>10} {'scenes':>7} {'palettes':>9} "
+        f"{'colors':>7} {'scale':>6} {'mean err':>9}"
+    )
+    for scenes in (False, True):
+        compressor = CWAMInspiredCompressor(quality="high")
+        start = time.perf_counter()
+        data, meta = compressor.compress_to_target(
+            frames,
+            target_mb=args.target,
+            init_colors=args.colors,
+            dither=args.dither,
+            selection=args.selection,
+            scenes=scenes,
+        )
+        elapsed = time.perf_counter() - start
+
+        # Mean absolute RGB error of the last frame against the input at output size
+        with Image.open(BytesIO(data)) as im:
+            im.seek(im.n_frames - 1)
+            got = np.asarray(im.convert("RGB"), dtype=np.int16)
+        want = np.asarray(frames[-1].resize((got.shape[1], got.shape[0])), dtype=np.int16)
+        error = float(np.abs(got - want).mean())
+
+        print(
+            f"{'scene' if scenes else 'global':>8} {elapsed:>8.2f} {len(data) / 1024:>10.1f} "
+            f"{meta['scenes']:>7} {meta['palettes']:>9} {meta['colors']:>7} "
+            f"{meta['scale_factor']:>6.3f} {error:>9.2f}"
+        )
+    return 0
+
+
+def bench_backends(args: argparse.Namespace) -> int:
+    frames = screen_recording_frames(args.frames, args.width, args.height)
+    durations = [100] * len(frames)
+    compressor = CWAMInspiredCompressor()
+
+    print(f"[*] Output backends: {args.frames} frames at {args.width}x{args.height}")
+    print(f"{'format':>14} {'quantize ms':>12} {'encode ms':>10} {'size KB':>10}")
+    for name in args.formats:
+        backend = get_backend(name)
+        if not backend.available():
+            print(f"{name:>14} {'unavailable':>12}")
+            continue
+
+        start = time.perf_counter()
+        images = frames
+        if backend.palette:
+            pal = compressor._build_global_palette(frames, colors=256)
+            images = compressor._apply_global_palette(frames, pal, dither=args.dither)
+        quantize_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = backend.encode(images, durations)
+        encode_s = time.perf_counter() - start
+        print(
+            f"{name:>14} {quantize_s * 1000:>12.1f} {encode_s * 1000:>10.1f} "
+            f"{len(data) / 1024:>10.1f}"
+        )
+
+    if args.target:
+        print(f"[*] compress_to_target({args.target} MB) per format")
+        print(
+            f"{'format':>14} {'seconds':>8} {'iters':>6} {'size MB':>8} {'quality':>8} "
+            f"{'scale':>6}"
+        )
+        for name in args.formats:
+            if name not in available_backends():
+                continue
+            compressor = CWAMInspiredCompressor(quality="high")
+            start = time.perf_counter()
+            _, meta = compressor.compress_to_target(
+                frames, target_mb=args.target, dither=args.dither, format=name
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>14} {elapsed:>8.2f} {meta['iteration']:>6} {meta['size_mb']:>8.3f} "
+                f"{str(meta['quality']):>8} {meta['scale_factor']:>6.3f}"
+            )
+    return 0
+
+
+def bench_live(args: argparse.Namespace) -> int:
+    frames = screen_recording_frames(args.frames, args.width, args.height)
+    interval = 1.0 / args.fps
+
+    print(
+        f"[*] Stop-to-bytes latency: {args.frames} frames at {args.width}x{args.height}, "
+        f"captured at {args.fps} fps"
+    )
+    print(
+        f"{'mode':>6} {'capture s':>10} {'stop->bytes ms':>15} {'frames out':>11} {'size KB':>10}"
+    )
+
+    # Batch: capture paced frames into a list, compress everything after stop
+    start = time.perf_counter()
+    captured = []
+    for f in frames:
+        captured.append(f)
+        time.sleep(interval)
+    capture_s = time.perf_counter() - start
+    compressor = CWAMInspiredCompressor()
+    stop = time.perf_counter()
+    data, meta = compressor.compress_to_target(
+        captured, target_mb=10, input_fps=args.fps, dither=args.dither
+    )
+    latency_ms = (time.perf_counter() - stop) * 1000
+    print(
+        f"{'batch':>6} {capture_s:>10.2f} {latency_ms:>15.1f} {meta['frames_out']:>11} "
+        f"{len(data) / 1024:>10.1f}"
+    )
+
+    # Live: the same pacing, frames compressed as they arrive
+    encoder = LiveEncoder(
+        CWAMInspiredCompressor(), input_fps=args.fps, dither=args.dither, workers=args.workers
+    ).start()
+    start = time.perf_counter()
+    for f in frames:
+        tick = time.perf_counter()
+        encoder.submit(f)
+        time.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+    capture_s = time.perf_counter() - start
+    stop = time.perf_counter()
+    data, meta = encoder.finish()
+    latency_ms = (time.perf_counter() - stop) * 1000
+    print(
+        f"{'live':>6} {capture_s:>10.2f} {latency_ms:>15.1f} {meta['frames_out']:>11} "
+        f"{len(data) / 1024:>10.1f}"
+    )
+    return 0
+
+
+def bench_capture(args: argparse.Namespace) -> int:
+    region = f", region {args.region}" if args.region else ""
+    print(f"[*] Capture backends: {args.grabs} grabs each, pushed into a frame ring{region}")
+    print(f"{'backend':>17} {'size':>11} {'grab ms':>8} {'push ms':>8} {'max fps':>8}")
+    for name in args.backends:
+        backend = create_capture_backend(name)
+        if not backend.available():
+            print(f"{name:>17} {'unavailable':>11}")
+            continue
+        if args.region:
+            backend.set_bbox(resolve_region(args.region))
+        ring = FrameRing(capacity=4)
+        grab_s = push_s = 0.0
+        with backend:
+            for _ in range(args.grabs):
+                start = time.perf_counter()
+                frame = backend.grab()
+                grab_s += time.perf_counter() - start
+                start = time.perf_counter()
+                ring.push(frame)
+                push_s += time.perf_counter() - start
+        width, height = ring.size
+        per_frame = (grab_s + push_s) / args.grabs
+        print(
+            f"{name:>17} {f'{width}x{height}':>11} {grab_s / args.grabs * 1000:>8.1f} "
+            f"{push_s / args.grabs * 1000:>8.1f} {1.0 / per_frame:>8.1f}"
+        )
+    return 0
+
+
+def bench_pipeline(args: argparse.Namespace) -> int:
+    print(
+        f"[*] Headless capture -> compress -> write: {args.seconds}s at {args.fps} fps, "
+        f"source {args.source} ({args.width}x{args.height} for synthetic), "
+        f"region {args.region or 'full'}"
+    )
+    print(
+        f"{'mode':>6} {'frames':>7} {'fps':>6} {'p95 ms':>7} {'dropped':>8} "
+        f"{'save ms':>8} {'size KB':>8}"
+    )
+    for live in (False, True):
+        if args.source == "synthetic":
+            source = SyntheticBackend(size=(args.width, args.height), latency_ms=args.latency)
+        else:
+            source = create_capture_backend(args.source)
+        recorder = ScreenRecorder(
+            fps=args.fps, live=live, capture_backend=source, region=args.region
+        )
+        recorder.start_recording(duration=args.seconds)
+        recorder._capture_thread.join()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            if not recorder.save_gif(str(Path(tmp) / "bench.gif")):
+                return 1
+        stats = recorder.get_stats()
+        saved = stats["last_save"]
+        print(
+            f"{'live' if live else 'batch':>6} {saved['frames_in']:>7} "
+            f"{stats['achieved_fps']:>6.1f} {stats['jitter_ms']['p95']:>7.1f} "
+            f"{stats['dropped_slots']:>8} {saved['timings_ms']['total']:>8.1f} "
+            f"{saved['size_bytes'] / 1024:>8.1f}"
+        )
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark FlashRecord compression stages.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    saliency = sub.add_parser("saliency", help="Per-tile loop vs summed-area table saliency")
+    saliency.add_argument("--width", type=int, default=1920)
+    saliency.add_argument("--height", type=int, default=1080)
+    saliency.add_argument("--tiles", type=int, nargs="+", default=[8, 16, 32])
+    saliency.add_argument("--repeat", type=int, default=3)
+    saliency.set_defaults(func=bench_saliency)
+
+    pool = sub.add_parser("saliency-pool", help="Serial vs process-pool CW saliency maps")
+    pool.add_argument("--frames", type=int, default=120)
+    pool.add_argument("--width", type=int, default=960)
+    pool.add_argument("--height", type=int, default=540)
+    pool.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    pool.add_argument("--repeat", type=int, default=1)
+    pool.set_defaults(func=bench_saliency_pool)
+
+    palette = sub.add_parser("palette-threads", help="Thread-pool global palette application")
+    palette.add_argument("--frames", type=int, default=300)
+    palette.add_argument("--width", type=int, default=1920)
+    palette.add_argument("--height", type=int, default=1080)
+    palette.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    palette.add_argument("--repeat", type=int, default=1)
+    palette.set_defaults(func=bench_palette_threads)
+
+    build = sub.add_parser("palette-build", help="Histogram palette build time vs frame count")
+    build.add_argument("--frames", type=int, nargs="+", default=[10, 100, 600])
+    build.add_argument("--width", type=int, default=960)
+    build.add_argument("--height", type=int, default=540)
+    build.add_argument("--colors", type=int, default=256)
+    build.add_argument("--repeat", type=int, default=3)
+    build.set_defaults(func=bench_palette_build)
+
+    mapping = sub.add_parser("palette-map", help="Pillow quantize vs inverse-colormap lookup")
+    mapping.add_argument("--frames", type=int, default=30)
+    mapping.add_argument("--width", type=int, default=1920)
+    mapping.add_argument("--height", type=int, default=1080)
+    mapping.add_argument("--repeat", type=int, default=3)
+    mapping.set_defaults(func=bench_palette_map)
+
+    dither = sub.add_parser("dither", help="Floyd-Steinberg vs ordered dithering: time and size")
+    dither.add_argument("--frames", type=int, default=60)
+    dither.add_argument("--width", type=int, default=960)
+    dither.add_argument("--height", type=int, default=540)
+    dither.add_argument("--colors", type=int, default=128)
+    dither.add_argument("--modes", nargs="+", default=["floyd-steinberg", "ordered", "none"])
+    dither.set_defaults(func=bench_dither)
+
+    delta = sub.add_parser("gif-delta", help="Full-frame vs dirty-rectangle GIF encoding")
+    delta.add_argument("--frames", type=int, default=60)
+    delta.add_argument("--width", type=int, default=1920)
+    delta.add_argument("--height", type=int, default=1080)
+    delta.add_argument("--repeat", type=int, default=3)
+    delta.set_defaults(func=bench_gif_delta)
+
+    encode = sub.add_parser("gif-encode", help="Serial vs process-pool LZW frame encoding")
+    encode.add_argument("--frames", type=int, default=60)
+    encode.add_argument("--width", type=int, default=960)
+    encode.add_argument("--height", type=int, default=540)
+    encode.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    encode.add_argument("--repeat", type=int, default=1)
+    encode.set_defaults(func=bench_gif_encode)
+
+    target = sub.add_parser("target", help="compress_to_target iterations, predicted vs actual")
+    target.add_argument("--frames", type=int, default=60)
+    target.add_argument("--width", type=int, default=1920)
+    target.add_argument("--height", type=int, default=1080)
+    target.add_argument("--targets", type=float, nargs="+", default=[10.0, 1.0, 0.2])
+    target.add_argument("--dither", default="ordered")
+    target.set_defaults(func=bench_target)
+
+    scenes = sub.add_parser("scenes", help="Global vs per-scene palettes on mixed content")
+    scenes.add_argument("--frames", type=int, default=90)
+    scenes.add_argument("--width", type=int, default=960)
+    scenes.add_argument("--height", type=int, default=540)
+    scenes.add_argument("--scene-len", type=int, default=15)
+    scenes.add_argument("--colors", type=int, default=64)
+    scenes.add_argument("--target", type=float, default=100.0)
+    scenes.add_argument("--dither", default="floyd-steinberg")
+    scenes.add_argument("--selection", default="motion")
+    scenes.set_defaults(func=bench_scenes)
+
+    backends = sub.add_parser("backends", help="Encode time and size per output format")
+    backends.add_argument("--frames", type=int, default=60)
+    backends.add_argument("--width", type=int, default=960)
+    backends.add_argument("--height", type=int, default=540)
+    backends.add_argument("--formats", nargs="+", default=["gif", "webp", "webp-lossless", "apng"])
+    backends.add_argument("--dither", default="floyd-steinberg")
+    backends.add_argument("--target", type=float, default=0.05)
+    backends.set_defaults(func=bench_backends)
+
+    live = sub.add_parser("live", help="Stop-to-bytes latency: batch vs live encoding")
+    live.add_argument("--frames", type=int, default=100)
+    live.add_argument("--width", type=int, default=1920)
+    live.add_argument("--height", type=int, default=1080)
+    live.add_argument("--fps", type=int, default=10)
+    live.add_argument("--workers", type=int, default=2)
+    live.add_argument("--dither", default="floyd-steinberg")
+    live.set_defaults(func=bench_live)
+
+    capture = sub.add_parser("capture", help="Grab + ring push time per capture backend")
+    capture.add_argument("--grabs", type=int, default=30)
+    capture.add_argument(
+        "--backends", nargs="+", default=["xshm", "pillow", "gnome-screenshot", "scrot", "import"]
+    )
+    capture.add_argument("--region", help="Capture region spec, e.g. 800x600+0+0")
+    capture.set_defaults(func=bench_capture)
+
+    pipeline = sub.add_parser("pipeline", help="Headless recorder run on a synthetic source")
+    pipeline.add_argument("--seconds", type=float, default=5.0)
+    pipeline.add_argument("--fps", type=int, default=10)
+    pipeline.add_argument("--width", type=int, default=1920)
+    pipeline.add_argument("--height", type=int, default=1080)
+    pipeline.add_argument("--latency", type=float, default=0.0, help="Simulated grab ms")
+    pipeline.add_argument("--source", default="synthetic", help="'synthetic' or a backend spec")
+    pipeline.add_argument("--region", help="Capture region spec, e.g. 960x540+0+0")
+    pipeline.set_defaults(func=bench_pipeline)
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    logging.getLogger("flashrecord").setLevel(logging.WARNING)
+    args = parse_args()
+    return int(args.func(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 
 from .cli import FlashRecordCLI
 from .config import Config
+from .screen_recorder import record_screen_to_gif
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -63,6 +64,7 @@ async def root():
             "status": "/status",
             "screenshot": "/screenshot",
             "recording": "/recording",
+            "screen_gif": "/recording/screen",
         },
     }
 
@@ -91,21 +93,48 @@ async def get_status():
 
 
 @app.post("/screenshot", response_model=CommandResponse, tags=["Actions"])
-async def take_screenshot():
-    """Take a screenshot"""
+async def take_screenshot(region: Optional[str] = None):
+    """
+    Take a screenshot
+
+    region limits it to part of the screen: 'WxH+X+Y', 'left,top,right,bottom',
+    'monitor:N' or 'window:<title>'
+    """
+    try:
+        path = cli.handle_screenshot(region=region)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    if not path:
+        raise HTTPException(status_code=400, detail="Screenshot failed")
+    return CommandResponse(
+        success=True,
+        action="screenshot",
+        message="Screenshot taken successfully",
+        result={"path": path, "region": region},
+    )
+
+
+@app.post("/recording/screen", response_model=CommandResponse, tags=["Recording"])
+def record_screen(duration: float = 5, fps: int = 10, region: Optional[str] = None):
+    """
+    Record the screen (or a region of it, as for /screenshot) to GIF
+
+    Blocks for the recording; runs in the server's thread pool.
+    """
     try:
-        cli.handle_command("screenshot", None)
-        if cli.recording_file:
-            return CommandResponse(
-                success=True,
-                action="screenshot",
-                message="Screenshot taken successfully",
-                result={"path": cli.recording_file},
-            )
-        else:
-            raise HTTPException(status_code=400, detail="Screenshot failed")
+        path = record_screen_to_gif(
+            duration=duration, fps=fps, output_dir=cli.config.get_output_dir("gifs"), region=region
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+    if not path:
+        raise HTTPException(status_code=400, detail="GIF recording failed")
+    return CommandResponse(
+        success=True,
+        action="record_screen",
+        message="GIF recorded",
+        result={"path": path, "region": region},
+    )
 
 
 @app.post("/recording/start", response_model=CommandResponse, tags=["Recording"])
@@ -0,0 +1,527 @@
+"""
+FlashRecord Capture Backends
+Screen grabbers behind one interface, so the recorder and screenshots can use
+a persistent connection where the platform offers one
+
+Backends:
+1. xshm: Linux/X11 through ctypes (libX11 + libXext MIT-SHM). One display
+   connection and one shared-memory XImage live for the whole recording;
+   each grab is a single XShmGetImage into the same segment, returned as an
+   RGB view (no PNG round trip, no per-frame allocation)
+2. pillow: PIL.ImageGrab (Windows GDI, macOS, or X11 through XCB with a
+   fresh connection per call)
+3. gnome-screenshot, scrot, import (ImageMagick), screencapture (macOS):
+   one subprocess and temporary PNG per grab; kept as fallbacks
+4. synthetic, replay: display-free sources (see capture_sources)
+
+grab() returns a PIL image or an (H, W, 3) uint8 array. Arrays from
+persistent backends may be views over the backend's reused buffer, valid
+until the next grab(); consumers that keep a frame copy it (FrameRing.push
+copies into its slot). New backends plug in through register_capture_backend().
+
+set_bbox() restricts grabs to a screen rectangle (see capture_region for
+monitors and windows). xshm sizes its shared image to the box, pillow and the
+tools pass it to the grabber, and the rest crop, so fewer pixels reach the
+recorder and encoder.
+"""
+
+import ctypes
+import ctypes.util
+import functools
+import inspect
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageGrab, features
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureEnded(Exception):
+    """Raised by grab() when a finite source (e.g. a replay) has no more frames"""
+
+
+class CaptureBackend:
+    """
+    Base class for screen grabbers
+
+    Subclasses set name and implement grab(); persistent backends open their
+    resources on the first grab() and release them in close().
+    """
+
+    name = ""
+    persistent = False  # Keeps a connection/buffer between grabs
+    bbox: Optional[Tuple[int, int, int, int]] = None  # (left, top, right, bottom); None = all
+
+    def available(self) -> bool:
+        """Whether this backend can capture on the current machine"""
+        return True
+
+    def set_bbox(self, bbox: Optional[Tuple[int, int, int, int]]) -> None:
+        """
+        Restrict grabs to a screen rectangle; grab() implementations honour
+        it (backends that always capture everything return self._crop(frame))
+
+        Args:
+            bbox: (left, top, right, bottom) in screen pixels, or None for the
+                  whole screen
+        """
+        if bbox is not None:
+            left, top, right, bottom = (int(v) for v in bbox)
+            if right <= left or bottom <= top:
+                raise ValueError(f"Empty capture region: {tuple(bbox)}")
+            bbox = (left, top, right, bottom)
+        self.bbox = bbox
+
+    def _crop(self, frame):
+        """frame cut to bbox (arrays as views) for backends that grab everything"""
+        if self.bbox is None:
+            return frame
+        left, top, right, bottom = self.bbox
+        if isinstance(frame, np.ndarray):
+            return frame[max(top, 0) : bottom, max(left, 0) : right]
+        w, h = frame.size
+        return frame.crop((max(left, 0), max(top, 0), min(right, w), min(bottom, h)))
+
+    def grab(self):
+        """
+        Capture the screen
+
+        Returns:
+            PIL image or (H, W, 3) uint8 RGB array
+
+        Raises:
+            CaptureEnded: A finite source has no more frames
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release connections and buffers (the backend may be reused afterwards)"""
+
+    def __enter__(self) -> "CaptureBackend":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PillowBackend(CaptureBackend):
+    """PIL.ImageGrab.grab(); on Linux every call opens a new X connection"""
+
+    name = "pillow"
+
+    def available(self) -> bool:
+        if sys.platform in ("win32", "darwin"):
+            return True
+        return bool(os.environ.get("DISPLAY")) and bool(features.check_feature("xcb"))
+
+    def grab(self):
+        # Windows grabs only the primary monitor unless all_screens is set;
+        # a bbox is in virtual-screen coordinates
+        all_screens = sys.platform == "win32" and self.bbox is not None
+        return ImageGrab.grab(bbox=self.bbox, all_screens=all_screens)
+
+
+class ToolBackend(CaptureBackend):
+    """External screenshot tool writing a temporary PNG per grab"""
+
+    def __init__(
+        self,
+        name: str,
+        argv: List[str],
+        platform: str = "linux",
+        region_argv: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            name: Backend name
+            argv: Command; the output path is appended
+            platform: sys.platform prefix the tool runs on
+            region_argv: Geometry options added when a bbox is set, formatted
+                         with x, y, w, h (None: the full screen is cropped)
+        """
+        self.name = name
+        self.argv = argv
+        self.platform = platform
+        self.region_argv = region_argv
+
+    def available(self) -> bool:
+        return sys.platform.startswith(self.platform) and shutil.which(self.argv[0]) is not None
+
+    def grab(self):
+        argv = list(self.argv)
+        native = self.bbox is not None and self.region_argv is not None
+        if native:
+            left, top, right, bottom = self.bbox  # type: ignore[misc]
+            geometry = {"x": left, "y": top, "w": right - left, "h": bottom - top}
+            argv += [arg.format(**geometry) for arg in self.region_argv]  # type: ignore[union-attr]
+
+        # Fresh path: some tools (scrot) rename instead of overwriting
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path = os.path.join(tmp_dir, "capture.png")
+            result = subprocess.run(argv + [tmp_path], capture_output=True, timeout=5)
+            if result.returncode != 0 or not os.path.exists(tmp_path):
+                raise RuntimeError(f"{self.name} failed with exit code {result.returncode}")
+            with Image.open(tmp_path) as img:
+                img.load()
+                return img.copy() if native else self._crop(img)
+
+
+# --- MIT-SHM through ctypes -------------------------------------------------
+
+_ZPIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+        ("obdata", ctypes.c_void_p),
+        ("funcs", ctypes.c_void_p * 6),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+_XLIBS: Optional[Tuple[ctypes.CDLL, ctypes.CDLL, ctypes.CDLL]] = None
+
+
+def _load_xlibs() -> Optional[Tuple[ctypes.CDLL, ctypes.CDLL, ctypes.CDLL]]:
+    """libX11, libXext and libc with prototypes set, or None if missing"""
+    global _XLIBS
+    if _XLIBS is not None:
+        return _XLIBS
+    names = [ctypes.util.find_library(n) for n in ("X11", "Xext", "c")]
+    if not all(names):
+        return None
+    try:
+        x11, xext, libc = (ctypes.CDLL(n) for n in names)  # type: ignore[arg-type]
+    except OSError:
+        return None
+
+    p, i, u = ctypes.c_void_p, ctypes.c_int, ctypes.c_ulong
+    x11.XOpenDisplay.argtypes, x11.XOpenDisplay.restype = [ctypes.c_char_p], p
+    x11.XCloseDisplay.argtypes = [p]
+    x11.XDefaultScreen.argtypes, x11.XDefaultScreen.restype = [p], i
+    x11.XRootWindow.argtypes, x11.XRootWindow.restype = [p, i], u
+    x11.XDefaultVisual.argtypes, x11.XDefaultVisual.restype = [p, i], p
+    x11.XDefaultDepth.argtypes, x11.XDefaultDepth.restype = [p, i], i
+    x11.XDisplayWidth.argtypes, x11.XDisplayWidth.restype = [p, i], i
+    x11.XDisplayHeight.argtypes, x11.XDisplayHeight.restype = [p, i], i
+    x11.XSync.argtypes = [p, i]
+    x11.XFree.argtypes = [p]
+    xext.XShmQueryExtension.argtypes, xext.XShmQueryExtension.restype = [p], i
+    xext.XShmCreateImage.argtypes = [p, p, ctypes.c_uint, i, p, p, ctypes.c_uint, ctypes.c_uint]
+    xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+    xext.XShmAttach.argtypes, xext.XShmAttach.restype = [p, p], i
+    xext.XShmDetach.argtypes, xext.XShmDetach.restype = [p, p], i
+    xext.XShmGetImage.argtypes = [p, u, p, i, i, u]
+    xext.XShmGetImage.restype = i
+    libc.shmget.argtypes, libc.shmget.restype = [i, ctypes.c_size_t, i], i
+    libc.shmat.argtypes, libc.shmat.restype = [i, p, i], p
+    libc.shmdt.argtypes, libc.shmdt.restype = [p], i
+    libc.shmctl.argtypes, libc.shmctl.restype = [i, i, p], i
+    _XLIBS = (x11, xext, libc)
+    return _XLIBS
+
+
+class XShmBackend(CaptureBackend):
+    """
+    Persistent X11 grabber using the MIT shared-memory extension
+
+    The display connection and shared XImage are created on the first grab()
+    (so in the capturing thread) and reused until close(). Only 24/32-bit
+    TrueColor screens with 32 bits per pixel are supported.
+    """
+
+    name = "xshm"
+    persistent = True
+
+    def __init__(self, display: Optional[str] = None):
+        """
+        Args:
+            display: X display name (default: $DISPLAY)
+        """
+        self.display_name = display
+        self._display = None
+        self._image = None
+        self._shminfo: Optional[_XShmSegmentInfo] = None
+        self._root = 0
+        self._pixels: Optional[np.ndarray] = None  # (H, W, 4) view of the segment
+        self._origin = (0, 0)  # Top-left of the grabbed area on the root window
+        self.size: Optional[Tuple[int, int]] = None
+
+    def set_bbox(self, bbox: Optional[Tuple[int, int, int, int]]) -> None:
+        """Restrict grabs to bbox; the shared image is recreated at its size"""
+        super().set_bbox(bbox)
+        self.close()
+
+    def available(self) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        if not (self.display_name or os.environ.get("DISPLAY")):
+            return False
+        if self._display is not None:
+            return True
+        try:
+            self._open()
+        except Exception as e:
+            logger.info(f"[*] XShm capture unavailable: {e}")
+            return False
+        self.close()  # Reopened by the thread that grabs
+        return True
+
+    def _open(self) -> None:
+        libs = _load_xlibs()
+        if libs is None:
+            raise RuntimeError("libX11/libXext not found")
+        x11, xext, libc = libs
+
+        name = (self.display_name or os.environ.get("DISPLAY", "")).encode()
+        display = x11.XOpenDisplay(name)
+        if not display:
+            raise RuntimeError(f"cannot open display {name.decode()!r}")
+        self._display = display
+        try:
+            if not xext.XShmQueryExtension(display):
+                raise RuntimeError("MIT-SHM extension not available")
+            screen = x11.XDefaultScreen(display)
+            self._root = x11.XRootWindow(display, screen)
+            screen_w = x11.XDisplayWidth(display, screen)
+            screen_h = x11.XDisplayHeight(display, screen)
+            # Clip to the root window: XShmGetImage outside it is a fatal X error
+            left, top, right, bottom = self.bbox or (0, 0, screen_w, screen_h)
+            left, top = max(left, 0), max(top, 0)
+            right, bottom = min(right, screen_w), min(bottom, screen_h)
+            if right <= left or bottom <= top:
+                raise ValueError(
+                    f"Capture region {self.bbox} is off the {screen_w}x{screen_h} screen"
+                )
+            self._origin = (left, top)
+            width, height = right - left, bottom - top
+
+            shminfo = _XShmSegmentInfo()
+            image = xext.XShmCreateImage(
+                display,
+                x11.XDefaultVisual(display, screen),
+                x11.XDefaultDepth(display, screen),
+                _ZPIXMAP,
+                None,
+                ctypes.byref(shminfo),
+                width,
+                height,
+            )
+            if not image:
+                raise RuntimeError("XShmCreateImage failed")
+            self._image = image
+            ximage = image.contents
+            if ximage.bits_per_pixel != 32 or ximage.red_mask != 0xFF0000:
+                raise RuntimeError(
+                    f"unsupported visual ({ximage.bits_per_pixel} bpp, "
+                    f"red mask {ximage.red_mask:#x})"
+                )
+
+            nbytes = ximage.bytes_per_line * height
+            shminfo.shmid = libc.shmget(_IPC_PRIVATE, nbytes, _IPC_CREAT | 0o600)
+            if shminfo.shmid < 0:
+                raise RuntimeError("shmget failed")
+            addr = libc.shmat(shminfo.shmid, None, 0)
+            if addr in (None, ctypes.c_void_p(-1).value):
+                libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+                raise RuntimeError("shmat failed")
+            shminfo.shmaddr = addr
+            shminfo.readOnly = 0
+            ximage.data = addr
+            self._shminfo = shminfo
+            attached = xext.XShmAttach(display, ctypes.byref(shminfo))
+            x11.XSync(display, 0)
+            # The segment is freed once both sides detach
+            libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+            if not attached:
+                raise RuntimeError("XShmAttach failed")
+
+            buf = (ctypes.c_uint8 * nbytes).from_address(addr)
+            rows = np.frombuffer(buf, dtype=np.uint8).reshape(height, ximage.bytes_per_line)
+            self._pixels = rows[:, : width * 4].reshape(height, width, 4)
+            self.size = (width, height)
+            logger.info(f"[*] XShm capture: {width}x{height} on {name.decode()}")
+        except Exception:
+            self.close()
+            raise
+
+    def grab(self):
+        """
+        Capture the root window (or the bbox part of it) into the shared segment
+
+        Returns:
+            (H, W, 3) RGB view over the shared segment (valid until the next grab)
+        """
+        if self._display is None:
+            self._open()
+        _, xext, _ = _XLIBS  # type: ignore[misc]
+        x, y = self._origin
+        if not xext.XShmGetImage(self._display, self._root, self._image, x, y, _ALL_PLANES):
+            raise RuntimeError("XShmGetImage failed")
+        return self._pixels[..., 2::-1]  # type: ignore[index]  # BGRX -> RGB view
+
+    def close(self) -> None:
+        if self._display is None:
+            return
+        x11, xext, libc = _XLIBS  # type: ignore[misc]
+        self._pixels = None
+        if self._shminfo is not None and self._shminfo.shmaddr:
+            xext.XShmDetach(self._display, ctypes.byref(self._shminfo))
+            x11.XSync(self._display, 0)
+            libc.shmdt(self._shminfo.shmaddr)
+        if self._image:
+            self._image.contents.data = None  # Shared memory, not Xlib's to free
+            x11.XFree(self._image)
+        x11.XCloseDisplay(self._display)
+        self._display = None
+        self._image = None
+        self._shminfo = None
+
+
+_BACKENDS: Dict[str, Callable[..., CaptureBackend]] = {}
+
+# Tried in order by create_capture_backend(None)
+_DEFAULT_ORDER = {
+    "linux": ["xshm", "pillow", "gnome-screenshot", "scrot", "import"],
+    "darwin": ["pillow", "screencapture"],
+    "win32": ["pillow"],
+}
+
+
+def register_capture_backend(name: str, factory: Callable[..., CaptureBackend]) -> None:
+    """
+    Make a backend available to create_capture_backend()
+
+    Args:
+        name: Backend name; replaces any backend of the same name
+        factory: Callable returning a new backend instance; called with the
+                 argument string of a 'name:argument' spec, if any
+    """
+    if not name:
+        raise ValueError("Capture backend needs a name")
+    _BACKENDS[name] = factory
+
+
+def create_capture_backend(name=None) -> CaptureBackend:
+    """
+    New capture backend instance
+
+    Args:
+        name: Backend name ('xshm', 'pillow', 'gnome-screenshot', 'scrot',
+              'import', 'screencapture', 'synthetic', or registered), a
+              'name:argument' spec ('replay:<path>', 'synthetic:<scene>',
+              'xshm:<display>'), a CaptureBackend instance (returned
+              as-is), or None for the first available backend of this
+              platform (falls back to 'pillow')
+
+    Returns:
+        Backend instance
+    """
+    if isinstance(name, CaptureBackend):
+        return name
+    if name is None:
+        platform = "linux" if sys.platform.startswith("linux") else sys.platform
+        for candidate in _DEFAULT_ORDER.get(platform, []):
+            backend = _BACKENDS[candidate]()
+            if backend.available():
+                return backend
+        return PillowBackend()
+
+    key, _, argument = str(name).partition(":")
+    factory = _BACKENDS.get(key.lower())
+    if factory is None:
+        raise ValueError(f"Unknown capture backend: {key} (available: {', '.join(_BACKENDS)})")
+    takes, needs = _factory_arguments(factory)
+    if argument and not takes:
+        raise ValueError(f"Capture backend {key} takes no argument (got {argument!r})")
+    if not argument and needs:
+        raise ValueError(f"Capture backend {key} needs an argument ('{key}:<argument>')")
+    return factory(argument) if argument else factory()
+
+
+def _factory_arguments(factory: Callable[..., CaptureBackend]) -> Tuple[bool, bool]:
+    """Whether factory accepts, and whether it requires, one positional argument"""
+    try:
+        params = list(inspect.signature(factory).parameters.values())
+    except (TypeError, ValueError):
+        return True, False  # No signature (e.g. builtins): let the call decide
+    positional = [
+        p
+        for p in params
+        if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.VAR_POSITIONAL)
+    ]
+    needs = any(p.default is p.empty and p.kind != p.VAR_POSITIONAL for p in positional)
+    return bool(positional), needs
+
+
+def available_capture_backends() -> List[str]:
+    """Names of registered backends that can capture on this machine"""
+    names = []
+    for name, factory in _BACKENDS.items():
+        if _factory_arguments(factory)[1]:
+            continue  # Needs an argument (e.g. replay:<path>)
+        if factory().available():
+            names.append(name)
+    return names
+
+
+def _synthetic(scene=None) -> CaptureBackend:
+    from .capture_sources import DEFAULT_SCRIPT, SyntheticBackend
+
+    return SyntheticBackend(scene or DEFAULT_SCRIPT)
+
+
+def _replay(path) -> CaptureBackend:
+    from .capture_sources import ReplayBackend
+
+    return ReplayBackend(path)
+
+
+register_capture_backend("xshm", XShmBackend)
+register_capture_backend("pillow", PillowBackend)
+register_capture_backend("synthetic", _synthetic)
+register_capture_backend("replay", _replay)
+for _name, _argv, _platform, _region in (
+    ("gnome-screenshot", ["gnome-screenshot", "-f"], "linux", None),
+    ("scrot", ["scrot"], "linux", ["-a", "{x},{y},{w},{h}"]),
+    ("import", ["import", "-window", "root"], "linux", ["-crop", "{w}x{h}+{x}+{y}"]),
+    ("screencapture", ["screencapture", "-x"], "darwin", ["-R", "{x},{y},{w},{h}"]),
+):
+    # partial rather than a lambda with defaults, so 'scrot:foo' is rejected
+    register_capture_backend(
+        _name, functools.partial(ToolBackend, _name, _argv, _platform, _region)
+    )
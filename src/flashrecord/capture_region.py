@@ -0,0 +1,437 @@
+"""
+FlashRecord Capture Regions
+Resolve which part of the screen to capture, so only those pixels are grabbed
+
+Region specs (resolve_region):
+1. None or 'full': the whole (virtual) screen
+2. (left, top, right, bottom): bounding box in screen pixels, as for
+   ImageGrab.grab(bbox=); also 'left,top,right,bottom' or X11 geometry 'WxH+X+Y'
+3. int or 'monitor:N': monitor N in list_monitors() order (0 = first)
+4. 'window:<title>': first visible window whose title contains <title>
+   (case-insensitive); Linux/X11 and Windows
+
+Monitors and windows are looked up when the region is resolved (at the start
+of a recording); a window moved afterwards is not followed.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import re
+import sys
+from typing import List, Optional, Tuple
+
+from .capture_backends import _load_xlibs
+
+logger = logging.getLogger(__name__)
+
+BBox = Tuple[int, int, int, int]
+
+_GEOMETRY = re.compile(r"^(\d+)x(\d+)([+-]\d+)([+-]\d+)$")
+
+
+def parse_bbox(spec) -> BBox:
+    """
+    Bounding box from a tuple or string
+
+    Args:
+        spec: (left, top, right, bottom), 'left,top,right,bottom' or 'WxH+X+Y'
+
+    Returns:
+        (left, top, right, bottom) with a positive width and height
+    """
+    if isinstance(spec, str):
+        text = spec.strip()
+        match = _GEOMETRY.match(text)
+        if match:
+            w, h, x, y = (int(v) for v in match.groups())
+            spec = (x, y, x + w, y + h)
+        else:
+            try:
+                spec = tuple(int(v) for v in text.split(","))
+            except ValueError:
+                raise ValueError(f"Invalid capture region: {text!r}") from None
+    if len(spec) != 4:
+        raise ValueError(f"Capture region needs (left, top, right, bottom), got {spec!r}")
+    left, top, right, bottom = (int(v) for v in spec)
+    if right <= left or bottom <= top:
+        raise ValueError(f"Empty capture region: {(left, top, right, bottom)}")
+    return left, top, right, bottom
+
+
+def resolve_region(region) -> Optional[BBox]:
+    """
+    Bounding box of a region spec (see module docstring)
+
+    Args:
+        region: None, bbox tuple, monitor index, or spec string
+
+    Returns:
+        (left, top, right, bottom), or None for the full screen
+
+    Raises:
+        ValueError: Malformed spec, or no such monitor/window
+    """
+    if region is None:
+        return None
+    if isinstance(region, bool):
+        raise ValueError(f"Invalid capture region: {region!r}")
+    if isinstance(region, int):
+        return _monitor(region)
+    if not isinstance(region, str):
+        return parse_bbox(region)
+
+    kind, sep, argument = region.strip().partition(":")
+    kind = kind.lower()
+    if not sep:
+        if kind in ("", "full"):
+            return None
+        return parse_bbox(region)
+    if kind == "monitor":
+        try:
+            return _monitor(int(argument))
+        except ValueError:
+            raise ValueError(f"Invalid monitor index: {argument!r}") from None
+    if kind == "window":
+        bbox = find_window(argument)
+        if bbox is None:
+            raise ValueError(f"No visible window titled like {argument!r}")
+        return bbox
+    raise ValueError(f"Unknown capture region kind: {kind} (use monitor:N or window:<title>)")
+
+
+def _monitor(index: int) -> BBox:
+    monitors = list_monitors()
+    if not 0 <= index < len(monitors):
+        raise ValueError(f"No monitor {index} ({len(monitors)} found)")
+    return monitors[index]
+
+
+def list_monitors() -> List[BBox]:
+    """
+    Monitor bounding boxes in virtual-screen coordinates
+
+    Returns:
+        List of (left, top, right, bottom), in the order the system reports
+        them (empty when they cannot be listed)
+    """
+    try:
+        if sys.platform == "win32":
+            return _monitors_windows()
+        if sys.platform == "darwin":
+            return _monitors_macos()
+        if sys.platform.startswith("linux"):
+            return _monitors_x11()
+    except Exception as e:
+        logger.info(f"[*] Cannot list monitors: {e}")
+    return []
+
+
+def find_window(title: str) -> Optional[BBox]:
+    """
+    Bounding box of the first visible window whose title contains title
+
+    Args:
+        title: Case-insensitive title substring
+
+    Returns:
+        (left, top, right, bottom) in screen coordinates, or None if not found
+    """
+    needle = title.strip().lower()
+    if not needle:
+        raise ValueError("Window title must not be empty")
+    if sys.platform == "win32":
+        finder = _window_windows
+    elif sys.platform.startswith("linux"):
+        finder = _window_x11
+    else:
+        raise ValueError(f"Window capture is not supported on {sys.platform}")
+    try:
+        return finder(needle)
+    except Exception as e:
+        logger.info(f"[*] Cannot list windows: {e}")
+        return None
+
+
+# --- X11 --------------------------------------------------------------------
+
+_IS_VIEWABLE = 2
+_ANY_PROPERTY_TYPE = 0
+
+
+class _XWindowAttributes(ctypes.Structure):
+    _fields_ = [
+        ("x", ctypes.c_int),
+        ("y", ctypes.c_int),
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("border_width", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("visual", ctypes.c_void_p),
+        ("root", ctypes.c_ulong),
+        ("class_", ctypes.c_int),
+        ("bit_gravity", ctypes.c_int),
+        ("win_gravity", ctypes.c_int),
+        ("backing_store", ctypes.c_int),
+        ("backing_planes", ctypes.c_ulong),
+        ("backing_pixel", ctypes.c_ulong),
+        ("save_under", ctypes.c_int),
+        ("colormap", ctypes.c_ulong),
+        ("map_installed", ctypes.c_int),
+        ("map_state", ctypes.c_int),
+        ("all_event_masks", ctypes.c_long),
+        ("your_event_mask", ctypes.c_long),
+        ("do_not_propagate_mask", ctypes.c_long),
+        ("override_redirect", ctypes.c_int),
+        ("screen", ctypes.c_void_p),
+    ]
+
+
+class _XRRMonitorInfo(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_ulong),
+        ("primary", ctypes.c_int),
+        ("automatic", ctypes.c_int),
+        ("noutput", ctypes.c_int),
+        ("x", ctypes.c_int),
+        ("y", ctypes.c_int),
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("mwidth", ctypes.c_int),
+        ("mheight", ctypes.c_int),
+        ("outputs", ctypes.c_void_p),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+# Windows can vanish mid-walk; Xlib's default handler would exit the process
+_ignore_x_errors = _X_ERROR_HANDLER(lambda display, event: 0)
+
+
+class _X11:
+    """Display connection plus the Xlib calls used for regions (context manager)"""
+
+    def __init__(self):
+        libs = _load_xlibs()
+        if libs is None:
+            raise RuntimeError("libX11 not found")
+        x11 = libs[0]
+        p, i, u = ctypes.c_void_p, ctypes.c_int, ctypes.c_ulong
+        x11.XQueryTree.argtypes = [p, u, p, p, p, p]
+        x11.XQueryTree.restype = i
+        x11.XGetWindowAttributes.argtypes = [p, u, p]
+        x11.XGetWindowAttributes.restype = i
+        x11.XTranslateCoordinates.argtypes = [p, u, u, i, i, p, p, p]
+        x11.XTranslateCoordinates.restype = i
+        x11.XFetchName.argtypes, x11.XFetchName.restype = [p, u, p], i
+        x11.XInternAtom.argtypes, x11.XInternAtom.restype = [p, ctypes.c_char_p, i], u
+        x11.XGetWindowProperty.argtypes = [p, u, u, ctypes.c_long, ctypes.c_long, i, u]
+        x11.XGetWindowProperty.argtypes += [p, p, p, p, p]
+        x11.XGetWindowProperty.restype = i
+        x11.XSetErrorHandler.argtypes = [p]
+        x11.XSetErrorHandler.restype = p
+        self.x11 = x11
+        self.display = None
+
+    def __enter__(self) -> "_X11":
+        self.display = self.x11.XOpenDisplay(None)
+        if not self.display:
+            raise RuntimeError("cannot open display")
+        self._previous = self.x11.XSetErrorHandler(ctypes.cast(_ignore_x_errors, ctypes.c_void_p))
+        screen = self.x11.XDefaultScreen(self.display)
+        self.root = self.x11.XRootWindow(self.display, screen)
+        self.size = (
+            self.x11.XDisplayWidth(self.display, screen),
+            self.x11.XDisplayHeight(self.display, screen),
+        )
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.x11.XSync(self.display, 0)
+        self.x11.XSetErrorHandler(self._previous)
+        self.x11.XCloseDisplay(self.display)
+
+    def children(self, window: int) -> List[int]:
+        root, parent = ctypes.c_ulong(), ctypes.c_ulong()
+        children, count = ctypes.POINTER(ctypes.c_ulong)(), ctypes.c_uint()
+        out = map(ctypes.byref, (root, parent, children, count))
+        if not self.x11.XQueryTree(self.display, window, *out):
+            return []
+        found = [children[k] for k in range(count.value)]
+        if children:
+            self.x11.XFree(children)
+        return found
+
+    def title(self, window: int) -> Optional[str]:
+        """_NET_WM_NAME (UTF-8), falling back to WM_NAME"""
+        atom = self.x11.XInternAtom(self.display, b"_NET_WM_NAME", 0)
+        kind, fmt = ctypes.c_ulong(), ctypes.c_int()
+        nitems, after = ctypes.c_ulong(), ctypes.c_ulong()
+        data = ctypes.c_void_p()
+        out = (kind, fmt, nitems, after, data)
+        status = self.x11.XGetWindowProperty(
+            self.display, window, atom, 0, 1024, 0, _ANY_PROPERTY_TYPE, *map(ctypes.byref, out)
+        )
+        if status == 0 and data.value:
+            try:
+                if fmt.value == 8 and nitems.value:
+                    return ctypes.string_at(data.value, nitems.value).decode("utf-8", "replace")
+            finally:
+                self.x11.XFree(data)
+        name = ctypes.c_char_p()
+        if self.x11.XFetchName(self.display, window, ctypes.byref(name)) and name.value:
+            text = name.value.decode("latin-1")
+            self.x11.XFree(ctypes.cast(name, ctypes.c_void_p))
+            return text
+        return None
+
+    def viewable_bbox(self, window: int) -> Optional[BBox]:
+        attrs = _XWindowAttributes()
+        if not self.x11.XGetWindowAttributes(self.display, window, ctypes.byref(attrs)):
+            return None
+        if attrs.map_state != _IS_VIEWABLE or attrs.width <= 0 or attrs.height <= 0:
+            return None
+        x, y, child = ctypes.c_int(), ctypes.c_int(), ctypes.c_ulong()
+        out = map(ctypes.byref, (x, y, child))
+        if not self.x11.XTranslateCoordinates(self.display, window, self.root, 0, 0, *out):
+            return None
+        return x.value, y.value, x.value + attrs.width, y.value + attrs.height
+
+
+def _monitors_x11() -> List[BBox]:
+    with _X11() as x:
+        try:
+            xrandr = ctypes.CDLL(ctypes.util.find_library("Xrandr") or "libXrandr.so.2")
+        except OSError:
+            width, height = x.size
+            return [(0, 0, width, height)]  # No RandR: one screen
+        xrandr.XRRGetMonitors.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+            ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int),
+        ]
+        xrandr.XRRGetMonitors.restype = ctypes.POINTER(_XRRMonitorInfo)
+        xrandr.XRRFreeMonitors.argtypes = [ctypes.c_void_p]
+        count = ctypes.c_int()
+        info = xrandr.XRRGetMonitors(x.display, x.root, 1, ctypes.byref(count))
+        if not info:
+            return []
+        try:
+            return [
+                (m.x, m.y, m.x + m.width, m.y + m.height)
+                for m in (info[k] for k in range(count.value))
+            ]
+        finally:
+            xrandr.XRRFreeMonitors(info)
+
+
+def _window_x11(needle: str) -> Optional[BBox]:
+    with _X11() as x:
+        # Breadth-first: top-level (frame) windows before their children
+        queue = x.children(x.root)
+        while queue:
+            window = queue.pop(0)
+            title = x.title(window)
+            if title and needle in title.lower():
+                bbox = x.viewable_bbox(window)
+                if bbox is not None:
+                    return _clamp(bbox, x.size)
+            queue.extend(x.children(window))
+    return None
+
+
+def _clamp(bbox: BBox, size: Tuple[int, int]) -> Optional[BBox]:
+    """bbox clipped to a (width, height) screen, or None if nothing is left"""
+    left, top = max(bbox[0], 0), max(bbox[1], 0)
+    right, bottom = min(bbox[2], size[0]), min(bbox[3], size[1])
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+# --- Windows ----------------------------------------------------------------
+
+
+class _RECT(ctypes.Structure):
+    _fields_ = [
+        ("left", ctypes.c_long),
+        ("top", ctypes.c_long),
+        ("right", ctypes.c_long),
+        ("bottom", ctypes.c_long),
+    ]
+
+
+def _monitors_windows() -> List[BBox]:
+    user32 = ctypes.windll.user32  # type: ignore[attr-defined]
+    monitors: List[BBox] = []
+    callback_type = ctypes.WINFUNCTYPE(  # type: ignore[attr-defined]
+        ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(_RECT), ctypes.c_void_p
+    )
+
+    def collect(monitor, dc, rect, data):
+        r = rect.contents
+        monitors.append((r.left, r.top, r.right, r.bottom))
+        return 1
+
+    user32.EnumDisplayMonitors(None, None, callback_type(collect), None)
+    return monitors
+
+
+def _window_windows(needle: str) -> Optional[BBox]:
+    user32 = ctypes.windll.user32  # type: ignore[attr-defined]
+    found: List[BBox] = []
+    callback_type = ctypes.WINFUNCTYPE(  # type: ignore[attr-defined]
+        ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p
+    )
+
+    def match(hwnd, data):
+        if not user32.IsWindowVisible(hwnd):
+            return 1
+        length = user32.GetWindowTextLengthW(hwnd)
+        if not length:
+            return 1
+        buf = ctypes.create_unicode_buffer(length + 1)
+        user32.GetWindowTextW(hwnd, buf, length + 1)
+        rect = _RECT()
+        if needle in buf.value.lower() and user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+            if rect.right > rect.left and rect.bottom > rect.top:
+                found.append((rect.left, rect.top, rect.right, rect.bottom))
+                return 0  # Stop enumerating
+        return 1
+
+    user32.EnumWindows(callback_type(match), None)
+    return found[0] if found else None
+
+
+# --- macOS ------------------------------------------------------------------
+
+
+class _CGRect(ctypes.Structure):
+    _fields_ = [
+        ("x", ctypes.c_double),
+        ("y", ctypes.c_double),
+        ("width", ctypes.c_double),
+        ("height", ctypes.c_double),
+    ]
+
+
+def _monitors_macos() -> List[BBox]:
+    cg = ctypes.CDLL("/System/Library/Frameworks/CoreGraphics.framework/CoreGraphics")
+    cg.CGGetActiveDisplayList.argtypes = [
+        ctypes.c_uint32,
+        ctypes.POINTER(ctypes.c_uint32),
+        ctypes.POINTER(ctypes.c_uint32),
+    ]
+    cg.CGDisplayBounds.argtypes = [ctypes.c_uint32]
+    cg.CGDisplayBounds.restype = _CGRect
+    ids = (ctypes.c_uint32 * 16)()
+    count = ctypes.c_uint32()
+    if cg.CGGetActiveDisplayList(16, ids, ctypes.byref(count)) != 0:
+        return []
+    monitors = []
+    for k in range(count.value):
+        r = cg.CGDisplayBounds(ids[k])  # Points, as screencapture -R expects
+        left, top = int(r.x), int(r.y)
+        monitors.append((left, top, left + int(r.width), top + int(r.height)))
+    return monitors
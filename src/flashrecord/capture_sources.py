@@ -0,0 +1,281 @@
+"""
+FlashRecord Capture Sources
+Display-free capture backends for deterministic load tests and benchmarks
+
+Sources:
+1. synthetic: scripted screens rendered with numpy - terminal typing,
+   scrolling documents, a video-playback region and idle spans - from a
+   fixed seed, so every run produces the same pixels
+2. replay: frames of an existing GIF (or any multi-frame image) or a
+   directory of PNGs, one per grab or paced by wall clock at a set rate
+
+Both plug in wherever a capture backend is accepted (ScreenRecorder,
+take_screenshot, create_capture_backend('synthetic') or 'replay:<path>').
+Finite sources raise CaptureEnded when they run out; the recorder stops.
+"""
+
+import glob
+import os
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from .capture_backends import CaptureBackend, CaptureEnded
+
+SCENES = ("terminal", "idle", "scroll", "video")
+
+DEFAULT_SCRIPT = (("terminal", 40), ("idle", 20), ("scroll", 40), ("video", 40))
+
+_GLYPH = (6, 10)  # Character cell (width, height) in pixels
+
+
+class SyntheticBackend(CaptureBackend):
+    """
+    Scripted synthetic screen
+
+    Each grab renders the next frame of the script into one reused canvas
+    (returned as an array view, like persistent screen grabbers). The script
+    repeats when loop is set and raises CaptureEnded otherwise.
+    """
+
+    name = "synthetic"
+    persistent = True
+
+    def __init__(
+        self,
+        script=DEFAULT_SCRIPT,
+        size: Tuple[int, int] = (1280, 720),
+        seed: int = 0,
+        loop: bool = True,
+        chars_per_frame: int = 6,
+        scroll_px: int = 24,
+        latency_ms: float = 0.0,
+    ):
+        """
+        Initialize synthetic source
+
+        Args:
+            script: Sequence of (scene, frames) with scene one of SCENES, or a
+                    single scene name (that scene only, 60 frames per pass)
+            size: Screen (width, height)
+            seed: Random seed for glyphs, documents and video noise
+            loop: Restart the script when it ends instead of raising CaptureEnded
+            chars_per_frame: Characters typed per terminal frame
+            scroll_px: Rows scrolled per scroll frame
+            latency_ms: Simulated grab cost (sleep per grab)
+        """
+        if isinstance(script, str):
+            script = ((script, 60),)
+        for scene, frames in script:
+            if scene not in SCENES:
+                raise ValueError(f"Unknown synthetic scene: {scene} (use {', '.join(SCENES)})")
+            if frames < 1:
+                raise ValueError(f"Scene {scene} needs at least one frame")
+        self.script = tuple((scene, int(frames)) for scene, frames in script)
+        self.width, self.height = size
+        self.seed = seed
+        self.loop = loop
+        self.chars_per_frame = chars_per_frame
+        self.scroll_px = scroll_px
+        self.latency_ms = latency_ms
+        self.frames_grabbed = 0
+        self._canvas: Optional[np.ndarray] = None
+        self._schedule = [scene for scene, frames in self.script for _ in range(frames)]
+        self._reset()
+
+    def __len__(self) -> int:
+        """Frames in one pass of the script"""
+        return len(self._schedule)
+
+    def _reset(self) -> None:
+        rng = np.random.default_rng(self.seed)
+        w, h = self.width, self.height
+        gw, gh = _GLYPH
+        # Glyph atlas: 64 random 1-bit 5x7 patterns padded into the cell
+        glyphs = np.zeros((64, gh, gw), dtype=bool)
+        glyphs[:, 1:8, 0:5] = rng.random((64, 7, 5)) < 0.45
+        self._glyphs = glyphs
+        self._cols, self._rows = max(1, w // gw), max(1, h // gh)
+        self._text = rng.integers(0, 64, size=1 << 16)
+        self._newline = rng.random(1 << 16) < 1.0 / 40  # Enter after this character
+        self._typed = 0
+        self._cursor = 0  # Cell index on screen
+
+        # Document: three screens of paragraphs on white, with headings
+        doc = np.full((h * 3, w, 3), 250, dtype=np.uint8)
+        y = 8
+        while y < doc.shape[0] - gh:
+            if rng.random() < 0.15:
+                doc[y : y + gh * 2, 16 : w // 2] = (40, 70, 160)  # Heading bar
+                y += gh * 3
+                continue
+            length = int(rng.integers(w // 3, w - 32))
+            cells = self._glyphs[rng.integers(0, 64, size=length // gw)]
+            line = np.concatenate(list(cells), axis=1) if len(cells) else None
+            if line is not None:
+                doc[y : y + gh, 16 : 16 + line.shape[1]][line] = (30, 30, 30)
+            y += gh + 4
+        self._doc = doc
+        self._scroll = 0
+
+        # Video: low-resolution noise tiles, upsampled by repetition
+        self._video_rng = np.random.default_rng(self.seed + 1)
+        self._video_box = (w // 4, h // 4, w // 4 + w // 2, h // 4 + h // 2)
+        self._position = 0
+
+    def _terminal(self) -> None:
+        canvas = self._canvas
+        gw, gh = _GLYPH
+        for _ in range(self.chars_per_frame):
+            row, col = divmod(self._cursor, self._cols)
+            if row >= self._rows:
+                # Scroll the terminal up by one line
+                canvas[:-gh] = canvas[gh:]
+                canvas[-gh:] = (18, 18, 24)
+                self._cursor -= self._cols
+                row -= 1
+            k = self._typed % len(self._text)
+            cell = canvas[row * gh : (row + 1) * gh, col * gw : (col + 1) * gw]
+            cell[...] = (18, 18, 24)
+            cell[self._glyphs[self._text[k]]] = (200, 220, 200)
+            self._typed += 1
+            self._cursor += self._cols - col if self._newline[k] else 1
+
+    def _scroll_doc(self) -> None:
+        h = self.height
+        self._scroll = (self._scroll + self.scroll_px) % (self._doc.shape[0] - h)
+        self._canvas[...] = self._doc[self._scroll : self._scroll + h]
+
+    def _video(self) -> None:
+        x0, y0, x1, y1 = self._video_box
+        block = 8
+        bw, bh = max(1, (x1 - x0) // block), max(1, (y1 - y0) // block)
+        noise = self._video_rng.integers(0, 256, (bh, bw, 3), dtype=np.uint8)
+        tile = np.repeat(np.repeat(noise, block, axis=0), block, axis=1)
+        self._canvas[y0 : y0 + tile.shape[0], x0 : x0 + tile.shape[1]] = tile
+
+    def grab(self):
+        """
+        Render the next scripted frame
+
+        Returns:
+            (H, W, 3) RGB view of the reused canvas (cut to bbox, if set)
+        """
+        if self._position >= len(self._schedule):
+            if not self.loop:
+                raise CaptureEnded("Synthetic script finished")
+            self._reset()
+        if self._canvas is None or self._position == 0:
+            self._canvas = np.full((self.height, self.width, 3), (18, 18, 24), dtype=np.uint8)
+
+        scene = self._schedule[self._position]
+        if scene == "terminal":
+            self._terminal()
+        elif scene == "scroll":
+            self._scroll_doc()
+        elif scene == "video":
+            self._video()
+        # 'idle' leaves the canvas unchanged
+
+        self._position += 1
+        self.frames_grabbed += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return self._crop(self._canvas)
+
+
+class ReplayBackend(CaptureBackend):
+    """
+    Replays recorded frames as if they were the screen
+
+    Frames are decoded once (to RGB arrays) when the source is opened.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: str,
+        rate: Optional[float] = None,
+        loop: bool = False,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """
+        Initialize replay source
+
+        Args:
+            path: GIF/APNG/WebP file, or a directory of PNG frames (sorted by name)
+            rate: Frames per second of the replayed screen; each grab returns
+                  the frame showing at that moment (frames are held or
+                  skipped to match the grab timing). None returns the next
+                  frame on every grab
+            loop: Restart at the first frame instead of raising CaptureEnded
+            clock: Monotonic clock in seconds used with rate (injectable for tests)
+        """
+        self.path = path
+        self.rate = float(rate) if rate else None
+        self.loop = loop
+        self.clock = clock
+        self.frames: Optional[List[np.ndarray]] = None
+        self._position = 0
+        self._start: Optional[float] = None
+
+    def available(self) -> bool:
+        return os.path.isdir(self.path) or os.path.isfile(self.path)
+
+    def _paths(self) -> Sequence[str]:
+        return sorted(glob.glob(os.path.join(self.path, "*.png")))
+
+    def _load(self) -> List[np.ndarray]:
+        if os.path.isdir(self.path):
+            frames = []
+            for name in self._paths():
+                with Image.open(name) as img:
+                    frames.append(np.asarray(img.convert("RGB")))
+        else:
+            with Image.open(self.path) as img:
+                frames = [np.asarray(f.convert("RGB")) for f in ImageSequence.Iterator(img)]
+        if not frames:
+            raise ValueError(f"No frames to replay in {self.path}")
+        size = frames[0].shape
+        if any(f.shape != size for f in frames):
+            raise ValueError(f"Replay frames in {self.path} differ in size")
+        return frames
+
+    def __len__(self) -> int:
+        if self.frames is None:
+            self.frames = self._load()
+        return len(self.frames)
+
+    def grab(self):
+        """
+        Next (or currently showing) replay frame
+
+        Returns:
+            (H, W, 3) RGB array (shared with the source; consumers copy it)
+        """
+        if self.frames is None:
+            self.frames = self._load()
+        n = len(self.frames)
+
+        if self.rate is not None:
+            now = self.clock()
+            if self._start is None:
+                self._start = now
+            index = int((now - self._start) * self.rate)
+        else:
+            index = self._position
+            self._position += 1
+
+        if index >= n:
+            if not self.loop:
+                raise CaptureEnded(f"Replay of {self.path} finished")
+            index %= n
+        return self._crop(self.frames[index])
+
+    def close(self) -> None:
+        """Rewind (decoded frames are kept for the next recording)"""
+        self._position = 0
+        self._start = None
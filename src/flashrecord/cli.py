@@ -4,6 +4,8 @@ Simple screen capture and animated GIF recording
 v0.3.5: Added PNG compression support for @sc command
 """
 
+import shlex
+
 from .ai_prompt import AIPromptManager
 from .config import Config
 from .install import run_setup_if_needed
@@ -27,6 +29,9 @@ class FlashRecordCLI:
         print("    @sc -c high   - Take screenshot (70% scale, ~50% reduction)")
         print("    @sc -c compact- Take screenshot (30% scale, ~90% reduction)")
         print("    @sv           - Record screen to GIF (interactive)")
+        print("    @sc/@sv -r <region> - Only a region: WxH+X+Y, monitor:N, window:<title>")
+        print("    (@sv auto mode buffers its whole duration; manual mode keeps up to 1 GB")
+        print("     of raw frames, ~17s of 1920x1080 at 10 fps, then stops with a message)")
         print("    help          - Show this help")
         print("    exit          - Quit\n")
 
@@ -47,13 +52,17 @@ class FlashRecordCLI:
             print(content.strip())
             print("")
 
-    def handle_screenshot(self, compress=False, quality="balanced"):
+    def handle_screenshot(self, compress=False, quality="balanced", region=None):
         """
         Handle @sc command with optional compression
 
         Args:
             compress: Enable compression (default: False)
             quality: Compression quality - 'high', 'balanced', 'compact'
+            region: Capture region spec (default: whole screen)
+
+        Returns:
+            Path to the screenshot, or None on failure
         """
         # Show compression info if enabled
         if compress:
@@ -64,36 +73,72 @@ class FlashRecordCLI:
             }
             print(f"[*] Compression: {quality} ({quality_info.get(quality, 'balanced')})")
 
+        if region:
+            print(f"[*] Region: {region}")
+
         target_dir = self.config.get_output_dir("screenshots")
-        result = take_screenshot(output_dir=target_dir, compress=compress, quality=quality)
+        result = take_screenshot(
+            output_dir=target_dir, compress=compress, quality=quality, region=region
+        )
         if result:
             print(f"[+] Screenshot: {result}")
         else:
             print("[-] Screenshot failed")
+        return result
+
+    def _parse_options(self, cmd):
+        """
+        Options of an @sc/@sv command, in any order (quote specs with spaces)
+
+        Examples:
+            @sc -c high -r 0,0,640,480 -> compress, 'high', '0,0,640,480'
+            @sc -r "window:My Editor" -c -> compress, 'balanced', 'window:My Editor'
+
+        Returns:
+            dict with compress, quality and region (None when absent)
+        """
+        options = {"compress": False, "quality": "balanced", "region": None}
+        parts = shlex.split(cmd)[1:]
+        i = 0
+        while i < len(parts):
+            flag = parts[i].lower()
+            following = parts[i + 1] if i + 1 < len(parts) else None
+            if flag == "-c":
+                options["compress"] = True
+                if following and following.lower() in ("high", "balanced", "compact"):
+                    options["quality"] = following.lower()
+                    i += 1
+            elif flag in ("-r", "--region"):
+                if following is None:
+                    print("[!] -r needs a region (WxH+X+Y, monitor:N or window:<title>)")
+                else:
+                    options["region"] = following
+                    i += 1
+            else:
+                print(f"[!] Ignoring unknown option: {parts[i]}")
+            i += 1
+        return options
 
     def handle_screenshot_with_args(self, cmd):
         """
-        Parse @sc command with compression arguments
+        Parse @sc command with compression and region arguments
 
         Examples:
             @sc -c         -> balanced compression
             @sc -c high    -> high quality compression
             @sc -c compact -> maximum compression
+            @sc -r monitor:1 -> second monitor only
+            @sc -r 0,0,640,480 -c high -> region, high quality compression
         """
-        parts = cmd.strip().lower().split()
-
-        compress = False
-        quality = "balanced"
-
-        if len(parts) >= 2 and parts[1] == "-c":
-            compress = True
-            if len(parts) >= 3 and parts[2] in ["high", "balanced", "compact"]:
-                quality = parts[2]
+        self.handle_screenshot(**self._parse_options(cmd))
 
-        self.handle_screenshot(compress=compress, quality=quality)
+    def handle_screen_record(self, region=None):
+        """
+        Handle @sv command - Auto/Manual mode with options
 
-    def handle_screen_record(self):
-        """Handle @sv command - Auto/Manual mode with options"""
+        Args:
+            region: Capture region spec (default: whole screen)
+        """
         try:
             # Ask if user wants to change defaults
             change = input("[?] Auto mode/5sec/10fps - Change settings? (y/n): ").strip().lower()
@@ -101,7 +146,7 @@ class FlashRecordCLI:
             if change != "y":
                 # Quick mode: use defaults
                 gif_dir = self.config.get_output_dir("gifs")
-                result = record_screen_to_gif(duration=5, fps=10, output_dir=gif_dir)
+                result = record_screen_to_gif(duration=5, fps=10, output_dir=gif_dir, region=region)
                 if not result:
                     print("[-] GIF recording failed")
                 return
@@ -114,17 +159,17 @@ class FlashRecordCLI:
 
             if mode == "2":
                 # Manual mode
-                self._manual_recording_mode()
+                self._manual_recording_mode(region)
             else:
                 # Auto mode with options
-                self._auto_recording_mode()
+                self._auto_recording_mode(region)
 
         except KeyboardInterrupt:
             print("\n[-] Recording cancelled")
         except Exception as e:
             print(f"[-] Error: {str(e)}")
 
-    def _auto_recording_mode(self):
+    def _auto_recording_mode(self, region=None):
         """Auto mode with duration and FPS selection"""
         # Duration selection
         print("\n[*] Recording Duration:")
@@ -149,12 +194,12 @@ class FlashRecordCLI:
         # Record
         print(f"\n[>] Auto mode: {duration}sec, {fps}fps")
         gif_dir = self.config.get_output_dir("gifs")
-        result = record_screen_to_gif(duration=duration, fps=fps, output_dir=gif_dir)
+        result = record_screen_to_gif(duration=duration, fps=fps, output_dir=gif_dir, region=region)
 
         if not result:
             print("[-] GIF recording failed")
 
-    def _manual_recording_mode(self):
+    def _manual_recording_mode(self, region=None):
         """Manual mode with start/stop control"""
         import os
 
@@ -168,7 +213,7 @@ class FlashRecordCLI:
         print("    3 - Record again (discard previous)")
         print("    4 - Save and exit")
 
-        recorder = ScreenRecorder(fps=10)
+        recorder = ScreenRecorder(fps=10, region=region)
 
         while True:
             cmd = input("\n> ").strip()
@@ -176,8 +221,7 @@ class FlashRecordCLI:
             if cmd == "1":
                 if recorder.is_recording:
                     print("[-] Already recording")
-                else:
-                    recorder.start_recording(duration=None)  # No auto-stop
+                elif recorder.start_recording(duration=None):  # No auto-stop
                     print("[>] Recording started... (Press 2 to stop)")
 
             elif cmd == "2":
@@ -194,14 +238,14 @@ class FlashRecordCLI:
             elif cmd == "3":
                 if recorder.is_recording:
                     recorder.stop_recording()
-                recorder.frames = []
+                recorder.clear_frames()
                 print("[*] Ready to record again. Press 1 to start.")
 
             elif cmd == "4":
                 if recorder.is_recording:
                     recorder.stop_recording()
 
-                if not recorder.frames:
+                if not recorder.get_stats()["frame_count"]:
                     print("[-] No frames to save")
                     break
 
@@ -239,7 +283,7 @@ class FlashRecordCLI:
             return "screenshot"
         if cmd.startswith("@sc "):
             return "screenshot_compressed"
-        if cmd == "@sv":
+        if cmd == "@sv" or cmd.startswith("@sv "):
             return "gif_record"
 
         return "unknown"
@@ -267,7 +311,7 @@ class FlashRecordCLI:
                 elif action == "screenshot_compressed":
                     self.handle_screenshot_with_args(cmd)
                 elif action == "gif_record":
-                    self.handle_screen_record()
+                    self.handle_screen_record(region=self._parse_options(cmd)["region"])
                 elif action == "help":
                     self.show_help()
                 else:
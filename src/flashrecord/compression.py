@@ -7,6 +7,7 @@ Key techniques:
 2. Adaptive tile sizing (8/16/32px based on complexity)
 3. Temporal redundancy removal with frame subsampling
 4. RGB preservation with global palette optimization
+   (optionally one palette per scene, split at histogram scene cuts)
 
 REX Engine Patches Applied (v0.3.2):
 - Patch 1-5: Core functionality
@@ -19,25 +20,782 @@ Enhanced Edition Improvements:
 - Performance optimizations (9.txt #1)
 """
 
+import copy
 import logging
-from io import BytesIO
-from typing import List, Optional, Tuple
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageFilter
 
+from .gif_writer import GifStreamWriter, frame_palettes, sampled_gif_size
+from .output_backends import GifBackend, OutputBackend, get_backend
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
 
+def _histogram_bins(values: np.ndarray, n_bins=32) -> np.ndarray:
+    """
+    Histogram bin index of every value
+    Same assignment as np.histogram(range=(0, 255)): 255 lands in the last bin
+    """
+    bins = np.floor(values * (n_bins / 255.0)).astype(np.int64)
+    np.clip(bins, 0, n_bins - 1, out=bins)
+    return bins
+
+
+def _tile_entropy(bin_tiles: np.ndarray, n_bins=32) -> np.ndarray:
+    """
+    Shannon entropy of every tile with a single batched bincount
+
+    Args:
+        bin_tiles: (tiles_h, th, tiles_w, tw) block view of histogram bin indices
+        n_bins: Number of histogram bins
+
+    Returns:
+        (tiles_h, tiles_w) entropy array
+    """
+    n_tiles_h, _, n_tiles_w, _ = bin_tiles.shape
+    n_tiles = n_tiles_h * n_tiles_w
+
+    # Offset every tile into its own run of n_bins counters
+    tile_ids = np.arange(n_tiles, dtype=np.int64).reshape(n_tiles_h, 1, n_tiles_w, 1)
+    keys = (tile_ids * n_bins + bin_tiles).ravel()
+    hist = np.bincount(keys, minlength=n_tiles * n_bins).reshape(n_tiles, n_bins)
+
+    p = hist.astype(np.float64)
+    p = p / (p.sum(axis=1, keepdims=True) + 1e-12)  # Count-based normalization
+    entropy = -(p * np.log2(p + 1e-12)).sum(axis=1)
+    return entropy.reshape(n_tiles_h, n_tiles_w)
+
+
+def _tile_saliency(variance, edge_density, entropy, shape: Tuple[int, int]) -> np.ndarray:
+    """Weighted tile statistics combination, normalized to [0, 1]"""
+    saliency = np.zeros(shape, dtype=np.float32)
+    saliency[:] = 0.5 * variance + 0.3 * edge_density + 0.2 * entropy
+    if saliency.max() > 0:
+        saliency = saliency / saliency.max()
+    return saliency
+
+
+def _integral_image(values: np.ndarray) -> np.ndarray:
+    """Zero-padded summed-area table: table[y, x] = values[:y, :x].sum()"""
+    h, w = values.shape
+    table = np.zeros((h + 1, w + 1), dtype=np.float64)
+    inner = table[1:, 1:]
+    np.cumsum(values, axis=1, dtype=np.float64, out=inner)
+    np.cumsum(inner, axis=0, out=inner)
+    return table
+
+
+class SaliencyTables:
+    """
+    Per-frame summed-area tables for O(1) tile statistics
+
+    Holds integral images of pixels, squared pixels and edge magnitudes (plus the
+    entropy bin map) for the fine frame and its half-resolution coarse level.
+    Variance and edge density for any tile size then come from four lookups per
+    tile, so both CW scales and any tile size reuse the same tables.
+    """
+
+    def __init__(self, gray: np.ndarray, n_bins=32):
+        """
+        Build tables for a grayscale frame
+
+        Args:
+            gray: Grayscale image array (uint8 or integer-valued float)
+            n_bins: Number of entropy histogram bins
+        """
+        self.n_bins = n_bins
+        fine = np.asarray(gray).astype(np.uint8, copy=False)
+        fine_img = Image.fromarray(fine)
+
+        # Coarse level is the BILINEAR half-resolution frame (CW coarse scale)
+        coarse_img = fine_img.resize(
+            (fine_img.width // 2, fine_img.height // 2), Image.Resampling.BILINEAR
+        )
+
+        self._bin_lut = _histogram_bins(np.arange(256, dtype=np.float32), n_bins).astype(np.uint8)
+        self.levels = [
+            self._build_level(fine, fine_img),
+            self._build_level(np.asarray(coarse_img), coarse_img),
+        ]
+
+    def _build_level(self, values: np.ndarray, img: Image.Image) -> dict:
+        """Integral images and bin map for one scale level"""
+        edges = np.asarray(img.filter(ImageFilter.FIND_EDGES))
+        wide = values.astype(np.uint32)
+        return {
+            "shape": values.shape,
+            "sum": _integral_image(values),
+            "sum_sq": _integral_image(wide * wide),
+            "edge_sum": _integral_image(edges),
+            "bins": self._bin_lut[values],
+        }
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Fine level (height, width)"""
+        return self.levels[0]["shape"]  # type: ignore[no-any-return]
+
+    @staticmethod
+    def _box_sums(table: np.ndarray, th: int, tw: int, n_h: int, n_w: int) -> np.ndarray:
+        """Per-tile sums from four corner lookups"""
+        corners = table[::th, ::tw][: n_h + 1, : n_w + 1]
+        return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+    def tile_stats(self, tile_size=16, level=0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Variance, edge density and entropy of every tile
+
+        Args:
+            tile_size: Tile size in pixels
+            level: 0 = fine frame, 1 = half-resolution coarse frame
+
+        Returns:
+            Tuple of (variance, edge_density, entropy) arrays of shape (tiles_h, tiles_w)
+        """
+        lv = self.levels[level]
+        h, w = lv["shape"]
+        n_h = max(1, h // tile_size)
+        n_w = max(1, w // tile_size)
+        th = min(tile_size, h)
+        tw = min(tile_size, w)
+        n = float(th * tw)
+
+        s = self._box_sums(lv["sum"], th, tw, n_h, n_w)
+        s_sq = self._box_sums(lv["sum_sq"], th, tw, n_h, n_w)
+        mean = s / n
+        variance = np.maximum(s_sq / n - mean * mean, 0.0)
+        edge_density = self._box_sums(lv["edge_sum"], th, tw, n_h, n_w) / n
+
+        bin_tiles = lv["bins"][: n_h * th, : n_w * tw].reshape(n_h, th, n_w, tw)
+        entropy = _tile_entropy(bin_tiles, self.n_bins)
+
+        return variance, edge_density, entropy
+
+    def saliency(self, tile_size=16, level=0) -> np.ndarray:
+        """
+        Tile saliency map: 0.5 variance + 0.3 edge density + 0.2 entropy, normalized
+
+        Args:
+            tile_size: Tile size in pixels
+            level: 0 = fine frame, 1 = half-resolution coarse frame
+
+        Returns:
+            Saliency map normalized to [0, 1]
+        """
+        h, w = self.levels[level]["shape"]
+        shape = (max(1, h // tile_size), max(1, w // tile_size))
+        if min(tile_size, h) * min(tile_size, w) < tile_size * tile_size // 4:
+            return np.zeros(shape, dtype=np.float32)  # Skip very small tiles
+
+        variance, edge_density, entropy = self.tile_stats(tile_size, level)
+        return _tile_saliency(variance, edge_density, entropy, shape)
+
+
+def _bayer_matrix(n=8) -> np.ndarray:
+    """n x n Bayer threshold matrix normalized to [-0.5, 0.5) (n = power of two)"""
+    m = np.zeros((1, 1), dtype=np.float64)
+    while m.shape[0] < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return (m + 0.5) / (n * n) - 0.5  # type: ignore[no-any-return]
+
+
+class InverseColormap:
+    """
+    Precomputed RGB -> palette index lookup table
+    Built once per palette; frames then map to indices with one fancy-index
+
+    Each of the (2**bits)^3 cells holds the palette entry nearest to the cell
+    center. bits=6 matches the resolution of Pillow's own palette cache.
+    """
+
+    def __init__(self, pal: list, bits=6):
+        """
+        Build the lookup table
+
+        Args:
+            pal: 768-element palette list (RGB triplets)
+            bits: Bits per channel kept in the lookup key (5 -> 32^3, 6 -> 64^3)
+        """
+        self.bits = bits
+        self.palette = np.asarray(pal, dtype=np.float32)[: (len(pal) // 3) * 3].reshape(-1, 3)
+
+        shift = 8 - bits
+        centers = (np.arange(1 << bits, dtype=np.float32) * (1 << shift)) + (1 << shift) / 2.0
+        grid = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1)
+        grid = grid.reshape(-1, 3)
+
+        # Nearest entry by squared distance: |c|^2 - 2 c.p + |p|^2 (|c|^2 is constant)
+        pal_sq = (self.palette**2).sum(axis=1)
+        table = np.empty(len(grid), dtype=np.uint8)
+        chunk = 16384
+        for start in range(0, len(grid), chunk):
+            cells = grid[start : start + chunk]
+            dist = pal_sq[None, :] - 2.0 * (cells @ self.palette.T)
+            table[start : start + chunk] = np.argmin(dist, axis=1)
+        self.table = table
+
+        # Typical palette step: median nearest-neighbour distance between entries
+        unique = np.unique(self.palette, axis=0)
+        if len(unique) > 1:
+            d = ((unique[:, None, :] - unique[None, :, :]) ** 2).sum(axis=-1)
+            np.fill_diagonal(d, np.inf)
+            self.step = float(np.median(np.sqrt(d.min(axis=1))))
+        else:
+            self.step = 0.0
+
+        self._bias_cache: dict = {}
+
+    def _lookup(self, q: np.ndarray) -> np.ndarray:
+        """Table lookup for an (H, W, 3) array already reduced to `bits` per channel"""
+        keys = q[..., 0].astype(np.uint32)
+        keys <<= self.bits
+        keys |= q[..., 1]
+        keys <<= self.bits
+        keys |= q[..., 2]
+        return np.take(self.table, keys)  # type: ignore[no-any-return]
+
+    def map(self, rgb: np.ndarray) -> np.ndarray:
+        """
+        Map an RGB frame to palette indices without dithering
+
+        Args:
+            rgb: (H, W, 3) uint8 array
+
+        Returns:
+            (H, W) uint8 index array
+        """
+        return self._lookup(rgb >> (8 - self.bits))
+
+    def map_ordered(self, rgb: np.ndarray, spread: Optional[float] = None) -> np.ndarray:
+        """
+        Map an RGB frame to palette indices with ordered (Bayer 8x8) dithering
+        The threshold depends only on pixel position, so static regions map to
+        identical indices in every frame.
+
+        Args:
+            rgb: (H, W, 3) uint8 array
+            spread: Threshold amplitude in 0-255 units (default: palette step)
+
+        Returns:
+            (H, W) uint8 index array
+        """
+        h, w = rgb.shape[:2]
+        if spread is None:
+            spread = self.step
+
+        key = (h, w, round(float(spread), 3))
+        bias = self._bias_cache.get(key)
+        if bias is None:
+            tiled = np.tile(_bayer_matrix(8), ((h + 7) // 8, (w + 7) // 8))[:h, :w]
+            bias = np.repeat(np.round(tiled * spread).astype(np.int16)[..., None], 3, axis=2)
+            self._bias_cache = {key: bias}  # One frame size per job
+
+        dithered = rgb.astype(np.int16)
+        dithered += bias
+        np.clip(dithered, 0, 255, out=dithered)
+        dithered >>= 8 - self.bits
+        return self._lookup(dithered.astype(np.uint8))
+
+
+def _merge_weights(weights: np.ndarray, keep) -> np.ndarray:
+    """
+    Per-frame weights after a selection, with dropped weight kept in the timeline
+    Each dropped frame's weight goes to the nearest kept frame before it (the
+    first kept frame for leading drops)
+
+    Args:
+        weights: (N,) weights before the selection
+        keep: Sorted kept positions
+
+    Returns:
+        (len(keep),) merged weights
+    """
+    keep = np.asarray(keep, dtype=np.intp)
+    owner = np.searchsorted(keep, np.arange(len(weights)), side="right") - 1
+    merged = np.bincount(np.maximum(owner, 0), weights=weights, minlength=len(keep))
+    return merged.astype(np.int64)  # type: ignore[no-any-return]
+
+
+def _frame_size(frames) -> Tuple[int, int]:
+    """(width, height) of a FrameStack, or of the first frame of a PIL/ndarray list"""
+    if isinstance(frames, FrameStack):
+        return frames.size
+    first = frames[0]
+    if isinstance(first, np.ndarray):
+        return first.shape[1], first.shape[0]
+    return first.size  # type: ignore[no-any-return]
+
+
+class FrameStack:
+    """
+    Frames held in one preallocated, contiguous (T, H, W, 3) uint8 array
+
+    Indexing returns (H, W, 3) views. Slices and subset() share the buffer
+    through an index array instead of copying pixels, and luma is computed at
+    most once per buffer frame (PIL's integer RGB -> L weights, so saliency is
+    unchanged) and shared by every subset. PIL images are only created at the
+    I/O boundary: from_images(), image() and resized().
+    """
+
+    def __init__(self, data: np.ndarray, index=None, _shared: Optional[dict] = None):
+        """
+        Wrap an existing array (not copied)
+
+        Args:
+            data: (N, H, W, 3) uint8 array
+            index: Buffer rows making up this stack, in order (default: all)
+        """
+        if data.ndim != 4 or data.shape[3] != 3 or data.dtype != np.uint8:
+            raise ValueError(f"FrameStack needs (T, H, W, 3) uint8, got {data.dtype} {data.shape}")
+        self.data = data
+        self.index = np.arange(len(data)) if index is None else np.asarray(index, dtype=np.intp)
+        self._shared = {"luma": {}} if _shared is None else _shared
+
+    @classmethod
+    def from_images(cls, frames: List[Image.Image], convert=None) -> "FrameStack":
+        """
+        Copy PIL frames into a new stack (one copy per frame)
+
+        Args:
+            frames: Frames of equal size
+            convert: Callable(frame, mode) -> frame used for non-RGB frames
+                     (default: Image.convert)
+
+        Returns:
+            FrameStack over a fresh buffer
+        """
+        if not frames:
+            raise ValueError("FrameStack needs at least one frame")
+        w, h = frames[0].size
+        data = np.empty((len(frames), h, w, 3), dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            if frame.size != (w, h):
+                raise ValueError(f"Frame {i}: size {frame.size} differs from first {(w, h)}")
+            if frame.mode != "RGB":
+                frame = convert(frame, "RGB") if convert else frame.convert("RGB")
+            data[i] = np.asarray(frame)
+        return cls(data)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self):
+        for row in self.index:
+            yield self.data[row]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return FrameStack(self.data, self.index[key], self._shared)
+        return self.data[self.index[key]]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Frame (width, height), like PIL's Image.size"""
+        return self.data.shape[2], self.data.shape[1]
+
+    def subset(self, keep) -> "FrameStack":
+        """
+        Stack of selected frames sharing this buffer
+
+        Args:
+            keep: Boolean mask or positions
+
+        Returns:
+            FrameStack view
+        """
+        keep = np.asarray(keep)
+        if keep.dtype == bool:
+            keep = np.flatnonzero(keep)
+        return FrameStack(self.data, self.index[keep], self._shared)
+
+    def luma(self, i: int) -> np.ndarray:
+        """
+        (H, W) uint8 luma of frame i, cached per buffer frame
+
+        Args:
+            i: Position in this stack
+
+        Returns:
+            Luma array (same values as PIL convert('L'))
+        """
+        row = int(self.index[i])
+        cache = self._shared["luma"]
+        if row not in cache:
+            rgb = self.data[row].astype(np.uint32)
+            y = rgb[..., 0] * 19595
+            y += rgb[..., 1] * 38470
+            y += rgb[..., 2] * 7471
+            y += 0x8000
+            y >>= 16
+            cache[row] = y.astype(np.uint8)
+        return cache[row]  # type: ignore[no-any-return]
+
+    def resized(self, size: Tuple[int, int], resample=Image.Resampling.BOX) -> "FrameStack":
+        """
+        Every frame resized into a new preallocated stack
+
+        Args:
+            size: Target (width, height)
+            resample: PIL resampling filter
+
+        Returns:
+            New FrameStack
+        """
+        w, h = size
+        out = np.empty((len(self), h, w, 3), dtype=np.uint8)
+        for i, frame in enumerate(self):
+            out[i] = np.asarray(Image.fromarray(frame).resize(size, resample))
+        return FrameStack(out)
+
+    def image(self, i: int) -> Image.Image:
+        """Frame i as an RGB PIL image (I/O boundary)"""
+        return Image.fromarray(self[i])
+
+    def to_images(self) -> List[Image.Image]:
+        """All frames as RGB PIL images (I/O boundary)"""
+        return [self.image(i) for i in range(len(self))]
+
+
+class FramePipeline:
+    """
+    Lazy frame pipeline: selections narrow the frame set, transforms run on survivors only
+
+    Transform stages are queued and applied frame by frame when frames() is
+    called, so a frame dropped by any selection is never transformed.
+    Index-only selections (e.g. fps subsampling) can run ahead of queued
+    transforms because every transform acts on one frame independently; the
+    output is the same as running the stages eagerly in order. Content-based
+    selections (e.g. saliency keep masks) call frames() first.
+    """
+
+    def __init__(self, frames: List[Image.Image], weights=None):
+        """
+        Args:
+            frames: Input frames, PIL list or FrameStack (not copied or modified)
+            weights: Optional per-frame weights (e.g. measured display times in
+                     ms); default one per source frame
+        """
+        self.source = frames
+        self.indices = list(range(len(frames)))
+        # Source frames (or source time) per survivor
+        if weights is None:
+            self.weights = np.ones(len(frames), dtype=np.int64)
+        else:
+            self.weights = np.asarray(weights, dtype=np.int64)
+            if len(self.weights) != len(frames):
+                raise ValueError(f"Got {len(self.weights)} weights for {len(frames)} frames")
+        self._pending: List[Tuple[str, Callable[[int, Image.Image], Image.Image]]] = []
+        self._done: dict = {}  # Source index -> frame with all applied transforms
+        self.selections: List[Tuple[str, int, int]] = []
+        self.transforms: dict = {}  # name -> {'queued': eager count, 'run': actual count}
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def transform(self, name: str, fn: Callable[[int, Image.Image], Image.Image]):
+        """
+        Queue a per-frame transform for the current survivors
+
+        Args:
+            name: Stage name used in stats()
+            fn: Called as fn(source_index, frame) -> frame
+
+        Returns:
+            self (for chaining)
+        """
+        self._pending.append((name, fn))
+        stage = self.transforms.setdefault(name, {"queued": 0, "run": 0})
+        stage["queued"] += len(self.indices)
+        return self
+
+    def select(self, name: str, keep, merge: bool = False):
+        """
+        Keep a subset of the current survivors
+
+        Args:
+            name: Stage name used in stats()
+            keep: Boolean mask over the survivors, or sorted positions into them
+            merge: Add each dropped frame's weight to the nearest kept frame
+                   before it (the first kept frame for leading drops), so its
+                   display time is inherited instead of spread over all frames
+
+        Returns:
+            self (for chaining)
+        """
+        keep = np.asarray(keep)
+        if keep.dtype == bool:
+            if len(keep) != len(self.indices):
+                raise ValueError(f"{name}: mask of {len(keep)} for {len(self.indices)} frames")
+            keep = np.flatnonzero(keep)
+        keep = keep.astype(np.intp)
+        if merge and len(keep):
+            self.weights = _merge_weights(self.weights, keep)
+        else:
+            self.weights = self.weights[keep]
+        before = len(self.indices)
+        self.indices = [self.indices[int(j)] for j in keep]
+        survivors = set(self.indices)
+        self._done = {i: f for i, f in self._done.items() if i in survivors}
+        self.selections.append((name, before, len(self.indices)))
+        return self
+
+    def frames(self) -> List[Image.Image]:
+        """
+        Apply queued transforms to the survivors and return them in order
+
+        Returns:
+            Surviving frames with every queued transform applied
+        """
+        if self._pending:
+            for i in self.indices:
+                frame = self._done.get(i, self.source[i])
+                for name, fn in self._pending:
+                    frame = fn(i, frame)
+                    self.transforms[name]["run"] += 1
+                self._done[i] = frame
+            self._pending = []
+        return [self._done.get(i, self.source[i]) for i in self.indices]
+
+    def stats(self) -> dict:
+        """
+        Work report: frames in/out, per-selection counts, transforms run and skipped
+
+        Skipped counts only settle once frames() has run after the last transform.
+        """
+        return {
+            "frames_in": len(self.source),
+            "frames_out": len(self.indices),
+            "selections": {name: [before, after] for name, before, after in self.selections},
+            "transforms": {
+                name: {"run": t["run"], "skipped": t["queued"] - t["run"]}
+                for name, t in self.transforms.items()
+            },
+        }
+
+
+class PalettePlan:
+    """
+    Palette assignment for a run of frames: one palette per scene
+
+    Scenes with similar colors share a palette (see _scene_palettes), so
+    `palettes` holds only distinct palettes and `scene_of` maps every frame to
+    one of them. The palette used by the most frames is the natural GIF global
+    color table; the others become local tables.
+    """
+
+    def __init__(self, palettes: List[list], palette_of, starts=(0,)):
+        """
+        Args:
+            palettes: Distinct 768-element palette lists
+            palette_of: (N,) palette index of each frame
+            starts: First frame of each scene
+        """
+        self.palettes = palettes
+        self.palette_of = np.asarray(palette_of, dtype=np.intp)
+        self.starts = [int(s) for s in starts]
+
+    @classmethod
+    def single(cls, pal: list, n_frames: int) -> "PalettePlan":
+        """Plan with one palette for all frames"""
+        return cls([pal], np.zeros(n_frames, dtype=np.intp))
+
+    def __len__(self) -> int:
+        return len(self.palette_of)
+
+    @property
+    def palette(self) -> list:
+        """Palette used by the most frames (the global color table)"""
+        counts = np.bincount(self.palette_of, minlength=len(self.palettes))
+        return self.palettes[int(np.argmax(counts))]
+
+    def palette_at(self, i: int) -> list:
+        """Palette of frame i"""
+        return self.palettes[int(self.palette_of[i])]
+
+    def groups(self) -> List[Tuple[list, np.ndarray]]:
+        """(palette, frame positions) for every palette in use"""
+        return [
+            (pal, np.flatnonzero(self.palette_of == k))
+            for k, pal in enumerate(self.palettes)
+            if (self.palette_of == k).any()
+        ]
+
+
+class FramePyramid:
+    """
+    Per-job resolution pyramid shared across compress_to_target iterations
+
+    The input is frame-rate reduced and scaled (LANCZOS) once into a base
+    FrameStack, through a FramePipeline so frames dropped by subsampling are
+    never resized.
+    Every smaller level is resampled straight from the base with the BOX
+    (area-averaging) filter, never from another level, so resampling error does
+    not accumulate (REX Engine Fix 7.1). Each level caches its saliency maps (or
+    motion energy), keep mask, kept frames, scene cuts and palettes, so
+    revisiting a setting only requantizes and encodes.
+    """
+
+    def __init__(
+        self,
+        compressor,
+        frames: List[Image.Image],
+        input_fps=None,
+        target_fps=8,
+        selection="saliency",
+        weights=None,
+    ):
+        """
+        Build the base level
+
+        Args:
+            compressor: CWAMInspiredCompressor providing the stages (its current
+                        scale_factor sets the base level)
+            frames: Input frames
+            input_fps: Original FPS (if None, defaults to 10)
+            target_fps: FPS after temporal subsampling
+            selection: Keyframe selection mode (see _keyframe_mask)
+            weights: Optional per-frame display times in ms (see _frame_times_ms)
+        """
+        self.compressor = compressor
+        self.selection = selection
+        self.orig_size = _frame_size(frames)
+        self.base_scale = compressor.scale_factor
+        pipeline = compressor._preprocess_pipeline(frames, target_fps, input_fps, weights)
+        self.base = FrameStack.from_images(pipeline.frames(), convert=compressor._safe_convert)
+        self.base_weights = pipeline.weights
+        self.pipeline_stats = pipeline.stats()
+        self.levels: dict = {}
+        self.hits = 0
+
+    def size_for(self, scale: float) -> Tuple[int, int]:
+        """Frame size at a scale factor (same rounding as _scaled_size)"""
+        w, h = self.orig_size
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def level(self, scale: float) -> dict:
+        """
+        Frames and analysis for one scale, built on first use
+
+        Args:
+            scale: Scale factor relative to the input frames (<= base scale)
+
+        Returns:
+            Dict with 'size', 'saliency' or 'motion' (per the selection mode),
+            'keep', 'frames' (kept frames as a FrameStack view), 'weights'
+            (source frames each kept frame stands for), 'palettes'
+            (colors -> palette list), 'scenes' (scene starts, or None until
+            first needed) and 'plans' (colors -> per-scene PalettePlan)
+        """
+        size = self.size_for(min(scale, self.base_scale))
+        lv = self.levels.get(size)
+        if lv is not None:
+            self.hits += 1
+            return lv  # type: ignore[no-any-return]
+
+        if size == self.base.size:
+            frames = self.base
+        else:
+            logger.info(f"[*] Pyramid level: {self.base.size} -> {size}")
+            frames = self.base.resized(size, Image.Resampling.BOX)
+
+        keep, analysis = self.compressor._keyframe_mask(frames, self.selection)
+        if self.selection == "motion":
+            # Static stretches fold into the keyframe before them
+            weights = _merge_weights(self.base_weights, np.flatnonzero(keep))
+        else:
+            weights = self.base_weights[keep]
+        lv = {
+            "size": size,
+            "saliency": analysis if self.selection == "saliency" else None,
+            "motion": analysis if self.selection == "motion" else None,
+            "keep": keep,
+            "frames": frames.subset(keep),
+            "weights": weights,
+            "palettes": {},
+            "scenes": None,
+            "plans": {},
+        }
+        self.levels[size] = lv
+        return lv
+
+    def palette(self, scale: float, colors: int) -> list:
+        """
+        Global palette of a level's kept frames, cached per color count
+
+        Args:
+            scale: Scale factor (see level())
+            colors: Number of palette colors
+
+        Returns:
+            768-element palette list
+        """
+        lv = self.level(scale)
+        if colors not in lv["palettes"]:
+            lv["palettes"][colors] = self.compressor._build_global_palette(
+                lv["frames"], colors=colors, seed=1234
+            )
+        return lv["palettes"][colors]  # type: ignore[no-any-return]
+
+    def palette_plan(self, scale: float, colors: int, scenes: bool = False) -> PalettePlan:
+        """
+        Palette plan of a level's kept frames, cached per color count
+
+        Args:
+            scale: Scale factor (see level())
+            colors: Colors per palette
+            scenes: One palette per scene (else the level's global palette)
+
+        Returns:
+            PalettePlan covering the kept frames
+        """
+        lv = self.level(scale)
+        if not scenes:
+            return PalettePlan.single(self.palette(scale, colors), len(lv["frames"]))
+        if lv["scenes"] is None:
+            lv["scenes"] = self.compressor._scene_cuts(lv["frames"])
+        if colors not in lv["plans"]:
+            lv["plans"][colors] = self.compressor._scene_palettes(
+                lv["frames"], colors, starts=lv["scenes"]
+            )
+        return lv["plans"][colors]  # type: ignore[no-any-return]
+
+
+# Per-process state for saliency pool workers (set by _saliency_worker_init)
+_worker_state: dict = {}
+
+
+def _saliency_worker_init(compressor, shm_name: str, shape: Tuple[int, int, int]):
+    """Attach a pool worker to the shared grayscale frame stack"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state["shm"] = shm
+    _worker_state["compressor"] = compressor
+    _worker_state["stack"] = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _saliency_worker_run(start: int, stop: int) -> List[np.ndarray]:
+    """Saliency maps for frames [start, stop) of the shared stack"""
+    compressor = _worker_state["compressor"]
+    stack = _worker_state["stack"]
+    return [compressor._frame_saliency_or_fallback(i, stack[i]) for i in range(start, stop)]
+
+
 class CWAMInspiredCompressor:
     """
     CWAM-inspired lightweight GIF compressor with enhanced stability
     Implements cross-scale window attention concepts without deep learning
     """
 
-    def __init__(self, target_size_mb=10, quality="balanced", max_memory_mb=1024):
+    def __init__(
+        self, target_size_mb=10, quality="balanced", max_memory_mb=1024, workers=1, threads=1
+    ):
         """
         Initialize compressor
 
@@ -45,9 +803,13 @@ class CWAMInspiredCompressor:
             target_size_mb: Target file size in MB
             quality: 'high' (70%), 'balanced' (50%), 'compact' (30%)
             max_memory_mb: Maximum memory usage limit in MB
+            workers: Saliency and GIF-encoding worker processes (1 = serial, 0 or None = all CPUs)
+            threads: Palette-mapping threads (1 = serial, 0 or None = all CPUs)
         """
         self.target_size_mb = target_size_mb
         self.max_memory_mb = max_memory_mb
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.threads = threads if threads else (os.cpu_count() or 1)
         self.quality_presets = {
             "high": 0.70,  # 70% resolution
             "balanced": 0.50,  # 50% resolution
@@ -59,8 +821,34 @@ class CWAMInspiredCompressor:
         self.min_colors = 16  # Minimum palette colors
         self.adaptive_tile_enabled = True  # Auto tile size selection
 
+        # Duplicate coalescing: max luma thumbnail difference (0-255) for a frame
+        # to merge into the previous run; None disables the stage
+        self.coalesce_tolerance: Optional[int] = 2
+
+        # Motion keyframes: mean thumbnail difference (gray levels) below which a
+        # frame counts as static, and the step-to-step cosine marking a direction change
+        self.motion_static = 0.5
+        self.motion_turn = 0.5
+
+        # Size prediction: frames sampled per estimate, and how far above target
+        # a prediction may be and still earn a full encode
+        self.predict_sample = 8
+        self.predict_margin = 1.1
+
+        # Scene palettes: histogram distance (0-1) between consecutive frames that
+        # starts a new scene, and below which two scenes share one palette
+        self.scene_cut = 0.4
+        self.scene_reuse = 0.25
+
+        # Input frames per output frame of the last compress_frames call
+        self.frame_weights: List[int] = []
+
+        # Inverse colormaps of recent palettes (ordered dithering fast path);
+        # a few are kept so per-scene palettes do not rebuild them in turn
+        self._lut_cache: Dict[tuple, InverseColormap] = {}
+
         logger.info(
-            f"Compressor initialized: target={target_size_mb}MB, quality={quality}, scale={self.scale_factor}"
+            f"Compressor initialized: target={target_size_mb}MB, quality={quality}, scale={self.scale_factor}, workers={self.workers}, threads={self.threads}"
         )
 
     def _safe_convert(self, frame: Image.Image, mode: str) -> Image.Image:
@@ -81,17 +869,35 @@ class CWAMInspiredCompressor:
             # Return gray placeholder
             return Image.new(mode, frame.size, 128 if mode == "L" else (128, 128, 128))
 
+    def _rgb(self, frame) -> np.ndarray:
+        """(H, W, 3) uint8 pixels of a FrameStack frame (as is) or a PIL image"""
+        if isinstance(frame, np.ndarray):
+            return frame
+        return np.asarray(self._safe_convert(frame, "RGB"))
+
+    def _image(self, frame) -> Image.Image:
+        """RGB PIL image of a FrameStack frame or a PIL image"""
+        if isinstance(frame, np.ndarray):
+            return Image.fromarray(frame)
+        return self._safe_convert(frame, "RGB")
+
+    def _gray(self, frames, i: int) -> np.ndarray:
+        """(H, W) uint8 luma of frame i (cached by FrameStack)"""
+        if isinstance(frames, FrameStack):
+            return frames.luma(i)
+        return np.asarray(self._safe_convert(frames[i], "L"))
+
     def _validate_frames(self, frames: List[Image.Image]) -> bool:
         """
         Validate input frames
 
         Args:
-            frames: List of PIL Images
+            frames: List of PIL Images, or a FrameStack (e.g. a FrameRing view)
 
         Returns:
             True if valid, False otherwise
         """
-        if not frames:
+        if frames is None or not len(frames):
             logger.warning("Empty frame list provided")
             return False
 
@@ -99,12 +905,12 @@ class CWAMInspiredCompressor:
             logger.warning(f"Very large frame count: {len(frames)} (memory risk)")
 
         # Check first frame
-        if not isinstance(frames[0], Image.Image):
+        if not isinstance(frames, FrameStack) and not isinstance(frames[0], Image.Image):
             logger.error("Invalid frame type")
             return False
 
         # Estimate memory usage
-        w, h = frames[0].size
+        w, h = _frame_size(frames)
         estimated_mb = (w * h * 3 * len(frames)) / (1024 * 1024)
         if estimated_mb > self.max_memory_mb:
             logger.error(
@@ -155,36 +961,61 @@ class CWAMInspiredCompressor:
             logger.warning(f"Adaptive tile sizing failed: {e}, using default 16")
             return 16
 
-    def compress_frames(self, frames: List[Image.Image]) -> List[Image.Image]:
+    def compress_frames(
+        self, frames: List[Image.Image], dither=None, selection="saliency"
+    ) -> List[Image.Image]:
         """
         Compress frames using CWAM-inspired techniques
 
         Args:
             frames: List of PIL Image frames
+            dither: None returns RGB frames; otherwise kept frames are mapped to one
+                    shared global palette with this dither mode (True/'floyd-steinberg',
+                    False/'none', 'ordered') and returned in palette mode
+            selection: Keyframe selection - 'saliency' (mean spatial saliency) or
+                       'motion' (motion peaks and direction changes)
 
         Returns:
-            Compressed frames
+            Compressed frames; self.frame_weights then holds how many input
+            frames each output frame stands for (runs of duplicates merged by
+            coalescing count as one frame with their combined weight)
         """
+        self.frame_weights = [1] * len(frames)
         if not self._validate_frames(frames):
             logger.error("Frame validation failed")
             return frames
 
+        if dither is not None:
+            self._dither_mode(dither)  # Reject unknown modes before doing any work
+        self._selection_mode(selection)
+
         try:
             logger.info(f"[*] CWAM-inspired compression: {len(frames)} frames")
 
-            # Step 1: Resolution scaling (spatial compression)
-            compressed = self._scale_frames(frames)
-
-            # Step 2: Temporal subsampling (10fps -> 8fps)
-            compressed = self._reduce_frame_rate(compressed, target_fps=8)
-
-            # Step 3: Cross-window saliency analysis (CWAM core idea)
-            saliency_maps = self._compute_cw_saliency_maps(compressed)
+            # Steps 1-2: Resolution scaling (spatial compression) + temporal
+            # subsampling (10fps -> 8fps) + duplicate coalescing; lazy, so dropped
+            # frames are never resized
+            pipeline = self._preprocess_pipeline(frames, target_fps=8)
+            stack = FrameStack.from_images(pipeline.frames(), convert=self._safe_convert)
+
+            # Steps 3-4: Cross-window saliency analysis (CWAM core idea) and
+            # saliency-guided frame preservation (REX Engine patch), or motion keyframes
+            keep_mask, _ = self._keyframe_mask(stack, selection)
+            pipeline.select(selection, keep_mask, merge=selection == "motion")
+            kept = stack.subset(keep_mask)
+            self.frame_weights = pipeline.weights.tolist()
+            logger.info(
+                f"[*] {selection.capitalize()}-guided keep: {keep_mask.sum()}/{len(keep_mask)} frames"
+            )
+            logger.info(f"[*] Lazy pipeline: {pipeline.stats()['transforms']}")
 
-            # Step 4: Saliency-guided frame preservation (REX Engine patch)
-            keep_mask = self._keep_mask_from_saliency(saliency_maps, thr=0.25)
-            compressed = [f for i, f in enumerate(compressed) if keep_mask[i]]
-            logger.info(f"[*] Saliency-guided keep: {keep_mask.sum()}/{len(keep_mask)} frames")
+            # Step 5 (optional): Single global palette for all kept frames
+            if dither is not None:
+                pal = self._build_global_palette(kept, colors=256, seed=1234)
+                compressed = self._apply_global_palette(kept, pal, dither=dither)
+                logger.info(f"[*] Global palette applied (dither={self._dither_mode(dither)})")
+            else:
+                compressed = kept.to_images()
 
             logger.info(f"[+] Compression complete: {len(frames)} -> {len(compressed)} frames")
             return compressed
@@ -193,77 +1024,135 @@ class CWAMInspiredCompressor:
             logger.error(f"Compression failed: {e}", exc_info=True)
             return frames  # Return original on error
 
-    def _scale_frames(self, frames: List[Image.Image]) -> List[Image.Image]:
+    def _scaled_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """Frame size after scaling by self.scale_factor"""
+        return max(1, int(size[0] * self.scale_factor)), max(1, int(size[1] * self.scale_factor))
+
+    def _scale_frame(self, i: int, frame, size: Tuple[int, int]) -> Image.Image:
+        """Resize one frame, PIL or FrameStack row (original frame on failure)"""
+        try:
+            if isinstance(frame, np.ndarray):
+                frame = Image.fromarray(frame)
+            # LANCZOS for high-quality downsampling
+            return frame.resize(size, Image.Resampling.LANCZOS)
+        except Exception as e:
+            logger.warning(f"Frame {i} resize failed: {e}, using original")
+            return frame
+
+    def _preprocess_pipeline(
+        self, frames: List[Image.Image], target_fps=8, input_fps=None, weights=None
+    ) -> FramePipeline:
         """
-        Adaptive resolution scaling
-        Based on Feature Encoding module from paper
+        Lazy scale + temporal subsampling: the output equals resizing every
+        frame (LANCZOS) and then subsampling, but subsampling only picks
+        indices, so it runs first and only surviving frames are resized
+
+        Args:
+            frames: Input frames (PIL list or FrameStack; stack rows are read in place)
+            target_fps: Target FPS
+            input_fps: Input FPS (default: 10 if None)
+            weights: Optional per-frame display times in ms; subsampled frames
+                     then pass their time to the kept frame before them
+
+        Returns:
+            Pipeline holding the scaled, subsampled frames (call frames())
         """
-        if not frames:
-            return frames
+        pipeline = FramePipeline(frames, weights)
+        if not len(frames):
+            return pipeline
+
+        original_size = _frame_size(frames)
+        size = self._scaled_size(original_size)
+        logger.info(f"[*] Resolution scaling: {original_size} -> {size}")
+        pipeline.transform("scale", lambda i, f: self._scale_frame(i, f, size))
+
+        pipeline.select(
+            "fps",
+            self._frame_rate_indices(len(frames), target_fps, input_fps),
+            merge=weights is not None,
+        )
+        logger.info(
+            f"[*] Temporal subsampling: {len(frames)} -> {len(pipeline)} frames ({input_fps or 10}fps -> {target_fps}fps)"
+        )
 
-        try:
-            original_size = frames[0].size
-            new_width = max(1, int(original_size[0] * self.scale_factor))
-            new_height = max(1, int(original_size[1] * self.scale_factor))
+        # Duplicate runs collapse to their first frame, which inherits their time
+        if self.coalesce_tolerance is not None and len(pipeline) > 1:
+            before = len(pipeline)
+            starts = self._run_starts([frames[i] for i in pipeline.indices])
+            pipeline.select("coalesce", starts, merge=True)
+            logger.info(f"[*] Duplicate coalescing: {before} -> {len(pipeline)} frames")
 
-            logger.info(f"[*] Resolution scaling: {original_size} -> ({new_width}, {new_height})")
+        return pipeline
 
-            scaled = []
-            for i, frame in enumerate(frames):
-                try:
-                    # LANCZOS for high-quality downsampling
-                    scaled_frame = frame.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    scaled.append(scaled_frame)
-                except Exception as e:
-                    logger.warning(f"Frame {i} resize failed: {e}, using original")
-                    scaled.append(frame)
+    def _run_starts(self, frames: List[Image.Image], thumb_side=256) -> np.ndarray:
+        """
+        Mark frames that start a new run of (near-)identical frames
 
-            return scaled
+        Frames are compared as box-reduced luma thumbnails (longest side about
+        thumb_side). A frame joins the current run when no thumbnail pixel
+        differs from the run's first frame by more than coalesce_tolerance;
+        comparing against the run start (not the previous frame) keeps slow
+        changes from creeping through.
 
-        except Exception as e:
-            logger.error(f"Scale frames failed: {e}")
-            return frames
+        Args:
+            frames: Frames in display order (same size; PIL images or RGB arrays)
+            thumb_side: Approximate thumbnail size in pixels
 
-    def _reduce_frame_rate(
-        self, frames: List[Image.Image], target_fps=8, input_fps=None
-    ) -> List[Image.Image]:
+        Returns:
+            Boolean mask, True for frames to keep
+        """
+        starts = np.ones(len(frames), dtype=bool)
+        factor = max(1, max(_frame_size(frames)) // thumb_side)
+        tolerance = self.coalesce_tolerance or 0
+
+        ref = None
+        for i, frame in enumerate(frames):
+            if isinstance(frame, np.ndarray):
+                frame = Image.fromarray(frame)
+            try:
+                thumb = np.asarray(self._safe_convert(frame.reduce(factor), "L"), dtype=np.int16)
+            except Exception as e:
+                logger.warning(f"Frame {i} thumbnail failed: {e}")
+                ref = None
+                continue
+            if ref is not None and ref.shape == thumb.shape:
+                if int(np.abs(thumb - ref).max()) <= tolerance:
+                    starts[i] = False
+                    continue
+            ref = thumb
+        return starts
+
+    def _frame_rate_indices(self, n: int, target_fps=8, input_fps=None) -> List[int]:
         """
-        Temporal subsampling - reduce frame rate
-        Removes temporal redundancy (paper: local redundancy capture)
+        Indices kept by temporal subsampling of n frames (depends on count only)
         REX Engine Patch 4: Remove FPS hardcoding, use accumulator for even distribution
 
         Args:
-            frames: Input frames
-            target_fps: Target FPS (default: 8)
+            n: Input frame count
+            target_fps: Target FPS
             input_fps: Input FPS (default: 10 if None)
 
         Returns:
-            Subsampled frames
+            Sorted list of kept frame indices
         """
-        if not frames:
-            return frames
-
-        fps = input_fps or 10  # FlashRecord default, but can be overridden
+        fps = input_fps or 10
         if target_fps >= fps:
-            return frames
+            return list(range(n))
 
         # Accumulator-based sampling for even distribution
         acc, out = 0.0, []
         step = float(fps) / float(target_fps)
 
-        for _, f in enumerate(frames):
+        for i in range(n):
             if acc <= 0.0:
-                out.append(f)
+                out.append(i)
             acc += 1.0
             if acc >= step:
                 acc -= step
 
-        logger.info(
-            f"[*] Temporal subsampling: {len(frames)} -> {len(out)} frames ({fps}fps -> {target_fps}fps)"
-        )
         return out
 
-    def _compute_cw_saliency_maps(self, frames: List[Image.Image]) -> List[np.ndarray]:
+    def _compute_cw_saliency_maps(self, frames) -> List[np.ndarray]:
         """
         Compute Cross-Window (CW) saliency maps
         Core CWAM idea: multi-scale window interaction
@@ -271,132 +1160,127 @@ class CWAMInspiredCompressor:
         Based on paper section on cross-scale window attention
 
         Args:
-            frames: Input frames
+            frames: Input frames (PIL list or FrameStack)
 
         Returns:
             List of saliency maps (one per frame)
         """
-        saliency_maps = []
-
-        for idx, frame in enumerate(frames):
-            try:
-                # Convert to grayscale for analysis
-                gray = self._safe_convert(frame, "L")
-
-                # Original scale features
-                F = np.array(gray, dtype=np.float32)
-
-                # Downscaled features (coarse scale)
-                F_down = np.array(
-                    gray.resize((gray.width // 2, gray.height // 2), Image.Resampling.BILINEAR),
-                    dtype=np.float32,
-                )
-
-                # Adaptive tile size selection (9.txt #3)
-                tile_size = self._adaptive_tile_size(F)
-
-                # Compute saliency at both scales
-                S_fine = self._compute_saliency_single_scale(F, tile_size=tile_size)
-                S_coarse = self._compute_saliency_single_scale(
-                    F_down, tile_size=max(8, tile_size // 2)
-                )
-
-                # Cross-scale interaction (CWAM core)
-                # Upsample coarse to match fine resolution
-                S_coarse_up = self._upsample_saliency(S_coarse, S_fine.shape)  # type: ignore[arg-type]
+        saliency_maps = None
 
-                # Combine: weighted sum (cross-window attention approximation)
-                S_combined = 0.6 * S_fine + 0.4 * S_coarse_up
+        # Frames are independent until temporal smoothing - fan out across processes
+        if self.workers > 1 and len(frames) > 1:
+            saliency_maps = self._parallel_frame_saliency(frames)
 
-                saliency_maps.append(S_combined)
-
-            except Exception as e:
-                logger.warning(f"Saliency computation failed for frame {idx}: {e}")
-                # Fallback: uniform saliency
-                saliency_maps.append(np.ones((10, 10), dtype=np.float32))
+        if saliency_maps is None:
+            saliency_maps = []
+            for idx in range(len(frames)):
+                # Grayscale for analysis (FrameStack luma is computed once per frame)
+                gray = self._gray(frames, idx)
+                saliency_maps.append(self._frame_saliency_or_fallback(idx, gray))
 
         # Temporal smoothing (3-frame window)
         saliency_maps = self._temporal_smooth_saliency(saliency_maps)
 
         return saliency_maps
 
-    def _compute_saliency_single_scale(self, img_array: np.ndarray, tile_size=16) -> np.ndarray:
+    def _frame_saliency_or_fallback(self, idx: int, gray: np.ndarray) -> np.ndarray:
         """
-        Compute saliency at single scale
-        Based on variance + edge density + entropy
-
-        Args:
-            img_array: Grayscale image array
-            tile_size: Tile size in pixels
-
-        Returns:
-            Saliency map
+        Per-frame saliency with the uniform-map fallback
+        Shared by the serial path and pool workers so both give identical results
         """
         try:
-            h, w = img_array.shape
-            n_tiles_h = max(1, h // tile_size)
-            n_tiles_w = max(1, w // tile_size)
-
-            saliency = np.zeros((n_tiles_h, n_tiles_w), dtype=np.float32)
-
-            # Compute edge map
-            img_pil = Image.fromarray(img_array.astype(np.uint8))
-            edges = np.array(img_pil.filter(ImageFilter.FIND_EDGES), dtype=np.float32)
-
-            for ty in range(n_tiles_h):
-                for tx in range(n_tiles_w):
-                    y = ty * tile_size
-                    x = tx * tile_size
-
-                    # Extract tile
-                    tile = img_array[y : y + tile_size, x : x + tile_size]
-                    edge_tile = edges[y : y + tile_size, x : x + tile_size]
-
-                    if tile.size < tile_size * tile_size // 4:  # Skip very small tiles
-                        continue
-
-                    # Variance (texture complexity)
-                    variance = float(np.var(tile))
+            return self._compute_frame_saliency(gray)
+        except Exception as e:
+            logger.warning(f"Saliency computation failed for frame {idx}: {e}")
+            # Fallback: uniform saliency
+            return np.ones((10, 10), dtype=np.float32)
 
-                    # Edge density (structural information)
-                    edge_density = float(np.mean(edge_tile))
+    def _parallel_frame_saliency(self, frames) -> Optional[List[np.ndarray]]:
+        """
+        Compute per-frame saliency maps in a process pool
 
-                    # Entropy (information content)
-                    entropy = self._compute_entropy(tile)
+        Grayscale frames are written once into a shared-memory (T, H, W) stack;
+        workers attach to it by name and receive only index ranges, so no PIL
+        images or pixel buffers are pickled. Results come back in frame order.
 
-                    # Weighted combination
-                    saliency[ty, tx] = 0.5 * variance + 0.3 * edge_density + 0.2 * entropy
+        Args:
+            frames: Input frames (PIL list of one size, or FrameStack)
 
-            # Normalize
-            if saliency.max() > 0:
-                saliency = saliency / saliency.max()
+        Returns:
+            List of saliency maps, or None if the parallel path is unavailable
+        """
+        if isinstance(frames, FrameStack):
+            w, h = frames.size
+        else:
+            w, h = frames[0].size
+            if any(f.size != (w, h) for f in frames):
+                logger.info("[*] Mixed frame sizes, using serial saliency")
+                return None
+
+        shape = (len(frames), h, w)
+        workers = min(self.workers, len(frames))
+        shm = None
+        stack = None
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(frames) * h * w))
+            stack = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            for i in range(len(frames)):
+                stack[i] = self._gray(frames, i)
+
+            # Contiguous chunks, a few per worker for load balancing
+            n_chunks = min(len(frames), workers * 4)
+            bounds = np.linspace(0, len(frames), n_chunks + 1).astype(int)
+            starts, stops = bounds[:-1].tolist(), bounds[1:].tolist()
+
+            logger.info(f"[*] Parallel saliency: {len(frames)} frames on {workers} workers")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_saliency_worker_init,
+                initargs=(self, shm.name, shape),
+            ) as pool:
+                saliency_maps: List[np.ndarray] = []
+                for chunk in pool.map(_saliency_worker_run, starts, stops):
+                    saliency_maps.extend(chunk)
 
-            return saliency
+            return saliency_maps
 
         except Exception as e:
-            logger.warning(f"Saliency single-scale failed: {e}")
-            return np.ones((10, 10), dtype=np.float32) * 0.5
+            logger.warning(f"Parallel saliency failed: {e}, falling back to serial")
+            return None
+
+        finally:
+            stack = None  # Release the buffer export before closing
+            if shm is not None:
+                shm.close()
+                shm.unlink()
 
-    def _compute_entropy(self, patch: np.ndarray, n_bins=32) -> float:
+    def _compute_frame_saliency(self, gray: np.ndarray) -> np.ndarray:
         """
-        Compute Shannon entropy of image patch
-        REX Engine Patch 5: Use count-based normalization for consistency
+        Cross-window saliency map of a single grayscale frame
+        Both scales are read from one set of per-frame summed-area tables
 
         Args:
-            patch: Image patch
-            n_bins: Number of histogram bins
+            gray: Grayscale frame as uint8 array
 
         Returns:
-            Entropy value
+            Combined saliency map at fine tile resolution
         """
-        try:
-            hist, _ = np.histogram(patch, bins=n_bins, range=(0, 255))
-            p = hist.astype(np.float64)
-            p = p / (p.sum() + 1e-12)  # Count-based normalization
-            return float(-(p * np.log2(p + 1e-12)).sum())
-        except Exception as e:
-            logger.warning(f"Entropy computation failed: {e}")
-            return 0.0
+        # Original + downscaled (coarse scale) features
+        tables = SaliencyTables(gray)
+
+        # Adaptive tile size selection (9.txt #3)
+        tile_size = self._adaptive_tile_size(gray.astype(np.float32))
+
+        # Compute saliency at both scales
+        S_fine = tables.saliency(tile_size=tile_size, level=0)
+        S_coarse = tables.saliency(tile_size=max(8, tile_size // 2), level=1)
+
+        # Cross-scale interaction (CWAM core)
+        # Upsample coarse to match fine resolution
+        S_coarse_up = self._upsample_saliency(S_coarse, S_fine.shape)  # type: ignore[arg-type]
+
+        # Combine: weighted sum (cross-window attention approximation)
+        return 0.6 * S_fine + 0.4 * S_coarse_up  # type: ignore[no-any-return]
 
     def _upsample_saliency(self, saliency: np.ndarray, target_shape: Tuple[int, int]) -> np.ndarray:
         """
@@ -501,6 +1385,131 @@ class CWAMInspiredCompressor:
             # Fallback: keep all frames
             return np.ones(len(S_list), dtype=bool)
 
+    def _selection_mode(self, selection) -> str:
+        """Validate a keyframe selection mode ('saliency' or 'motion')"""
+        if selection not in ("saliency", "motion"):
+            raise ValueError(f"Unknown keyframe selection: {selection}")
+        return str(selection)
+
+    def _keyframe_mask(self, frames, selection="saliency") -> Tuple[np.ndarray, object]:
+        """
+        Frames to keep under a selection mode
+
+        Args:
+            frames: Frames (PIL list or FrameStack)
+            selection: 'saliency' or 'motion'
+
+        Returns:
+            Tuple of (boolean keep mask, analysis: saliency maps or motion energy)
+        """
+        if self._selection_mode(selection) == "motion":
+            energy, turns = self._motion_energy(frames)
+            return self._keep_mask_from_motion(energy, turns), energy
+
+        saliency = self._compute_cw_saliency_maps(frames)
+        return self._keep_mask_from_saliency(saliency, thr=0.25), saliency
+
+    def _motion_energy(self, frames, side=64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-frame motion energy and direction changes from downsampled luma
+
+        Frames are block-averaged to about `side` pixels on the long edge; the
+        difference images D[t] = thumb[t] - thumb[t-1] are then processed as one
+        (T, h, w) array. Energy is mean |D[t]| (gray levels, 0 for the first
+        frame). A direction change at t means D[t+1] no longer continues D[t]
+        (cosine below motion_turn: reversal, stop, or motion moving elsewhere).
+
+        Args:
+            frames: Frames (PIL list or FrameStack) of one size
+            side: Approximate thumbnail size in pixels
+
+        Returns:
+            Tuple of (energy (T,), direction_change (T,) bool)
+        """
+        n = len(frames)
+        energy = np.zeros(n, dtype=np.float64)
+        turns = np.zeros(n, dtype=bool)
+        if n < 2:
+            return energy, turns
+
+        first = self._gray(frames, 0)
+        h, w = first.shape
+        f = max(1, max(h, w) // side)
+        th, tw = max(1, h // f), max(1, w // f)
+        thumbs = np.empty((n, th, tw), dtype=np.float32)
+        for i in range(n):
+            gray = first if i == 0 else self._gray(frames, i)
+            block = gray[: th * f, : tw * f].reshape(th, f, tw, f)
+            thumbs[i] = block.mean(axis=(1, 3), dtype=np.float32)
+
+        diffs = np.diff(thumbs, axis=0).reshape(n - 1, -1)
+        energy[1:] = np.abs(diffs).mean(axis=1)
+
+        norms = np.linalg.norm(diffs, axis=1)
+        dots = (diffs[:-1] * diffs[1:]).sum(axis=1)
+        cosine = dots / np.maximum(norms[:-1] * norms[1:], 1e-12)
+        turns[1:-1] = cosine < self.motion_turn
+        return energy, turns
+
+    def _keep_mask_from_motion(self, energy: np.ndarray, turns: np.ndarray) -> np.ndarray:
+        """
+        Motion-guided frame preservation
+        Keeps the first and last frames, motion peaks, direction changes, and the
+        first/last frame of every moving stretch; static stretches are dropped
+
+        Args:
+            energy: Per-frame motion energy (see _motion_energy)
+            turns: Per-frame direction-change flags
+
+        Returns:
+            Boolean mask of frames to keep
+        """
+        n = len(energy)
+        try:
+            if n <= 2:
+                return np.ones(n, dtype=bool)
+
+            moving = energy > self.motion_static
+            before = np.r_[-np.inf, energy[:-1]]
+            after = np.r_[energy[1:], -np.inf]
+            peaks = moving & (energy >= before) & (energy >= after)
+            starts = moving & ~np.r_[False, moving[:-1]]
+            ends = moving & ~np.r_[moving[1:], False]
+
+            keep = peaks | (turns & moving) | starts | ends
+            keep[0] = keep[-1] = True
+
+            # Guarantee minimum sampling (same floor as saliency selection)
+            min_frames = max(2, int(0.6 * n))
+            if keep.sum() < min_frames:
+                order = np.argsort(energy, kind="stable")[::-1]
+                extra = order[~keep[order]][: min_frames - int(keep.sum())]
+                keep[extra] = True
+
+            return keep  # type: ignore[no-any-return]
+
+        except Exception as e:
+            logger.error(f"Motion masking failed: {e}")
+            return np.ones(n, dtype=bool)
+
+    def _timed(self, timings: Dict[str, float], stage: str, fn: Callable, *args, **kwargs):
+        """
+        Call fn and add its wall time to timings[stage] (milliseconds)
+
+        Args:
+            timings: Per-stage totals, updated in place
+            stage: Stage name
+            fn: Callable to run with the remaining arguments
+
+        Returns:
+            fn's result
+        """
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000.0
+
     def _round10ms(self, ms: float) -> int:
         """
         Round milliseconds to 10ms increments for GIF player compatibility
@@ -514,7 +1523,9 @@ class CWAMInspiredCompressor:
         """
         return max(10, int(round(ms / 10.0) * 10))
 
-    def _durations_for_preserve(self, orig_n: int, fps_in: float, out_frames: int) -> list:
+    def _durations_for_preserve(
+        self, orig_n: int, fps_in: float, out_frames: int, weights=None
+    ) -> list:
         """
         Distribute original total time across output frames evenly
         REX Engine v0.3.2: Timing preservation - maintain total playback duration
@@ -524,6 +1535,8 @@ class CWAMInspiredCompressor:
             orig_n: Original frame count
             fps_in: Original FPS
             out_frames: Output frame count after compression
+            weights: Optional per-frame weights (e.g. coalesced run lengths); time
+                     is split in proportion to them instead of evenly
 
         Returns:
             List of per-frame durations in ms (sum equals original total_ms ±10ms rounding)
@@ -532,9 +1545,12 @@ class CWAMInspiredCompressor:
             total_ms = int(round((orig_n / float(fps_in)) * 1000.0))
 
             # Base per-frame duration (float) then round to 10ms
-            per_raw = float(total_ms) / max(out_frames, 1)
-            per_rounded = self._round10ms(per_raw)
-            durs = [per_rounded] * out_frames
+            if weights is None:
+                per_raw = float(total_ms) / max(out_frames, 1)
+                durs = [self._round10ms(per_raw)] * out_frames
+            else:
+                w = np.asarray(weights, dtype=np.float64)[:out_frames]
+                durs = [self._round10ms(total_ms * x / max(w.sum(), 1e-12)) for x in w]
 
             # REX Engine Fix 7.2: Distribute drift across first N frames (not just last)
             drift = total_ms - sum(durs)
@@ -562,62 +1578,148 @@ class CWAMInspiredCompressor:
             default_duration = self._round10ms(1000.0 / 8)
             return [default_duration] * out_frames
 
-    def _build_global_palette(self, frames: List[Image.Image], colors=256, seed=1234) -> list:
+    def _frame_times_ms(self, timestamps, fps_in: float) -> np.ndarray:
+        """
+        Measured display time of each frame from its capture timestamp
+
+        A frame is shown until the next one was captured; the last frame gets
+        the median gap (1000 / fps_in for a single frame).
+
+        Args:
+            timestamps: Capture times in seconds, one per frame, non-decreasing
+            fps_in: Nominal FPS (used only when there is no gap to measure)
+
+        Returns:
+            (N,) int64 durations in ms, each at least 1
+        """
+        t = np.asarray(timestamps, dtype=np.float64)
+        gaps = np.diff(t) * 1000.0
+        if np.any(gaps < 0):
+            raise ValueError("Frame timestamps must not decrease")
+        last = float(np.median(gaps)) if len(gaps) else 1000.0 / float(fps_in)
+        times = np.append(gaps, last)
+        return np.maximum(1, np.round(times)).astype(np.int64)  # type: ignore[no-any-return]
+
+    def _color_histogram(
+        self, frames, bits=6, max_samples=1000000
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Saturation-weighted color histogram over packed RGB keys
+        Pixels are packed into `bits`-per-channel keys and counted with np.bincount;
+        the sampled pixel budget is fixed, so cost does not grow with frame count
+
+        Args:
+            frames: RGB frames (PIL list or FrameStack, read in place)
+            bits: Bits kept per channel (5 or 6)
+            max_samples: Total pixel budget across all frames
+
+        Returns:
+            Tuple of (bin mean colors (N, 3) float64, bin weights (N,) float64)
+            for non-empty bins
+        """
+        W, H = _frame_size(frames)
+        n_keys = 1 << (3 * bits)
+        shift = 8 - bits
+
+        # Spatial stride per frame (512x512 base), then frame step to stay in budget
+        stride = max(1, int(np.sqrt(H * W / 262144)))
+        per_frame = ((H + stride - 1) // stride) * ((W + stride - 1) // stride)
+        frame_step = max(1, int(np.ceil(len(frames) * per_frame / float(max_samples))))
+
+        counts = np.zeros(n_keys, dtype=np.float64)
+        sums = np.zeros((3, n_keys), dtype=np.float64)
+
+        for f in frames[::frame_step]:
+            pixels = self._rgb(f)[::stride, ::stride].reshape(-1, 3)
+            r, g, b = pixels[:, 0], pixels[:, 1], pixels[:, 2]
+            keys = (
+                ((r.astype(np.int64) >> shift) << (2 * bits))
+                | ((g.astype(np.int64) >> shift) << bits)
+                | (b.astype(np.int64) >> shift)
+            )
+            counts += np.bincount(keys, minlength=n_keys)
+            for c, channel in enumerate((r, g, b)):
+                sums[c] += np.bincount(keys, weights=channel, minlength=n_keys)
+
+        used = counts > 0
+        mean_rgb = (sums[:, used] / counts[used]).T
+
+        # Saturation weighting per bin (avoid dark/grayscale bias)
+        max_c = mean_rgb.max(axis=1)
+        min_c = mean_rgb.min(axis=1)
+        saturation = (max_c - min_c) / (max_c + 1e-6)  # 0-1 range
+        weights = counts[used] * (saturation + 0.5)
+
+        return mean_rgb, weights
+
+    def _median_cut(self, rgb: np.ndarray, weights: np.ndarray, colors: int) -> np.ndarray:
+        """
+        Weighted median cut over histogram bins
+        Repeatedly splits the heaviest box along its widest channel at the weighted median
+
+        Args:
+            rgb: (N, 3) bin colors
+            weights: (N,) bin weights
+            colors: Maximum number of palette colors
+
+        Returns:
+            (K, 3) uint8 palette colors, K <= colors
+        """
+        if len(rgb) <= colors:
+            return np.clip(np.round(rgb), 0, 255).astype(np.uint8)  # type: ignore[no-any-return]
+
+        boxes = [np.arange(len(rgb))]
+        box_weight = [float(weights.sum())]
+
+        while len(boxes) < colors:
+            # Heaviest box that still holds more than one bin
+            order = np.argsort(box_weight)[::-1]
+            target = next((int(i) for i in order if len(boxes[i]) > 1), None)
+            if target is None:
+                break
+
+            idx = boxes[target]
+            ranges = rgb[idx].max(axis=0) - rgb[idx].min(axis=0)
+            axis = int(np.argmax(ranges))
+            idx = idx[np.argsort(rgb[idx, axis], kind="stable")]
+
+            # Weighted median, keeping at least one bin on each side
+            cum = np.cumsum(weights[idx])
+            cut = int(np.searchsorted(cum, cum[-1] / 2.0)) + 1
+            cut = min(max(cut, 1), len(idx) - 1)
+
+            lo, hi = idx[:cut], idx[cut:]
+            boxes[target] = lo
+            box_weight[target] = float(weights[lo].sum())
+            boxes.append(hi)
+            box_weight.append(float(weights[hi].sum()))
+
+        palette = np.array([np.average(rgb[idx], axis=0, weights=weights[idx]) for idx in boxes])
+        return np.clip(np.round(palette), 0, 255).astype(np.uint8)  # type: ignore[no-any-return]
+
+    def _build_global_palette(self, frames, colors=256, seed=1234) -> list:
         """
         Build global palette with saturation-weighted sampling
         REX Engine Fix 6: Corrected color accuracy with weighted sampling
-        Enhanced: Reservoir sampling for memory efficiency (8.txt #4)
+        Enhanced: Fixed-budget color histogram + weighted median cut
+
+        Saturation weights are applied to histogram bins rather than to
+        individual sampled pixels, so no per-pixel random sampling is needed
+        and build time stays flat as frame count grows.
 
         Args:
-            frames: List of RGB frames
+            frames: RGB frames (PIL list or FrameStack)
             colors: Number of colors in palette
-            seed: Random seed for reproducibility
+            seed: Unused (kept for API compatibility; the builder is deterministic)
 
         Returns:
             768-element palette list (RGB triplets)
         """
         try:
-            rng = np.random.default_rng(seed)
-            arrs = [np.array(self._safe_convert(f, "RGB")) for f in frames]
-            H, W = arrs[0].shape[:2]
-
-            # Reservoir sampling for memory efficiency (8.txt improvement)
-            max_samples = min(colors * 1024, 1000000)  # Cap at 1M samples
-
-            # Collect pixels with stride for large images
-            stride = max(1, int(np.sqrt(H * W / 262144)))  # 512x512 base
-            sampled_pixels = []
-
-            for arr in arrs:
-                pixels = arr[::stride, ::stride, :].reshape(-1, 3)
-                sampled_pixels.append(pixels)
-
-            all_pixels = np.concatenate(sampled_pixels, 0)
-
-            # Limit total samples
-            if len(all_pixels) > max_samples:
-                indices = rng.choice(len(all_pixels), size=max_samples, replace=False)
-                all_pixels = all_pixels[indices]
-
-            # Compute saturation for each pixel (avoid dark/grayscale bias)
-            r, g, b = all_pixels[:, 0], all_pixels[:, 1], all_pixels[:, 2]
-            max_c = np.maximum(np.maximum(r, g), b).astype(np.float32)
-            min_c = np.minimum(np.minimum(r, g), b).astype(np.float32)
-            saturation = (max_c - min_c) / (max_c + 1e-6)  # 0-1 range
-
-            # Weighted sampling: favor saturated colors
-            weights = saturation + 0.5
-            weights = weights / weights.sum()
-
-            # Sample based on saturation weights
-            n_samples = min(len(all_pixels), colors * 1024)
-            indices = rng.choice(len(all_pixels), size=n_samples, replace=False, p=weights)
-            sample = all_pixels[indices]
-
-            # Generate palette using MEDIANCUT
-            S = Image.fromarray(sample.reshape(-1, 1, 3).astype(np.uint8))
-            q = S.quantize(colors=colors, method=Image.MEDIANCUT, dither=Image.Dither.NONE)  # type: ignore[attr-defined]
-            pal = np.array(q.getpalette(), dtype=np.uint8)[: colors * 3].tolist()
+            rgb, weights = self._color_histogram(frames)
+            palette = self._median_cut(rgb, weights, colors)
+
+            pal = palette.reshape(-1).tolist()
             pal += [0] * (768 - len(pal))  # Pad to 768
 
             return pal  # type: ignore[no-any-return]
@@ -628,101 +1730,351 @@ class CWAMInspiredCompressor:
             gray_pal = list(range(256)) * 3
             return gray_pal[:768]
 
-    def _apply_global_palette(
-        self, frames: List[Image.Image], pal: list, dither=True
-    ) -> List[Image.Image]:
+    def _scene_histograms(self, frames, bits=3, side=64) -> np.ndarray:
+        """
+        Normalized coarse RGB histograms, one per frame
+
+        Args:
+            frames: RGB frames (PIL list or FrameStack)
+            bits: Bits kept per channel (3 -> 512 bins)
+            side: Approximate sampled side length (pixels are strided, not resized)
+
+        Returns:
+            (N, 2**(3*bits)) float64 histograms, each summing to 1
+        """
+        W, H = _frame_size(frames)
+        stride = max(1, max(W, H) // side)
+        shift = 8 - bits
+        n_keys = 1 << (3 * bits)
+
+        hists = np.zeros((len(frames), n_keys), dtype=np.float64)
+        for i, f in enumerate(frames):
+            px = (self._rgb(f)[::stride, ::stride].reshape(-1, 3) >> shift).astype(np.intp)
+            keys = (px[:, 0] << (2 * bits)) | (px[:, 1] << bits) | px[:, 2]
+            hists[i] = np.bincount(keys, minlength=n_keys) / float(len(keys))
+        return hists
+
+    def _scene_cuts(self, frames, hists: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Scene starts from the histogram distance between consecutive frames
+        A frame starts a new scene when half the L1 distance between its
+        histogram and its predecessor's (0 = same colors, 1 = disjoint)
+        exceeds self.scene_cut
+
+        Args:
+            frames: RGB frames (PIL list or FrameStack)
+            hists: Precomputed _scene_histograms(frames)
+
+        Returns:
+            Sorted first-frame positions of the scenes (always starts with 0)
+        """
+        if len(frames) < 2:
+            return [0]
+        if hists is None:
+            hists = self._scene_histograms(frames)
+        dist = 0.5 * np.abs(np.diff(hists, axis=0)).sum(axis=1)
+        return [0] + (np.flatnonzero(dist > self.scene_cut) + 1).tolist()
+
+    def _scene_palettes(
+        self, frames, colors=256, starts: Optional[List[int]] = None
+    ) -> PalettePlan:
+        """
+        One palette per scene, reusing cached palettes across similar scenes
+
+        Each scene's mean histogram is compared against the scenes that
+        already own a palette; within self.scene_reuse the cached palette is
+        reused (so a recording that switches back and forth between two
+        windows builds two palettes, and delta encoding keeps working across
+        the switch), otherwise a new palette is built from the scene's frames.
+
+        Args:
+            frames: RGB frames (PIL list or FrameStack)
+            colors: Colors per palette
+            starts: Scene starts (default: _scene_cuts(frames))
+
+        Returns:
+            PalettePlan covering all frames
+        """
+        hists = self._scene_histograms(frames)
+        if starts is None:
+            starts = self._scene_cuts(frames, hists)
+
+        bounds = list(starts) + [len(frames)]
+        cache: List[Tuple[np.ndarray, int]] = []  # (scene histogram, palette index)
+        palettes: List[list] = []
+        palette_of = np.zeros(len(frames), dtype=np.intp)
+
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            hist = hists[start:stop].mean(axis=0)
+            match = None
+            for cached_hist, k in cache:
+                if 0.5 * np.abs(hist - cached_hist).sum() <= self.scene_reuse:
+                    match = k
+                    break
+            if match is None:
+                positions = np.arange(start, stop)
+                if isinstance(frames, FrameStack):
+                    scene = frames.subset(positions)
+                else:
+                    scene = [frames[i] for i in positions]
+                palettes.append(self._build_global_palette(scene, colors=colors, seed=1234))
+                match = len(palettes) - 1
+                cache.append((hist, match))
+            palette_of[start:stop] = match
+
+        logger.info(f"[*] Scene palettes: {len(starts)} scenes, {len(palettes)} palettes")
+        return PalettePlan(palettes, palette_of, starts)
+
+    def _apply_global_palette(self, frames, pal: list, dither=True) -> List[Image.Image]:
         """
         Apply global palette to all frames
         REX Engine Patch 3-2 + Fix 5: Correct palette application to prevent black screen
 
         CRITICAL FIX: Use quantize with explicit palette image to ensure proper index mapping
 
+        Frames are mapped on a thread pool when self.threads > 1 (Pillow releases
+        the GIL while quantizing); output order always matches input order.
+
+        Dither modes:
+        - True / 'floyd-steinberg': Pillow quantize with Floyd-Steinberg dithering
+        - False / 'none': Pillow quantize without dithering (palette cache lookup in C)
+        - 'ordered': InverseColormap lookup with Bayer ordered dithering (NumPy fast path)
+
         Args:
-            frames: List of RGB frames
+            frames: RGB frames (PIL list or FrameStack)
             pal: 768-element palette list
-            dither: Enable Floyd-Steinberg dithering
+            dither: Dither mode (see above)
 
         Returns:
             Palette-mode frames
         """
+        mode = self._dither_mode(dither)
+
         try:
             colors = len(pal) // 3
-            out = []
 
-            # Create palette image for quantize()
-            palette_img = Image.new("P", (1, 1))
-            palette_img.putpalette(pal)
+            if mode == "ordered":
+                lut = self._inverse_colormap(pal)
 
-            for i, im in enumerate(frames):
-                try:
+                def map_frame(im) -> Image.Image:
+                    indices = lut.map_ordered(self._rgb(im))
+                    q = Image.fromarray(indices, mode="P")
+                    q.putpalette(pal)
+                    return q
+
+            else:
+                # Create palette image for quantize()
+                palette_img = Image.new("P", (1, 1))
+                palette_img.putpalette(pal)
+                palette_img.load()  # Shared read-only across threads
+                dither_mode = (
+                    Image.Dither.FLOYDSTEINBERG if mode == "floyd-steinberg" else Image.Dither.NONE
+                )
+
+                def map_frame(im) -> Image.Image:
                     # CRITICAL: Use quantize() with palette parameter for proper RGB→P mapping
-                    q = self._safe_convert(im, "RGB").quantize(
-                        palette=palette_img,
-                        colors=colors,
-                        dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE,
+                    return self._image(im).quantize(
+                        palette=palette_img, colors=colors, dither=dither_mode
                     )
-                    out.append(q)
+
+            def quantize(i: int, im) -> Image.Image:
+                try:
+                    return map_frame(im)
                 except Exception as e:
                     logger.warning(f"Frame {i} palette application failed: {e}")
                     # Fallback: simple quantize
-                    out.append(self._safe_convert(im, "P"))
+                    return self._safe_convert(self._image(im), "P")
+
+            threads = min(self.threads, len(frames))
+            if threads <= 1:
+                return [quantize(i, im) for i, im in enumerate(frames)]
 
-            return out
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                # map() yields in submission order - deterministic output
+                return list(pool.map(quantize, range(len(frames)), frames))
 
         except Exception as e:
             logger.error(f"Global palette application failed: {e}")
             # Fallback: convert each frame independently
-            return [self._safe_convert(f, "P") for f in frames]
+            return [self._safe_convert(self._image(f), "P") for f in frames]
+
+    def _apply_palette_plan(self, frames, plan: PalettePlan, dither=True) -> List[Image.Image]:
+        """
+        Apply a palette plan: each frame is mapped to its scene's palette
+
+        Args:
+            frames: RGB frames (PIL list or FrameStack)
+            plan: PalettePlan with one entry per frame
+            dither: Dither mode (see _apply_global_palette)
+
+        Returns:
+            Palette-mode frames, in input order
+        """
+        if len(plan.palettes) == 1:
+            return self._apply_global_palette(frames, plan.palettes[0], dither=dither)
+
+        out: List[Optional[Image.Image]] = [None] * len(frames)
+        for pal, positions in plan.groups():
+            if isinstance(frames, FrameStack):
+                group = frames.subset(positions)
+            else:
+                group = [frames[i] for i in positions]
+            for i, q in zip(positions, self._apply_global_palette(group, pal, dither=dither)):
+                out[i] = q
+        return out  # type: ignore[return-value]
+
+    def _dither_mode(self, dither) -> str:
+        """
+        Normalize a dither argument to 'floyd-steinberg', 'none' or 'ordered'
+
+        Args:
+            dither: bool, None or mode name
+
+        Returns:
+            Canonical mode name
+        """
+        if dither is True:
+            return "floyd-steinberg"
+        if dither is False or dither is None:
+            return "none"
+        aliases = {
+            "floyd-steinberg": "floyd-steinberg",
+            "floydsteinberg": "floyd-steinberg",
+            "fs": "floyd-steinberg",
+            "none": "none",
+            "ordered": "ordered",
+            "bayer": "ordered",
+        }
+        mode = aliases.get(str(dither).lower())
+        if mode is None:
+            raise ValueError(f"Unknown dither mode: {dither}")
+        return mode
+
+    def _inverse_colormap(self, pal: list) -> InverseColormap:
+        """
+        InverseColormap for a palette, cached for the last few palettes
+
+        Args:
+            pal: 768-element palette list
+
+        Returns:
+            Lookup table for the palette
+        """
+        key = tuple(pal)
+        lut = self._lut_cache.pop(key, None)
+        if lut is None:
+            lut = InverseColormap(pal)
+            while len(self._lut_cache) >= 4:
+                del self._lut_cache[next(iter(self._lut_cache))]  # Least recently used
+        self._lut_cache[key] = lut
+        return lut
+
+    def _predict_gif_size(
+        self, frames, pal: list, dither, delta: bool, plan: Optional[PalettePlan] = None
+    ) -> int:
+        """
+        Predict the encoded GIF size without quantizing or encoding every frame
+        Only the sampled frames (and their predecessors for delta) are mapped to
+        the palette; see sampled_gif_size
+
+        Args:
+            frames: RGB frames of the candidate setting (PIL list or FrameStack)
+            pal: 768-element palette list (the global color table)
+            dither: Dither mode
+            delta: Predict dirty-rectangle encoding
+            plan: Optional per-scene PalettePlan (frames off `pal` get local tables)
 
-    def _encode_gif_bytes(
+        Returns:
+            Predicted size in bytes
+        """
+        mapped: dict = {}
+
+        def palette_at(i: int) -> list:
+            return pal if plan is None else plan.palette_at(i)
+
+        def frame_at(i: int) -> np.ndarray:
+            if i not in mapped:
+                one = self._apply_global_palette(frames[i : i + 1], palette_at(i), dither)
+                mapped[i] = np.asarray(one[0])
+            return mapped[i]
+
+        return sampled_gif_size(
+            frame_at,
+            len(frames),
+            pal,
+            delta=delta,
+            sample=self.predict_sample,
+            palette_at=palette_at if plan is not None else None,
+        )
+
+    def _scale_steps(self, ratio: float, step=0.85) -> int:
+        """
+        Number of `step` resolution reductions expected to shrink size by `ratio`
+        Encoded size is taken to scale with pixel area (scale_factor squared)
+
+        Args:
+            ratio: Current size divided by target size
+            step: Scale multiplier per reduction
+
+        Returns:
+            Reduction count (at least 1)
+        """
+        if ratio <= 1.0:
+            return 1
+        return max(1, int(np.ceil(np.log(ratio) / (-2.0 * np.log(step)))))
+
+    def write_gif(
         self,
         frames: List[Image.Image],
+        output,
         duration_ms=120,
         durations_ms=None,
         loop=0,
-        disposal=2,
-        optimize=False,
-    ) -> bytes:
+        delta: bool = True,
+    ) -> int:
         """
-        Encode frames to GIF bytes
-        REX Engine Patch 3-3 + Fix 5: In-memory GIF encoding with timing preservation
+        Stream palette-mode frames to a GIF file, one frame at a time
 
-        CRITICAL FIX: optimize=False to prevent index mapping corruption with single palette
+        No in-memory copy of the whole file is built.
+        With workers > 1, frame blocks are LZW-encoded in a process pool and
+        stitched back in order (same bytes as the serial path).
 
         Args:
-            frames: Palette-mode frames
+            frames: Palette-mode frames of one size (see _apply_global_palette);
+                    frames off the most common palette get local color tables
+            output: Output path or binary file object
             duration_ms: Frame duration in milliseconds (if durations_ms not provided)
             durations_ms: List of per-frame durations (for timing preservation)
             loop: Loop count (0 = infinite)
-            disposal: Disposal method (2 = restore to background)
-            optimize: Enable GIF optimization (False recommended for color accuracy)
+            delta: Encode frames as dirty rectangles against the previous frame
 
         Returns:
-            GIF file bytes
+            Number of bytes written
         """
-        try:
-            bio = BytesIO()
-
-            save_kwargs = {
-                "format": "GIF",
-                "save_all": True,
-                "append_images": frames[1:],
-                "loop": loop,
-                "disposal": disposal,
-                "optimize": optimize,  # False prevents palette index corruption
-            }
-
-            # Use durations list if provided, otherwise use single duration
-            if durations_ms is not None:
-                save_kwargs["duration"] = durations_ms
-            else:
-                save_kwargs["duration"] = duration_ms
+        tables = frame_palettes(frames)
+        if tables is None:
+            raise ValueError("write_gif needs palette-mode frames of one size")
+        palette, palettes = tables
+        if durations_ms is None:
+            durations_ms = [duration_ms] * len(frames)
+        if len(durations_ms) != len(frames):
+            raise ValueError(f"Got {len(durations_ms)} durations for {len(frames)} frames")
 
-            frames[0].save(bio, **save_kwargs)
-            return bio.getvalue()
+        try:
+            with GifStreamWriter(output, palette, loop=loop, delta=delta) as writer:
+                writer.write_frames(
+                    (np.asarray(f) for f in frames),
+                    durations_ms,
+                    workers=self.workers,
+                    palettes=palettes,
+                )
+            logger.info(
+                f"[+] GIF streamed: {writer.frames_written} frames, {writer.bytes_written} bytes"
+            )
+            return writer.bytes_written
 
         except Exception as e:
-            logger.error(f"GIF encoding failed: {e}", exc_info=True)
+            logger.error(f"GIF streaming failed: {e}", exc_info=True)
             raise
 
     def compress_to_target(
@@ -734,6 +2086,13 @@ class CWAMInspiredCompressor:
         preserve_timing: bool = True,
         max_iterations: int = 5,
         input_fps: Optional[int] = None,
+        dither=True,
+        delta: Optional[bool] = None,
+        selection="saliency",
+        scenes: bool = False,
+        format="gif",
+        timestamps=None,
+        output=None,
     ):
         """
         Enhanced target-driven compression with timing preservation
@@ -747,77 +2106,208 @@ class CWAMInspiredCompressor:
             init_colors: Initial palette colors
             min_fps: Minimum FPS threshold
             preserve_timing: Keep original total duration
-            max_iterations: Maximum adaptive iterations
+            max_iterations: Maximum adaptive iterations (the last one always encodes)
             input_fps: Original FPS (if None, defaults to 10)
+            dither: Palette dither mode - True/'floyd-steinberg' (default),
+                    False/'none', or 'ordered' (Bayer; stable across frames, so
+                    static regions keep identical indices and LZW compresses better)
+            delta: Encode frames as dirty rectangles against the previous frame
+                   (GIF only; default True)
+            selection: Keyframe selection - 'saliency' (mean spatial saliency) or
+                       'motion' (motion peaks and direction changes; dropped static
+                       frames lend their time to the keyframe before them)
+            scenes: Split at scene cuts and give each scene its own palette
+                    (local color tables; similar scenes share one palette; GIF only)
+            format: Output backend name - 'gif' (default), 'webp', 'webp-lossless',
+                    'apng' or any registered backend (see output_backends). GIF
+                    backends (GifBackend) are sized with the sampled predictor and
+                    encode with this call's delta and self.workers; other formats
+                    are sized by full encodes (see _backend_to_target) and log a
+                    warning when delta or scenes is set, since they ignore both
+            timestamps: Optional capture time of each frame in seconds; frame
+                        durations then follow the measured gaps (late or
+                        skipped captures keep their real time) and input_fps
+                        becomes the achieved rate. Implies preserve_timing
+            output: Optional seekable binary file object; full encodes are then
+                    written straight into it (GIF backends stream frame by
+                    frame, so the file is never held in memory) and each retry
+                    overwrites the previous attempt
 
         Returns:
-            Tuple of (gif_bytes, metadata)
+            Tuple of (file bytes, or None when written to output, metadata);
+            metadata carries both the predicted (predicted_mb) and actual
+            (size_mb) size of the returned setting, and per-stage wall time in
+            timings_ms (pipeline, selection, palette, predict, quantize, encode)
         """
         if not self._validate_frames(frames):
             raise ValueError("Invalid input frames")
 
+        dither_mode = self._dither_mode(dither)
+        self._selection_mode(selection)
+        backend = get_backend(format)
+        if isinstance(backend, GifBackend):
+            # Registered GIF backend, with this call's delta and the compressor's workers
+            backend = copy.copy(backend)
+            backend.delta = True if delta is None else delta
+            backend.workers = self.workers
+            delta = backend.delta
+        else:
+            for option, value in (("delta", delta), ("scenes", scenes)):
+                if value:
+                    logger.warning(f"[!] {option}= applies to GIF only, ignored for {backend.name}")
+
+        # Retries rewind the output to where this call started writing
+        out_start = None if output is None else output.tell()
+
         try:
             # --- Step 0: Collect original meta and store original frames (Fix 7.1)
             orig_n = len(frames)
             fps_in = input_fps or 10
+            frame_ms = None
+            if timestamps is not None:
+                if len(timestamps) != orig_n:
+                    raise ValueError(f"Got {len(timestamps)} timestamps for {orig_n} frames")
+                frame_ms = self._frame_times_ms(timestamps, fps_in)
+                fps_in = orig_n * 1000.0 / float(frame_ms.sum())
+                preserve_timing = True
             total_ms = int(round((orig_n / float(fps_in)) * 1000.0))
 
-            # REX Engine Fix 7.1: Store original frames to always rescale from source
-            orig_frames = [self._safe_convert(f, "RGB") for f in frames]
+            # Step 1: Preprocessing pipeline, cached per scale for later iterations
+            # (REX Engine Fix 7.1: every level is resampled from the base, never chained)
+            timings = dict.fromkeys(
+                ("pipeline", "selection", "palette", "predict", "quantize", "encode"), 0.0
+            )
+            pyramid = self._timed(
+                timings,
+                "pipeline",
+                FramePyramid,
+                self,
+                frames,
+                input_fps=fps_in,
+                target_fps=8,
+                selection=selection,
+                weights=frame_ms,
+            )
 
-            # Step 1: Preprocessing pipeline
-            frames = self._scale_frames(frames)
-            frames = self._reduce_frame_rate(frames, target_fps=8, input_fps=fps_in)
-            S = self._compute_cw_saliency_maps(frames)
-            keep = self._keep_mask_from_saliency(S, thr=0.25)
-            frames = [f for i, f in enumerate(frames) if keep[i]]
+            if not isinstance(backend, GifBackend):
+                data, meta = self._backend_to_target(
+                    backend,
+                    pyramid,
+                    target_mb=target_mb,
+                    init_colors=init_colors,
+                    preserve_timing=preserve_timing,
+                    max_iterations=max_iterations,
+                    orig_n=orig_n,
+                    fps_in=fps_in,
+                    dither=dither,
+                    timings=timings,
+                )
+                if output is None:
+                    return data, meta
+                output.write(data)
+                return None, meta
 
-            # Step 2: prepare palette + frames (initial)
+            # Step 2: prepare palette (frames are quantized only for full encodes)
             colors, fps = init_colors, 8
-            pal = self._build_global_palette(frames, colors=colors, seed=1234)
-            qframes = self._apply_global_palette(frames, pal, dither=True)
+            level = self._timed(timings, "selection", pyramid.level, self.scale_factor)
+            frames, weights = level["frames"], level["weights"]
+            plan = self._timed(
+                timings, "palette", pyramid.palette_plan, self.scale_factor, colors, scenes
+            )
 
             # Iterative feedback with adaptive logic (max_iterations)
+            # Each setting is first sized by _predict_gif_size; the full quantize +
+            # encode only runs once a prediction is near target (or on the last
+            # iteration), so settings predicted to overshoot cost a few frames each
             iteration = 0
+            full_encodes = 0
+            max_iterations = max(1, max_iterations)
+            data = b"" if output is None else None
             last_meta = None
 
             while iteration < max_iterations:
-                out_frames = len(qframes)
+                out_frames = len(frames)
+                final = iteration == max_iterations - 1
 
                 # compute durations (preserve timing if requested)
+                # (coalesced frames keep the time of the run they replace)
                 if preserve_timing:
-                    durations_ms = self._durations_for_preserve(orig_n, fps_in, out_frames)
+                    durations_ms = self._durations_for_preserve(
+                        orig_n, fps_in, out_frames, weights=weights
+                    )
                 else:
-                    durations_ms = [self._round10ms(1000.0 / max(fps, 1))] * out_frames
+                    durations_ms = [self._round10ms(1000.0 * w / max(fps, 1)) for w in weights]
+
+                predicted = self._timed(
+                    timings,
+                    "predict",
+                    self._predict_gif_size,
+                    frames,
+                    plan.palette,
+                    dither,
+                    delta,
+                    plan=plan if scenes else None,
+                )
+                predicted_mb = predicted / (1024 * 1024)
 
-                data = self._encode_gif_bytes(qframes, durations_ms=durations_ms)
-                size_mb = len(data) / (1024 * 1024)
+                size_mb = None
+                if final or predicted_mb <= target_mb * self.predict_margin:
+                    qframes = self._timed(
+                        timings, "quantize", self._apply_palette_plan, frames, plan, dither=dither
+                    )
+                    if output is None:
+                        data = self._timed(
+                            timings, "encode", backend.encode, qframes, durations_ms, loop=0
+                        )
+                        size = len(data)
+                    else:
+                        output.seek(out_start)
+                        output.truncate()
+                        size = self._timed(
+                            timings, "encode", backend.save, qframes, output, durations_ms, loop=0
+                        )
+                    size_mb = size / (1024 * 1024)
+                    full_encodes += 1
 
                 logger.info(
-                    f"[*] Iter {iteration+1}/{max_iterations}: size={size_mb:.3f}MB frames={out_frames} colors={colors} fps_goal={fps} total_ms={sum(durations_ms)}"
+                    f"[*] Iter {iteration+1}/{max_iterations}: predicted={predicted_mb:.3f}MB size={'-' if size_mb is None else f'{size_mb:.3f}MB'} frames={out_frames} colors={colors} fps_goal={fps} total_ms={sum(durations_ms)}"
                 )
 
-                # build metadata snapshot
-                meta = {
-                    "iteration": iteration + 1,
-                    "orig_fps": fps_in,
-                    "orig_frames": orig_n,
-                    "frames_out": out_frames,
-                    "colors": colors,
-                    "fps_goal": fps,
-                    "size_mb": round(size_mb, 4),
-                    "total_ms": sum(durations_ms),
-                    "durations_ms": durations_ms,
-                }
-                last_meta = meta
-
-                if size_mb <= target_mb:
+                if size_mb is not None:
+                    # build metadata snapshot
+                    meta = {
+                        "iteration": iteration + 1,
+                        "format": backend.name,
+                        "quality": None,
+                        "orig_fps": fps_in,
+                        "orig_frames": orig_n,
+                        "frames_out": out_frames,
+                        "colors": colors,
+                        "dither": dither_mode,
+                        "delta": delta,
+                        "selection": selection,
+                        "scenes": len(plan.starts),
+                        "palettes": len(plan.palettes),
+                        "fps_goal": fps,
+                        "size_mb": round(size_mb, 4),
+                        "predicted_mb": round(predicted_mb, 4),
+                        "full_encodes": full_encodes,
+                        "scale_factor": round(self.scale_factor, 4),
+                        "pyramid_levels": len(pyramid.levels),
+                        "pipeline": pyramid.pipeline_stats,
+                        "total_ms": sum(durations_ms),
+                        "durations_ms": durations_ms,
+                        "timings_ms": {k: round(v, 1) for k, v in timings.items()},
+                    }
                     # verification: durations sum within tolerance
                     meta["preserve_timing_ok"] = abs(total_ms - meta["total_ms"]) <= 10
-                    return data, meta
+                    last_meta = meta
+
+                    if size_mb <= target_mb or final:
+                        return data, meta
 
                 # Enhanced adaptive reduction order (8.txt #7)
-                ratio = size_mb / float(target_mb)
+                ratio = (predicted_mb if size_mb is None else size_mb) / float(target_mb)
 
                 # Early resolution trigger if size ratio is too large (8.txt improvement)
                 if ratio > 1.5 and colors <= max(32, self.min_colors):
@@ -825,25 +2315,25 @@ class CWAMInspiredCompressor:
                         f"[*] Large size ratio {ratio:.2f}, triggering early resolution reduction"
                     )
                     prev_scale = self.scale_factor
-                    self.scale_factor = max(0.1, self.scale_factor * 0.85)
+                    steps = self._scale_steps(ratio)
+                    self.scale_factor = max(0.1, self.scale_factor * 0.85**steps)
                     logger.info(
                         f"[*] Adaptive: reducing resolution {prev_scale:.3f} -> {self.scale_factor:.3f}"
                     )
 
-                    # Re-run from original frames
-                    frames = self._scale_frames(orig_frames)
-                    frames = self._reduce_frame_rate(frames, target_fps=8, input_fps=fps_in)
-                    S = self._compute_cw_saliency_maps(frames)
-                    keep = self._keep_mask_from_saliency(S, thr=0.25)
-                    frames = [f for i, f in enumerate(frames) if keep[i]]
-                    pal = self._build_global_palette(frames, colors=colors, seed=1234)
-                    qframes = self._apply_global_palette(frames, pal, dither=True)
+                    # Next pyramid level (resampled from the base level)
+                    level = self._timed(timings, "selection", pyramid.level, self.scale_factor)
+                    frames, weights = level["frames"], level["weights"]
+                    plan = self._timed(
+                        timings, "palette", pyramid.palette_plan, self.scale_factor, colors, scenes
+                    )
 
                 elif colors > max(32, self.min_colors):
                     colors = max(self.min_colors, colors // 2)
                     logger.info(f"[*] Adaptive: reducing colors -> {colors}")
-                    pal = self._build_global_palette(frames, colors=colors, seed=1234)
-                    qframes = self._apply_global_palette(frames, pal, dither=True)
+                    plan = self._timed(
+                        timings, "palette", pyramid.palette_plan, self.scale_factor, colors, scenes
+                    )
 
                 elif (not preserve_timing) and fps > min_fps:
                     prev = fps
@@ -853,43 +2343,138 @@ class CWAMInspiredCompressor:
                 else:
                     # Final fallback: resolution reduction
                     prev_scale = self.scale_factor
-                    self.scale_factor = max(0.1, self.scale_factor * 0.85)
+                    steps = self._scale_steps(ratio)
+                    self.scale_factor = max(0.1, self.scale_factor * 0.85**steps)
                     logger.info(
                         f"[*] Adaptive: reducing resolution {prev_scale:.3f} -> {self.scale_factor:.3f}"
                     )
 
-                    # REX Engine Fix 7.1: Re-run from ORIGINAL frames
-                    frames = self._scale_frames(orig_frames)
-                    frames = self._reduce_frame_rate(frames, target_fps=8, input_fps=fps_in)
-                    S = self._compute_cw_saliency_maps(frames)
-                    keep = self._keep_mask_from_saliency(S, thr=0.25)
-                    frames = [f for i, f in enumerate(frames) if keep[i]]
-                    pal = self._build_global_palette(frames, colors=colors, seed=1234)
-                    qframes = self._apply_global_palette(frames, pal, dither=True)
+                    # REX Engine Fix 7.1: next pyramid level, resampled from the base level
+                    level = self._timed(timings, "selection", pyramid.level, self.scale_factor)
+                    frames, weights = level["frames"], level["weights"]
+                    plan = self._timed(
+                        timings, "palette", pyramid.palette_plan, self.scale_factor, colors, scenes
+                    )
 
                 iteration += 1
 
-            # final best-effort return with metadata
-            if last_meta is None:
-                last_meta = {
-                    "iteration": iteration,
-                    "orig_fps": fps_in,
-                    "orig_frames": orig_n,
-                    "frames_out": len(qframes),
-                    "colors": colors,
-                    "fps_goal": fps,
-                    "size_mb": round(size_mb, 4),
-                    "total_ms": sum(durations_ms),
-                    "durations_ms": durations_ms,
-                    "preserve_timing_ok": abs(total_ms - sum(durations_ms)) <= 10,
-                }
-
             return data, last_meta
 
         except Exception as e:
             logger.error(f"Compress to target failed: {e}", exc_info=True)
             raise
 
+    def _backend_to_target(
+        self,
+        backend: OutputBackend,
+        pyramid: FramePyramid,
+        target_mb: float,
+        init_colors: int,
+        preserve_timing: bool,
+        max_iterations: int,
+        orig_n: int,
+        fps_in: int,
+        dither,
+        timings: Optional[Dict[str, float]] = None,
+    ):
+        """
+        compress_to_target loop for non-GIF output backends
+
+        There is no sampled predictor for WebP/APNG, so every iteration is a full
+        encode. Reduction order: quality ladder (lossy backends), then palette
+        colors (palette backends), then resolution through the pyramid.
+
+        Args:
+            backend: Output backend
+            pyramid: FramePyramid built by compress_to_target
+            target_mb: Target file size in MB
+            init_colors: Initial palette colors (palette backends)
+            preserve_timing: Keep original total duration
+            max_iterations: Maximum encodes
+            orig_n: Input frame count
+            fps_in: Input FPS
+            dither: Palette dither mode (palette backends)
+            timings: Per-stage wall times (ms) to add to, reported as timings_ms
+
+        Returns:
+            Tuple of (file bytes, metadata)
+        """
+        timings = {} if timings is None else timings
+        fps = 8
+        total_ms = int(round((orig_n / float(fps_in)) * 1000.0))
+        colors = init_colors if backend.palette else None
+        rung = 0
+        quality = backend.qualities[rung] if backend.lossy else None
+        level = self._timed(timings, "selection", pyramid.level, self.scale_factor)
+        max_iterations = max(1, max_iterations)
+
+        for iteration in range(max_iterations):
+            frames, weights = level["frames"], level["weights"]
+            if preserve_timing:
+                durations_ms = self._durations_for_preserve(
+                    orig_n, fps_in, len(frames), weights=weights
+                )
+            else:
+                durations_ms = [self._round10ms(1000.0 * w / fps) for w in weights]
+
+            if backend.palette:
+                pal = self._timed(timings, "palette", pyramid.palette, self.scale_factor, colors)
+                images = self._timed(
+                    timings, "quantize", self._apply_global_palette, frames, pal, dither=dither
+                )
+            else:
+                images = frames.to_images() if isinstance(frames, FrameStack) else list(frames)
+            data = self._timed(
+                timings, "encode", backend.encode, images, durations_ms, loop=0, quality=quality
+            )
+            size_mb = len(data) / (1024 * 1024)
+
+            logger.info(
+                f"[*] {backend.name} iter {iteration+1}/{max_iterations}: size={size_mb:.3f}MB frames={len(frames)} quality={quality} colors={colors} scale={self.scale_factor:.3f}"
+            )
+
+            meta = {
+                "iteration": iteration + 1,
+                "format": backend.name,
+                "quality": quality,
+                "orig_fps": fps_in,
+                "orig_frames": orig_n,
+                "frames_out": len(frames),
+                "colors": colors,
+                "dither": self._dither_mode(dither) if backend.palette else None,
+                "selection": pyramid.selection,
+                "fps_goal": fps,
+                "size_mb": round(size_mb, 4),
+                "full_encodes": iteration + 1,
+                "scale_factor": round(self.scale_factor, 4),
+                "pyramid_levels": len(pyramid.levels),
+                "pipeline": pyramid.pipeline_stats,
+                "total_ms": sum(durations_ms),
+                "durations_ms": durations_ms,
+                "timings_ms": {k: round(v, 1) for k, v in timings.items()},
+            }
+            meta["preserve_timing_ok"] = abs(total_ms - meta["total_ms"]) <= 10
+            if size_mb <= target_mb or iteration == max_iterations - 1:
+                break
+
+            ratio = size_mb / float(target_mb)
+            if backend.lossy and rung < len(backend.qualities) - 1:
+                rung += 1
+                quality = backend.qualities[rung]
+                logger.info(f"[*] Adaptive: reducing {backend.name} quality -> {quality}")
+            elif backend.palette and colors > max(32, self.min_colors):
+                colors = max(self.min_colors, colors // 2)
+                logger.info(f"[*] Adaptive: reducing colors -> {colors}")
+            else:
+                prev_scale = self.scale_factor
+                self.scale_factor = max(0.1, self.scale_factor * 0.85 ** self._scale_steps(ratio))
+                logger.info(
+                    f"[*] Adaptive: reducing resolution {prev_scale:.3f} -> {self.scale_factor:.3f}"
+                )
+                level = self._timed(timings, "selection", pyramid.level, self.scale_factor)
+
+        return data, meta
+
     def estimate_compression_ratio(
         self, original_frames: List[Image.Image], compressed_frames: List[Image.Image]
     ) -> dict:
@@ -0,0 +1,230 @@
+"""
+FlashRecord Frame Store
+Preallocated ring buffer for captured frames
+
+Key techniques:
+1. One (capacity, H, W, 3) uint8 array allocated on the first frame; every
+   capture is copied into the next slot, so recording makes no per-frame
+   allocations that outlive the tick
+2. Capacity by frame count or by byte budget (whichever is given); reserve()
+   changes it between recordings (e.g. to fit a timed recording)
+3. Overflow policy: 'drop-oldest' overwrites the oldest frame, 'stop' refuses
+   new frames once full
+4. stack() exposes the frames in capture order as a FrameStack view over the
+   same buffer, so compression reads them in place (no PIL conversion)
+5. Each slot keeps the frame's capture timestamp next to its pixels, so
+   overwritten frames take their timestamps with them
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .compression import FrameStack
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop-oldest", "stop")
+
+
+def copy_frame(dst: np.ndarray, src: np.ndarray) -> None:
+    """
+    Copy an (H, W, 3) frame into dst
+
+    Strided sources such as the BGRX -> RGB views of capture backends are
+    copied one channel at a time, about 4x faster than one strided copy of
+    3-byte pixels.
+    """
+    if src.flags.c_contiguous:
+        np.copyto(dst, src, casting="unsafe")
+    else:
+        for c in range(3):
+            np.copyto(dst[..., c], src[..., c], casting="unsafe")
+
+
+class FrameRing:
+    """
+    Fixed-capacity ring of RGB frames in one contiguous uint8 array
+
+    The buffer is allocated lazily, when the first frame fixes the frame size.
+    Every later frame must have the same size until the ring is cleared; the
+    first frame after clear() may have a new size, which reallocates the buffer.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        overflow: str = "drop-oldest",
+    ):
+        """
+        Initialize frame ring
+
+        Args:
+            capacity: Maximum frames held (takes precedence over max_bytes)
+            max_bytes: Byte budget for the buffer; capacity = max_bytes // frame bytes
+            overflow: 'drop-oldest' (overwrite the oldest frame) or 'stop'
+                      (refuse frames once full)
+        """
+        if capacity is None and max_bytes is None:
+            raise ValueError("FrameRing needs a capacity or a byte budget")
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, got {capacity}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.capacity = capacity
+        self._requested_capacity = capacity  # capacity is re-derived per frame size otherwise
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.data: Optional[np.ndarray] = None
+        self.times: Optional[np.ndarray] = None  # Capture time per slot (NaN if unknown)
+        self.dropped = 0  # Frames overwritten ('drop-oldest') or refused ('stop')
+        self._start = 0  # Slot of the oldest frame
+        self._count = 0
+
+    def _allocate(self, height: int, width: int) -> None:
+        frame_bytes = height * width * 3
+        capacity = self._requested_capacity
+        if capacity is None:
+            capacity = self.max_bytes // frame_bytes  # type: ignore[operator]
+            if capacity < 1:
+                raise ValueError(
+                    f"Byte budget {self.max_bytes} is smaller than one {width}x{height} frame"
+                )
+        self.capacity = int(capacity)
+        self.data = np.empty((self.capacity, height, width, 3), dtype=np.uint8)
+        self.times = np.full(self.capacity, np.nan)
+        logger.info(
+            f"[*] Frame ring: {self.capacity} x {width}x{height} ({self.data.nbytes / 2**20:.1f}MB)"
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    @property
+    def full(self) -> bool:
+        """True once every slot holds a frame"""
+        return self.data is not None and self._count == self.capacity
+
+    @property
+    def size(self) -> Optional[Tuple[int, int]]:
+        """Frame (width, height), or None before the first frame"""
+        if self.data is None:
+            return None
+        return self.data.shape[2], self.data.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated for the buffer"""
+        return 0 if self.data is None else int(self.data.nbytes)
+
+    def push(self, frame, timestamp: Optional[float] = None) -> bool:
+        """
+        Copy a frame into the next slot
+
+        Arrays are copied straight into the slot; PIL images are read through
+        their array interface (RGB) or converted first (other modes).
+
+        Args:
+            frame: (H, W, 3) uint8 array or PIL image
+            timestamp: Capture time in seconds (see timestamps())
+
+        Returns:
+            True if stored, False if refused (full under the 'stop' policy)
+        """
+        if isinstance(frame, Image.Image) and frame.mode != "RGB":
+            frame = frame.convert("RGB")
+        pixels = np.asarray(frame)
+        if pixels.ndim != 3 or pixels.shape[2] != 3:
+            raise ValueError(f"Expected (H, W, 3) frame, got shape {pixels.shape}")
+
+        if self.data is None or (not self._count and pixels.shape != self.data.shape[1:]):
+            self.data = self.times = None  # Release the old buffer before allocating
+            self._allocate(pixels.shape[0], pixels.shape[1])
+        elif pixels.shape != self.data.shape[1:]:
+            raise ValueError(
+                f"Frame shape {pixels.shape} differs from buffer {self.data.shape[1:]}"
+            )
+
+        if self._count == self.capacity:
+            self.dropped += 1
+            if self.overflow == "stop":
+                return False
+            slot = self._start  # Oldest frame is overwritten
+            self._start = (self._start + 1) % self.capacity  # type: ignore[operator]
+        else:
+            slot = (self._start + self._count) % self.capacity  # type: ignore[operator]
+            self._count += 1
+
+        copy_frame(self.data[slot], pixels)  # type: ignore[index]
+        self.times[slot] = np.nan if timestamp is None else timestamp  # type: ignore[index]
+        return True
+
+    def order(self) -> np.ndarray:
+        """Buffer slots in capture order (oldest first)"""
+        return (self._start + np.arange(self._count)) % max(1, self.capacity or 1)
+
+    def stack(self) -> FrameStack:
+        """
+        Frames in capture order as a FrameStack view (no copy)
+
+        The view shares the ring's buffer: frames pushed afterwards may
+        overwrite rows it refers to.
+
+        Returns:
+            FrameStack over the ring buffer
+        """
+        if self.data is None or not self._count:
+            raise ValueError("Frame ring is empty")
+        return FrameStack(self.data, self.order())
+
+    def timestamps(self) -> Optional[np.ndarray]:
+        """
+        Capture timestamps in capture order
+
+        Returns:
+            (N,) float64 seconds, or None unless every held frame has one
+        """
+        if self.times is None or not self._count:
+            return None
+        times = self.times[self.order()]
+        if np.isnan(times).any():
+            return None
+        return times  # type: ignore[no-any-return]
+
+    def images(self) -> List[Image.Image]:
+        """Frames in capture order as RGB PIL images (copies)"""
+        if not self._count:
+            return []
+        return self.stack().to_images()
+
+    def reserve(self, capacity: Optional[int]) -> None:
+        """
+        Set the capacity of the next recording on an empty ring
+
+        Args:
+            capacity: Frames to hold, or None to derive the capacity from
+                      max_bytes; a buffer of another capacity is released and
+                      reallocated by the next push()
+        """
+        if self._count:
+            raise ValueError("Cannot change the capacity of a ring holding frames")
+        if capacity is None and self.max_bytes is None:
+            raise ValueError("FrameRing needs a capacity or a byte budget")
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, got {capacity}")
+        if capacity != self._requested_capacity:
+            self._requested_capacity = capacity
+            self.capacity = capacity
+            self.data = self.times = None
+
+    def clear(self) -> None:
+        """Forget all frames (the buffer is kept for reuse at the same frame size)"""
+        self._start = 0
+        self._count = 0
+        self.dropped = 0
@@ -0,0 +1,537 @@
+"""
+FlashRecord GIF Writer
+Low-level GIF89a container for palette-index frames that share one global palette
+
+Key techniques:
+1. Single global color table written once (indices are never remapped)
+2. Inter-frame delta: each frame is cropped to the dirty rectangle of changed
+   indices, unchanged pixels inside it become a per-frame transparent index,
+   and frames are stacked with disposal=1 (do not dispose)
+3. LZW compression delegated to Pillow's C encoder, one image block at a time
+4. Optional local color tables: a frame may carry its own palette (e.g. one
+   per scene); the first frame after a palette switch is written in full
+
+Pillow's own multi-frame writer is avoided on purpose: with optimize=True it
+remaps palette indices per frame, which is the corruption that made
+compression.py pin optimize=False.
+"""
+
+import logging
+import math
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DISPOSAL_NONE = 1  # Leave the frame in place; the next frame draws over it
+
+
+def color_table_bits(n_colors: int) -> int:
+    """
+    Bits per entry of a GIF color table holding n_colors
+
+    Args:
+        n_colors: Number of palette entries
+
+    Returns:
+        Table bits (1..8); the table holds 2**bits entries
+    """
+    return min(8, max(1, math.ceil(math.log2(max(2, n_colors)))))
+
+
+def color_table(palette: Sequence[int]) -> bytes:
+    """Palette padded (or cut) to a full 2**bits-entry GIF color table"""
+    bits = color_table_bits(len(palette) // 3)
+    return bytes(palette[: 3 << bits]).ljust(3 << bits, b"\x00")
+
+
+def encode_image_data(indices: np.ndarray) -> bytes:
+    """
+    LZW-compress one palette-index frame into GIF image data
+
+    Pillow's GIF encoder does the LZW work; a single-frame save with
+    optimize=False keeps indices untouched (interlace=False keeps rows in
+    order, matching the descriptor we write), and only the image data
+    (LZW minimum code size + sub-blocks + terminator) is cut out of it.
+
+    Args:
+        indices: (H, W) uint8 palette indices
+
+    Returns:
+        Image data bytes ready to follow an image descriptor
+    """
+    bio = BytesIO()
+    Image.fromarray(np.ascontiguousarray(indices, dtype=np.uint8), mode="P").save(
+        bio, format="GIF", optimize=False, interlace=False
+    )
+    buf = bio.getbuffer()
+
+    # Logical screen descriptor flags -> skip the global color table
+    pos = 13
+    if buf[10] & 0x80:
+        pos += 3 << ((buf[10] & 0x07) + 1)
+
+    # Skip extensions up to the image descriptor
+    while buf[pos] == 0x21:
+        pos += 2
+        while buf[pos]:
+            pos += buf[pos] + 1
+        pos += 1
+    if buf[pos] != 0x2C:
+        raise ValueError("Unexpected GIF block while extracting image data")
+
+    flags = buf[pos + 9]
+    if flags & 0x40:
+        raise ValueError("Pillow wrote interlaced image data")
+    pos += 10
+    if flags & 0x80:
+        pos += 3 << ((flags & 0x07) + 1)
+
+    return bytes(buf[pos:-1])  # Drop the trailer
+
+
+def header_bytes(width: int, height: int, palette: Sequence[int], loop: Optional[int] = 0) -> bytes:
+    """
+    GIF89a header, logical screen descriptor, global color table and loop extension
+
+    Args:
+        width: Canvas width
+        height: Canvas height
+        palette: Flat RGB palette list (len multiple of 3)
+        loop: Loop count (0 = infinite, None = no loop extension)
+
+    Returns:
+        Header bytes
+    """
+    bits = color_table_bits(len(palette) // 3)
+    table = color_table(palette)
+
+    out = bytearray(b"GIF89a")
+    out += width.to_bytes(2, "little") + height.to_bytes(2, "little")
+    out += bytes((0x80 | ((bits - 1) << 4) | (bits - 1), 0, 0))
+    out += table
+    if loop is not None:
+        out += b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + int(loop).to_bytes(2, "little") + b"\x00"
+    return bytes(out)
+
+
+def frame_bytes(
+    data: bytes,
+    offset: Tuple[int, int],
+    size: Tuple[int, int],
+    duration_ms: int,
+    disposal: int = DISPOSAL_NONE,
+    transparency: Optional[int] = None,
+    local_palette: Optional[Sequence[int]] = None,
+) -> bytes:
+    """
+    Graphic control extension + image descriptor + image data for one frame
+
+    Args:
+        data: Image data from encode_image_data()
+        offset: (x, y) of the frame on the canvas
+        size: (width, height) of the frame
+        duration_ms: Frame duration in milliseconds (stored in 10ms units)
+        disposal: GIF disposal method
+        transparency: Transparent palette index, or None
+        local_palette: Flat RGB palette written as a local color table, or None
+                       to use the global table
+
+    Returns:
+        Frame bytes
+    """
+    delay = max(0, int(round(duration_ms / 10.0)))
+    packed = (disposal & 0x07) << 2 | (1 if transparency is not None else 0)
+    gce = bytes((0x21, 0xF9, 0x04, packed)) + delay.to_bytes(2, "little")
+    gce += bytes((transparency or 0, 0))
+
+    x, y = offset
+    w, h = size
+    descriptor = b"\x2c" + b"".join(v.to_bytes(2, "little") for v in (x, y, w, h))
+    if local_palette is None:
+        return gce + descriptor + b"\x00" + data
+    bits = color_table_bits(len(local_palette) // 3)
+    return gce + descriptor + bytes((0x80 | (bits - 1),)) + color_table(local_palette) + data
+
+
+def delta_region(
+    prev: np.ndarray, cur: np.ndarray, table_size: int
+) -> Tuple[Tuple[int, int], np.ndarray, Optional[int]]:
+    """
+    Dirty rectangle of cur relative to prev, with unchanged pixels made transparent
+
+    The transparent index is chosen per frame among table entries that no
+    changed pixel uses, so it can never hide a real color. If the changed
+    pixels use every entry, the crop is written opaque (still exact).
+
+    Args:
+        prev: (H, W) indices currently on the canvas
+        cur: (H, W) indices of the next frame
+        table_size: Entries in the global color table (2**bits)
+
+    Returns:
+        Tuple of ((x, y) offset, cropped indices, transparent index or None)
+    """
+    changed = prev != cur
+    rows = np.flatnonzero(changed.any(axis=1))
+    if rows.size == 0:
+        # Identical frame: one transparent pixel keeps the timing slot
+        return (0, 0), cur[:1, :1].copy(), int(cur[0, 0])
+
+    y0, y1 = int(rows[0]), int(rows[-1]) + 1
+    cols = np.flatnonzero(changed[y0:y1].any(axis=0))
+    x0, x1 = int(cols[0]), int(cols[-1]) + 1
+
+    crop = cur[y0:y1, x0:x1]
+    mask = changed[y0:y1, x0:x1]
+    if mask.all():
+        return (x0, y0), np.ascontiguousarray(crop), None
+
+    used = np.bincount(crop[mask], minlength=table_size)[:table_size]
+    free = np.flatnonzero(used == 0)
+    if free.size == 0:
+        return (x0, y0), np.ascontiguousarray(crop), None
+
+    transparency = int(free[0])
+    return (x0, y0), np.where(mask, crop, np.uint8(transparency)), transparency
+
+
+def frame_palettes(
+    frames: Sequence[Image.Image],
+) -> Optional[Tuple[List[int], Optional[List[List[int]]]]]:
+    """
+    Global and per-frame palettes for writing PIL frames straight into a GIF stream
+
+    Args:
+        frames: Candidate frames
+
+    Returns:
+        Tuple of (global palette, per-frame palettes or None when every frame
+        uses the global one), or None unless every frame is palette-mode and
+        the same size. The global palette is the one most frames use.
+    """
+    if not frames or frames[0].mode != "P":
+        return None
+    size = frames[0].size
+    if not all(f.mode == "P" and f.size == size for f in frames):
+        return None
+    palettes = [f.getpalette() for f in frames]
+    counts = Counter(tuple(p) for p in palettes)
+    if len(counts) == 1:
+        return palettes[0], None
+    return list(counts.most_common(1)[0][0]), palettes
+
+
+def sampled_gif_size(
+    frame_at: Callable[[int], np.ndarray],
+    n_frames: int,
+    palette: Sequence[int],
+    loop: Optional[int] = 0,
+    delta: bool = True,
+    sample: int = 8,
+    palette_at: Optional[Callable[[int], Optional[Sequence[int]]]] = None,
+) -> int:
+    """
+    Predict the encoded GIF size from a stratified sample of frames
+
+    Header, first frame and trailer are encoded exactly. Up to `sample` more
+    frames spread evenly over the rest are encoded as the stream would write
+    them (dirty rectangle against their predecessor when delta is on), and
+    their mean block size is extrapolated to the remaining frames. With
+    per-frame palettes, frames that switch palette (full frame plus local
+    table) are counted and sampled separately.
+
+    Args:
+        frame_at: Returns the (H, W) uint8 indices of frame i (called only for
+                  sampled frames and, with delta, their predecessors)
+        n_frames: Number of frames in the animation
+        palette: Flat RGB palette of the global color table
+        loop: Loop count (0 = infinite, None = play once)
+        delta: Predict dirty-rectangle encoding
+        sample: Frames sampled after the first one (per frame kind)
+        palette_at: Optional palette of frame i (None or the global palette =
+                    global table), as passed to GifStreamWriter.write_frame
+
+    Returns:
+        Predicted GIF size in bytes
+    """
+    if n_frames < 1:
+        raise ValueError("No frames to encode")
+
+    glob = list(palette)
+
+    def local_at(i: int) -> Optional[List[int]]:
+        pal = palette_at(i) if palette_at is not None else None
+        return None if pal is None or list(pal) == glob else list(pal)
+
+    def block_size(i: int, full: bool) -> int:
+        cur = np.asarray(frame_at(i), dtype=np.uint8)
+        local = local_at(i)
+        table_size = 1 << color_table_bits(len(local if local is not None else glob) // 3)
+        if delta and not full:
+            prev = np.asarray(frame_at(i - 1), dtype=np.uint8)
+            offset, crop, transparency = delta_region(prev, cur, table_size)
+        else:
+            offset, crop, transparency = (0, 0), cur, None
+        size = (crop.shape[1], crop.shape[0])
+        data = encode_image_data(crop)
+        return len(
+            frame_bytes(data, offset, size, 0, transparency=transparency, local_palette=local)
+        )
+
+    first = np.asarray(frame_at(0), dtype=np.uint8)
+    height, width = first.shape
+    total = float(len(header_bytes(width, height, palette, loop)) + 1)
+    total += block_size(0, True)
+
+    if n_frames > 1:
+        # Frames that switch palette are written in full
+        rest = np.arange(1, n_frames)
+        if palette_at is None:
+            switch = np.zeros(len(rest), dtype=bool)
+        else:
+            locals_ = [local_at(i) for i in range(n_frames)]
+            switch = np.array([locals_[i] != locals_[i - 1] for i in rest], dtype=bool)
+
+        for full, members in ((False, rest[~switch]), (True, rest[switch])):
+            if not len(members):
+                continue
+            picks = np.linspace(0, len(members) - 1, min(sample, len(members))).round()
+            picked = np.unique(members[picks.astype(int)]).tolist()
+            sizes = [block_size(i, full) for i in picked]
+            total += float(np.mean(sizes)) * len(members)
+
+    return int(round(total))
+
+
+class GifStreamWriter:
+    """
+    Incremental GIF writer: header and global palette once, then one frame per call
+
+    Each write_frame() LZW-encodes its frame and appends it to the output
+    immediately, so peak memory is about one frame (plus the previous frame's
+    indices when delta encoding) instead of the whole animation.
+    """
+
+    def __init__(
+        self,
+        fp,
+        palette: Sequence[int],
+        loop: Optional[int] = 0,
+        delta: bool = True,
+    ):
+        """
+        Initialize stream writer
+
+        Args:
+            fp: Output path or binary file object (paths are opened and closed here)
+            palette: Flat RGB palette of the global color table
+            loop: Loop count (0 = infinite, None = play once)
+            delta: Crop each frame to its dirty rectangle against the previous one
+        """
+        self._own_fp = isinstance(fp, (str, os.PathLike))
+        self._fp = open(fp, "wb") if self._own_fp else fp
+        self.palette = list(palette)
+        self.loop = loop
+        self.delta = delta
+        self.table_size = 1 << color_table_bits(len(self.palette) // 3)
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.closed = False
+        self.size: Optional[Tuple[int, int]] = None
+        self._frames_seen = 0
+        self._prev: Optional[np.ndarray] = None
+        self._prev_palette: Optional[List[int]] = None
+
+    def _write(self, data: bytes) -> None:
+        self._fp.write(data)
+        self.bytes_written += len(data)
+
+    def _prepare(
+        self, indices, palette: Optional[Sequence[int]] = None
+    ) -> Tuple[Tuple[int, int], np.ndarray, Optional[int], Optional[List[int]]]:
+        """
+        Validate the next frame, emit the header on the first one, and cut its region
+
+        Args:
+            indices: (H, W) uint8 palette indices (ndarray or palette-mode image)
+            palette: Frame palette (None or the global palette = global table)
+
+        Returns:
+            Tuple of ((x, y) offset, indices to encode, transparent index or None,
+            local palette or None)
+        """
+        if self.closed:
+            raise ValueError("GIF stream already closed")
+
+        i = self._frames_seen
+        indices = np.asarray(indices, dtype=np.uint8)
+        if indices.ndim != 2:
+            raise ValueError(f"Frame {i}: expected 2D index array, got shape {indices.shape}")
+        local = None
+        if palette is not None and list(palette) != self.palette:
+            local = list(palette)
+        table_size = self.table_size
+        if local is not None:
+            table_size = 1 << color_table_bits(len(local) // 3)
+        if int(indices.max()) >= table_size:
+            raise ValueError(
+                f"Frame {i}: index {int(indices.max())} outside {table_size}-entry palette"
+            )
+
+        height, width = indices.shape
+        if self.size is None:
+            self.size = (width, height)
+            self._write(header_bytes(width, height, self.palette, self.loop))
+        elif (width, height) != self.size:
+            raise ValueError(f"Frame {i}: size {(width, height)} differs from first {self.size}")
+
+        # Indices only mean the same color under the same palette
+        if self._prev is not None and local == self._prev_palette:
+            region = delta_region(self._prev, indices, table_size)
+        else:
+            region = (0, 0), indices, None
+
+        if self.delta:
+            # Own copy: callers may reuse their buffer for the next frame
+            self._prev = indices.copy()
+            self._prev_palette = local
+        self._frames_seen += 1
+        return (*region, local)
+
+    def _write_block(
+        self,
+        data: bytes,
+        offset: Tuple[int, int],
+        crop: np.ndarray,
+        duration_ms: int,
+        transparency: Optional[int],
+        local: Optional[List[int]],
+    ) -> None:
+        size = (crop.shape[1], crop.shape[0])
+        self._write(
+            frame_bytes(
+                data, offset, size, duration_ms, transparency=transparency, local_palette=local
+            )
+        )
+        self.frames_written += 1
+
+    def write_frame(
+        self, indices, duration_ms: int, palette: Optional[Sequence[int]] = None
+    ) -> None:
+        """
+        Encode and append one frame
+
+        Args:
+            indices: (H, W) uint8 palette indices (ndarray or palette-mode image)
+            duration_ms: Frame duration in milliseconds
+            palette: Frame palette written as a local color table when it
+                     differs from the global one (None = global table)
+        """
+        offset, crop, transparency, local = self._prepare(indices, palette)
+        self._write_block(encode_image_data(crop), offset, crop, duration_ms, transparency, local)
+
+    def write_frames(
+        self,
+        frames: Iterable,
+        durations_ms: Sequence[int],
+        workers: int = 1,
+        palettes: Optional[Sequence[Optional[Sequence[int]]]] = None,
+    ) -> None:
+        """
+        Encode and append many frames, LZW-compressing them in a process pool
+
+        Every GIF image block is an independent LZW stream, so once the dirty
+        rectangles are cut (cheap, done here in order) the blocks can be
+        encoded anywhere and stitched back in frame order. Pillow's encoder
+        holds the GIL, hence processes rather than threads. Only the cropped
+        indices are sent to workers, and at most workers * 4 frames are in
+        flight, so streaming memory stays bounded. Output is byte-identical
+        to calling write_frame() for each frame.
+
+        Args:
+            frames: Iterable of (H, W) uint8 index arrays or palette-mode images
+            durations_ms: Per-frame durations in milliseconds
+            workers: Worker processes (<= 1 encodes in this process)
+            palettes: Optional per-frame palettes (see write_frame)
+        """
+        if workers <= 1:
+            for i, indices in enumerate(frames):
+                self.write_frame(indices, durations_ms[i], palettes[i] if palettes else None)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+            for i, indices in enumerate(frames):
+                offset, crop, transparency, local = self._prepare(
+                    indices, palettes[i] if palettes else None
+                )
+                future = pool.submit(encode_image_data, crop)
+                pending.append((future, offset, crop, durations_ms[i], transparency, local))
+                if len(pending) >= workers * 4:
+                    future, *block = pending.popleft()
+                    self._write_block(future.result(), *block)
+            while pending:
+                future, *block = pending.popleft()
+                self._write_block(future.result(), *block)
+
+    def close(self) -> None:
+        """Write the trailer (if any frame was written) and close owned files"""
+        if self.closed:
+            return
+        self.closed = True
+        self._prev = None
+        self._prev_palette = None
+        try:
+            if self.frames_written:
+                self._write(b"\x3b")
+            if hasattr(self._fp, "flush"):
+                self._fp.flush()
+        finally:
+            if self._own_fp:
+                self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def encode_gif(
+    frames: Iterable[np.ndarray],
+    palette: Sequence[int],
+    durations_ms: Sequence[int],
+    loop: Optional[int] = 0,
+    delta: bool = True,
+    workers: int = 1,
+    palettes: Optional[Sequence[Optional[Sequence[int]]]] = None,
+) -> bytes:
+    """
+    Encode palette-index frames to GIF bytes
+
+    Args:
+        frames: Iterable of (H, W) uint8 index arrays of equal size
+        palette: Flat RGB palette of the global color table
+        durations_ms: Per-frame durations in milliseconds
+        loop: Loop count (0 = infinite, None = play once)
+        delta: Crop each frame to its dirty rectangle against the previous one
+        workers: Worker processes for LZW encoding (see GifStreamWriter.write_frames)
+        palettes: Optional per-frame palettes written as local color tables
+
+    Returns:
+        GIF file bytes
+    """
+    bio = BytesIO()
+    with GifStreamWriter(bio, palette, loop=loop, delta=delta) as writer:
+        writer.write_frames(frames, durations_ms, workers=workers, palettes=palettes)
+        if not writer.frames_written:
+            raise ValueError("No frames to encode")
+    return bio.getvalue()
@@ -0,0 +1,352 @@
+"""
+FlashRecord Live Encoder
+Producer/consumer GIF compression that runs while the screen is being recorded
+
+Pipeline:
+1. Producer (capture thread): submit() applies the frame-rate accumulator and
+   hands kept frames to a thread pool; at most queue_size frames are in
+   flight, so a slow machine applies backpressure instead of buffering the
+   whole recording
+2. Workers: LANCZOS downscale, coalescing thumbnail and scene histogram per
+   frame (PIL releases the GIL, so threads overlap)
+3. Assembler thread (frame order): duplicate coalescing, scene cuts, and a
+   provisional palette per scene built from its first `warmup` frames
+   (similar scenes reuse a cached palette); each frame is then quantized on
+   the pool, and per-entry color sums are kept
+4. finish(): every palette entry is moved to the mean color of the pixels
+   mapped to it (one Lloyd step, so indices stay valid and nothing is
+   requantized), durations come from the capture timestamps (or from the
+   coalesced weights when frames carry none), and the frames are written
+   with gif_writer
+
+Keyframe selection by saliency or motion needs the whole recording, so the
+live path keeps frame-rate subsampling and duplicate coalescing only.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image
+
+from .compression import FrameStack, InverseColormap
+from .frame_store import copy_frame
+from .gif_writer import GifStreamWriter
+
+logger = logging.getLogger(__name__)
+
+
+class LiveEncoder:
+    """
+    Compress frames to a GIF as they are captured
+
+    Call start(), then submit() once per captured frame from the capture
+    thread, then finish() after the recording stops.
+    """
+
+    def __init__(
+        self,
+        compressor,
+        input_fps=10,
+        target_fps=8,
+        colors=256,
+        dither="ordered",
+        workers=2,
+        queue_size=16,
+        warmup=4,
+    ):
+        """
+        Initialize live encoder
+
+        Args:
+            compressor: CWAMInspiredCompressor providing scale, coalescing and
+                        scene settings and the palette builder
+            input_fps: Capture FPS
+            target_fps: FPS after temporal subsampling
+            colors: Colors per palette
+            dither: Dither mode (see CWAMInspiredCompressor._dither_mode)
+            workers: Pool threads for downscaling and quantization
+            queue_size: Maximum frames submitted but not yet assembled
+            warmup: Frames of a scene used to build its provisional palette
+        """
+        self.compressor = compressor
+        self.input_fps = input_fps
+        self.target_fps = target_fps
+        self.colors = colors
+        self.dither = compressor._dither_mode(dither)
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.warmup = max(1, warmup)
+
+        self.frames_in = 0
+        self._times: List[Optional[float]] = []  # Capture timestamp per submitted frame
+        self.size: Optional[tuple] = None  # Scaled (width, height)
+        self._acc = 0.0
+        self._step = max(1.0, float(input_fps) / float(target_fps))
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._assembler: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+        # Assembler state (assembler thread only, until finish() joins it)
+        self._kept: List[dict] = []  # Per output frame: index, weight, palette, future
+        self._run_thumb: Optional[np.ndarray] = None
+        self._scene_hist: Optional[np.ndarray] = None
+        self._pending: List[tuple] = []  # (scaled, hist, entry) awaiting a palette
+        self._palettes: List[dict] = []  # pal, hist, quantize
+        self._active: Optional[int] = None
+        self.coalesced = 0
+
+    def start(self) -> "LiveEncoder":
+        """Start the worker pool and the assembler thread"""
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._assembler = threading.Thread(target=self._assemble, daemon=True)
+        self._assembler.start()
+        return self
+
+    def submit(self, frame, timestamp: Optional[float] = None) -> bool:
+        """
+        Hand one captured frame to the pipeline (capture thread)
+
+        Blocks while queue_size frames are in flight.
+
+        Args:
+            frame: PIL image or (H, W, 3) uint8 array (arrays are copied, since
+                   capture backends may hand out views of a reused buffer)
+            timestamp: Capture time in seconds; when every frame has one,
+                       durations follow the measured gaps
+
+        Returns:
+            True if the frame was kept by frame-rate subsampling
+        """
+        if self._pool is None:
+            raise RuntimeError("LiveEncoder not started")
+        i = self.frames_in
+        self.frames_in += 1
+        self._times.append(timestamp)
+
+        # Same accumulator as _frame_rate_indices: the decision for frame i
+        # depends on i only, so it can be made as frames arrive
+        keep = self._acc <= 0.0
+        self._acc += 1.0
+        if self._acc >= self._step:
+            self._acc -= self._step
+        if not keep:
+            return False
+
+        if not isinstance(frame, Image.Image):
+            pixels = np.asarray(frame)
+            frame = np.empty(pixels.shape, dtype=np.uint8)
+            copy_frame(frame, pixels)
+        if self.size is None:
+            w, h = frame.size if isinstance(frame, Image.Image) else frame.shape[1::-1]
+            self.size = self.compressor._scaled_size((w, h))
+        self._queue.put((i, self._pool.submit(self._prepare, i, frame)))
+        return True
+
+    def _prepare(self, i: int, frame) -> tuple:
+        """Worker: scaled RGB pixels, coalescing thumbnail and scene histogram"""
+        image = frame if isinstance(frame, Image.Image) else Image.fromarray(frame)
+        if image.mode != "RGB":
+            image = self.compressor._safe_convert(image, "RGB")
+        scaled = np.asarray(self.compressor._scale_frame(i, image, self.size))
+        factor = max(1, max(self.size) // 256)
+        thumb = np.asarray(Image.fromarray(scaled).reduce(factor).convert("L"), dtype=np.int16)
+        hist = self.compressor._scene_histograms([scaled])[0]
+        return scaled, thumb, hist
+
+    def _assemble(self) -> None:
+        """Assembler thread: consume prepared frames in capture order"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue  # Keep draining so the producer never blocks
+            try:
+                self._add(item[0], *item[1].result())
+            except BaseException as e:  # Surfaced by finish()
+                logger.error(f"Live encoding failed: {e}", exc_info=True)
+                self._error = e
+
+    def _add(self, i: int, scaled: np.ndarray, thumb: np.ndarray, hist: np.ndarray) -> None:
+        tolerance = self.compressor.coalesce_tolerance
+        if tolerance is not None and self._run_thumb is not None:
+            if int(np.abs(thumb - self._run_thumb).max()) <= tolerance:
+                self._kept[-1]["weight"] += 1
+                self.coalesced += 1
+                return
+        self._run_thumb = thumb
+
+        entry = {"index": i, "weight": 1, "palette": None, "future": None}
+        self._kept.append(entry)
+
+        if self._scene_hist is not None:
+            if 0.5 * np.abs(hist - self._scene_hist).sum() > self.compressor.scene_cut:
+                self._open_palette()  # Close the previous scene
+                self._active = None
+                self._scene_hist = hist
+        else:
+            self._scene_hist = hist
+
+        if self._active is None:
+            self._pending.append((scaled, hist, entry))
+            if len(self._pending) >= self.warmup:
+                self._open_palette()
+        else:
+            self._quantize(scaled, entry, self._active)
+
+    def _open_palette(self) -> None:
+        """Build (or reuse) the palette for the pending scene frames and quantize them"""
+        if not self._pending:
+            return
+        hist = np.mean([h for _, h, _ in self._pending], axis=0)
+        match = None
+        for k, p in enumerate(self._palettes):
+            if 0.5 * np.abs(hist - p["hist"]).sum() <= self.compressor.scene_reuse:
+                match = k
+                break
+        if match is None:
+            stack = FrameStack(np.stack([s for s, _, _ in self._pending]))
+            pal = self.compressor._build_global_palette(stack, colors=self.colors)
+            self._palettes.append({"pal": pal, "hist": hist, "quantize": self._quantizer(pal)})
+            match = len(self._palettes) - 1
+            logger.info(f"[*] Live palette {match} from {len(self._pending)} frames")
+
+        self._active = match
+        for scaled, _, entry in self._pending:
+            self._quantize(scaled, entry, match)
+        self._pending = []
+
+    def _quantizer(self, pal: list):
+        """RGB -> indices mapping for one palette, safe to call from pool threads"""
+        if self.dither == "ordered":
+            return InverseColormap(pal).map_ordered
+
+        palette_img = Image.new("P", (1, 1))
+        palette_img.putpalette(pal)
+        palette_img.load()
+        dither = Image.Dither.NONE
+        if self.dither == "floyd-steinberg":
+            dither = Image.Dither.FLOYDSTEINBERG
+
+        def quantize(rgb: np.ndarray) -> np.ndarray:
+            q = Image.fromarray(rgb).quantize(palette=palette_img, colors=256, dither=dither)
+            return np.asarray(q)
+
+        return quantize
+
+    def _quantize(self, scaled: np.ndarray, entry: dict, k: int) -> None:
+        entry["palette"] = k
+        entry["future"] = self._pool.submit(self._map, scaled, k)  # type: ignore[union-attr]
+
+    def _map(self, scaled: np.ndarray, k: int) -> tuple:
+        """Worker: palette indices plus per-entry pixel counts and RGB sums"""
+        indices = self._palettes[k]["quantize"](scaled)
+        flat = indices.ravel()
+        counts = np.bincount(flat, minlength=256)
+        rgb = scaled.reshape(-1, 3)
+        sums = np.stack(
+            [np.bincount(flat, weights=rgb[:, c], minlength=256) for c in range(3)], axis=1
+        )
+        return indices, counts, sums
+
+    def finish(self, loop=0, output=None) -> tuple:
+        """
+        Drain the pipeline, refine the palettes and encode the GIF
+
+        Args:
+            loop: Loop count (0 = infinite)
+            output: Optional path or binary file object the GIF is streamed
+                    to, frame by frame, instead of being returned as bytes
+
+        Returns:
+            Tuple of (gif_bytes, or None when written to output, metadata)
+        """
+        if self._pool is None or self._assembler is None:
+            raise RuntimeError("LiveEncoder not started")
+        start = time.perf_counter()
+        self._queue.put(None)
+        self._assembler.join()
+        try:
+            if self._error is not None:
+                raise self._error
+            if not self._kept:
+                raise ValueError("No frames to encode")
+            self._open_palette()  # Scene still in warmup when recording stopped
+            drain_ms = (time.perf_counter() - start) * 1000.0
+
+            mapped = [e["future"].result() for e in self._kept]
+
+            # Palette fix-up: each entry moves to the mean color it stands for
+            palettes = []
+            for k, p in enumerate(self._palettes):
+                counts = np.zeros(256)
+                sums = np.zeros((256, 3))
+                for e, (_, c, s) in zip(self._kept, mapped):
+                    if e["palette"] == k:
+                        counts += c
+                        sums += s
+                table = np.asarray(p["pal"], dtype=np.float64).reshape(-1, 3)[:256].copy()
+                used = counts > 0
+                table[used] = sums[used] / counts[used, None]
+                palettes.append(np.clip(np.round(table), 0, 255).astype(int).ravel().tolist())
+
+            fps_in = self.input_fps
+            weights = np.array([e["weight"] for e in self._kept])
+            if None not in self._times:
+                # Each output frame is shown until the next one was captured
+                frame_ms = self.compressor._frame_times_ms(self._times, fps_in)
+                weights = np.add.reduceat(frame_ms, [e["index"] for e in self._kept])
+                fps_in = self.frames_in * 1000.0 / float(frame_ms.sum())
+            durations = self.compressor._durations_for_preserve(
+                self.frames_in, fps_in, len(self._kept), weights=weights
+            )
+            frame_palettes = [palettes[e["palette"]] for e in self._kept]
+            use = np.bincount([e["palette"] for e in self._kept], minlength=len(palettes))
+            global_pal = palettes[int(np.argmax(use))]
+
+            encode_start = time.perf_counter()
+            bio = BytesIO() if output is None else None
+            with GifStreamWriter(output if bio is None else bio, global_pal, loop=loop) as writer:
+                writer.write_frames(
+                    (indices for indices, _, _ in mapped),
+                    durations,
+                    workers=self.compressor.workers,
+                    palettes=frame_palettes if len(palettes) > 1 else None,
+                )
+            data = None if bio is None else bio.getvalue()
+            size = writer.bytes_written
+            encode_ms = (time.perf_counter() - encode_start) * 1000.0
+        finally:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+        meta = {
+            "orig_fps": self.input_fps,
+            "orig_frames": self.frames_in,
+            "frames_out": len(self._kept),
+            "coalesced": self.coalesced,
+            "colors": self.colors,
+            "dither": self.dither,
+            "palettes": len(palettes),
+            "scale_factor": round(self.compressor.scale_factor, 4),
+            "size_mb": round(size / (1024 * 1024), 4),
+            "total_ms": sum(durations),
+            "durations_ms": durations,
+            "timings_ms": {
+                "drain": round(drain_ms, 1),
+                "encode": round(encode_ms, 1),
+                "finish": round((time.perf_counter() - start) * 1000.0, 1),
+            },
+        }
+        logger.info(
+            f"[+] Live GIF: {self.frames_in} -> {len(self._kept)} frames, "
+            f"{len(palettes)} palettes, {size} bytes"
+        )
+        return data, meta
@@ -0,0 +1,241 @@
+"""
+FlashRecord Output Backends
+Animation containers behind one interface, so target-size compression can
+write GIF, animated WebP or APNG
+
+Backends:
+1. gif: GIF89a via gif_writer (global palette, delta frames, local tables)
+2. webp: lossy animated WebP (libwebp via Pillow, quality 0-100)
+3. webp-lossless: lossless animated WebP
+4. apng: animated PNG (Pillow; palette-mode frames become 8-bit PNG frames)
+
+Every backend takes PIL frames plus per-frame durations and returns file
+bytes, or writes them with save() (the GIF backend streams frame by frame
+without holding the file in memory). Palette backends expect frames already mapped to one palette (see
+CWAMInspiredCompressor._apply_global_palette); lossy backends expose a
+quality knob that compress_to_target lowers before touching resolution.
+New formats plug in through register_backend().
+"""
+
+import logging
+import os
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, features
+
+from .gif_writer import GifStreamWriter, frame_palettes
+
+logger = logging.getLogger(__name__)
+
+
+class OutputBackend:
+    """
+    Base class for animation output formats
+
+    Subclasses set the class attributes and implement encode().
+    """
+
+    name = ""
+    extension = ""
+    palette = False  # Wants palette-mode frames (quantized by the caller)
+    lossy = False  # Has a quality knob
+    qualities: Tuple[int, ...] = ()  # Quality ladder, best first (lossy backends)
+
+    def available(self) -> bool:
+        """Whether the installed Pillow can write this format"""
+        return True
+
+    def encode(
+        self,
+        frames: Sequence[Image.Image],
+        durations_ms: Sequence[int],
+        loop: int = 0,
+        quality: Optional[int] = None,
+    ) -> bytes:
+        """
+        Encode frames to file bytes
+
+        Args:
+            frames: PIL frames of equal size (palette-mode when self.palette)
+            durations_ms: Per-frame durations in milliseconds
+            loop: Loop count (0 = infinite)
+            quality: Quality for lossy backends (None = first rung of self.qualities)
+
+        Returns:
+            Encoded file bytes
+        """
+        raise NotImplementedError
+
+    def save(
+        self,
+        frames: Sequence[Image.Image],
+        output,
+        durations_ms: Sequence[int],
+        loop: int = 0,
+        quality: Optional[int] = None,
+    ) -> int:
+        """
+        Encode frames and write them to a path or binary file object
+
+        Returns:
+            Number of bytes written
+        """
+        data = self.encode(frames, durations_ms, loop=loop, quality=quality)
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, "wb") as f:
+                f.write(data)
+        else:
+            output.write(data)
+        return len(data)
+
+    def _check(self, frames: Sequence[Image.Image], durations_ms: Sequence[int]) -> None:
+        if not frames:
+            raise ValueError("No frames to encode")
+        if len(durations_ms) != len(frames):
+            raise ValueError(f"Got {len(durations_ms)} durations for {len(frames)} frames")
+        if not self.available():
+            raise RuntimeError(f"Pillow was built without {self.name} support")
+
+
+class GifBackend(OutputBackend):
+    """GIF89a through gif_writer: indices are written as-is, never re-quantized"""
+
+    name = "gif"
+    extension = ".gif"
+    palette = True
+
+    def __init__(self, delta: bool = True, workers: int = 1):
+        """
+        Args:
+            delta: Encode frames as dirty rectangles against the previous frame
+            workers: LZW worker processes (see GifStreamWriter.write_frames)
+        """
+        self.delta = delta
+        self.workers = workers
+
+    def encode(self, frames, durations_ms, loop=0, quality=None) -> bytes:
+        bio = BytesIO()
+        self.save(frames, bio, durations_ms, loop=loop, quality=quality)
+        return bio.getvalue()
+
+    def save(self, frames, output, durations_ms, loop=0, quality=None) -> int:
+        """Stream frames to a path or binary file object, one frame at a time"""
+        self._check(frames, durations_ms)
+        tables = frame_palettes(frames)
+        if tables is None:
+            raise ValueError("GIF backend needs palette-mode frames of one size")
+        with GifStreamWriter(output, tables[0], loop=loop, delta=self.delta) as writer:
+            writer.write_frames(
+                (np.asarray(f) for f in frames),
+                durations_ms,
+                workers=self.workers,
+                palettes=tables[1],
+            )
+        return writer.bytes_written
+
+
+class WebPBackend(OutputBackend):
+    """Animated WebP through Pillow's libwebp binding"""
+
+    extension = ".webp"
+
+    def __init__(self, lossless: bool = False, method: int = 4):
+        """
+        Args:
+            lossless: Lossless VP8L frames instead of lossy VP8
+            method: libwebp effort 0 (fast) - 6 (small)
+        """
+        self.lossless = lossless
+        self.method = method
+        self.name = "webp-lossless" if lossless else "webp"
+        self.lossy = not lossless
+        self.qualities = () if lossless else (80, 65, 50, 35, 20)
+
+    def available(self) -> bool:
+        return bool(features.check_module("webp"))
+
+    def encode(self, frames, durations_ms, loop=0, quality=None) -> bytes:
+        self._check(frames, durations_ms)
+        if quality is None:
+            quality = self.qualities[0] if self.qualities else 80
+        frames = [f if f.mode in ("RGB", "RGBA") else f.convert("RGB") for f in frames]
+        bio = BytesIO()
+        frames[0].save(
+            bio,
+            format="WEBP",
+            save_all=True,
+            append_images=frames[1:],
+            duration=list(durations_ms),
+            loop=loop,
+            lossless=self.lossless,
+            quality=quality,  # With lossless, compression effort instead of fidelity
+            method=self.method,
+        )
+        return bio.getvalue()
+
+
+class ApngBackend(OutputBackend):
+    """Animated PNG through Pillow; frames sharing one palette stay 8-bit"""
+
+    name = "apng"
+    extension = ".png"
+    palette = True
+
+    def encode(self, frames, durations_ms, loop=0, quality=None) -> bytes:
+        self._check(frames, durations_ms)
+        tables = frame_palettes(frames)
+        if tables is None or tables[1] is not None:
+            # APNG has one PLTE chunk: mixed or missing palettes go out as RGB
+            frames = [f.convert("RGB") for f in frames]
+        bio = BytesIO()
+        frames[0].save(
+            bio,
+            format="PNG",
+            save_all=True,
+            append_images=list(frames[1:]),
+            duration=list(durations_ms),
+            loop=loop,
+        )
+        return bio.getvalue()
+
+
+_BACKENDS: Dict[str, OutputBackend] = {}
+
+
+def register_backend(backend: OutputBackend) -> None:
+    """
+    Make a backend available to get_backend() and compress_to_target(format=...)
+
+    Args:
+        backend: Backend instance; replaces any backend of the same name
+    """
+    if not backend.name:
+        raise ValueError("Backend needs a name")
+    _BACKENDS[backend.name] = backend
+
+
+def get_backend(name: str) -> OutputBackend:
+    """
+    Look up a registered backend by name
+
+    Args:
+        name: Backend name ('gif', 'webp', 'webp-lossless', 'apng', or registered)
+
+    Returns:
+        Backend instance
+    """
+    backend = _BACKENDS.get(str(name).lower())
+    if backend is None:
+        raise ValueError(f"Unknown output format: {name} (available: {', '.join(_BACKENDS)})")
+    return backend
+
+
+def available_backends() -> List[str]:
+    """Names of registered backends the installed Pillow can write"""
+    return [name for name, backend in _BACKENDS.items() if backend.available()]
+
+
+for _backend in (GifBackend(), WebPBackend(), WebPBackend(lossless=True), ApngBackend()):
+    register_backend(_backend)
@@ -0,0 +1,132 @@
+"""
+FlashRecord Capture Scheduler
+Drift-free frame pacing on the monotonic clock
+
+Key techniques:
+1. Absolute deadlines: slot k is due at start + k / fps, so a slow grab
+   delays one frame instead of shifting every later frame (no accumulated
+   drift from sleeping 'interval - elapsed')
+2. Missed slots are skipped, not bunched: a tick that wakes a whole
+   interval or more past its deadline jumps to the latest due slot and
+   counts the skipped ones as dropped
+3. Every tick returns its real capture time, so encoders can use measured
+   frame durations instead of assuming 1000 / fps
+4. stats(): achieved fps, lateness (jitter) percentiles and dropped slots
+"""
+
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class FrameScheduler:
+    """
+    Paces a capture loop at a fixed rate against absolute deadlines
+
+    Call start() once, then wait() before every grab.
+    """
+
+    def __init__(
+        self,
+        fps: float,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            fps: Target capture rate
+            clock: Monotonic clock in seconds (default: time.perf_counter)
+            sleep: Sleep function (injectable for tests)
+        """
+        if fps <= 0:
+            raise ValueError(f"FPS must be positive, got {fps}")
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.clock = clock
+        self.sleep = sleep
+        self.start_time: Optional[float] = None
+        self.dropped_slots = 0
+        self.timestamps: List[float] = []  # Tick times, seconds since start()
+        self._lateness: List[float] = []  # Tick time minus its deadline, seconds
+        self._slot = 0  # Next slot to serve
+
+    def start(self) -> "FrameScheduler":
+        """Anchor slot 0 at the current time and reset the statistics"""
+        self.start_time = self.clock()
+        self.dropped_slots = 0
+        self.timestamps = []
+        self._lateness = []
+        self._slot = 0
+        return self
+
+    def elapsed(self) -> float:
+        """Seconds since start()"""
+        if self.start_time is None:
+            return 0.0
+        return self.clock() - self.start_time
+
+    def wait(self) -> float:
+        """
+        Sleep until the next slot's deadline and claim it
+
+        When the loop has fallen a full interval or more behind, the slots
+        already past are dropped and the most recent one is served at once.
+
+        Returns:
+            Capture timestamp in seconds since start()
+        """
+        if self.start_time is None:
+            self.start()
+        now = self.clock() - self.start_time  # type: ignore[operator]
+        deadline = self._slot * self.interval
+
+        behind = int((now - deadline) // self.interval)
+        if behind > 0:
+            self.dropped_slots += behind
+            self._slot += behind
+            deadline = self._slot * self.interval
+
+        if now < deadline:
+            self.sleep(deadline - now)
+            now = self.clock() - self.start_time  # type: ignore[operator]
+
+        self._slot += 1
+        self.timestamps.append(now)
+        self._lateness.append(max(0.0, now - deadline))
+        return now
+
+    def stats(self) -> dict:
+        """
+        Pacing statistics since start()
+
+        Returns:
+            dict with frames (ticks served), achieved_fps (ticks over the
+            span from the first tick to one interval past the last),
+            jitter_ms (p50/p95/p99/max lateness behind the deadline) and
+            dropped_slots
+        """
+        n = len(self.timestamps)
+        achieved = 0.0
+        if n:
+            span = self.timestamps[-1] - self.timestamps[0] + self.interval
+            achieved = n / span
+        if self._lateness:
+            late = np.asarray(self._lateness) * 1000.0
+            p50, p95, p99 = np.percentile(late, [50, 95, 99])
+            jitter = {
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+                "max": round(float(late.max()), 2),
+            }
+        else:
+            jitter = {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "frames": n,
+            "achieved_fps": round(achieved, 2),
+            "jitter_ms": jitter,
+            "dropped_slots": self.dropped_slots,
+        }
@@ -4,21 +4,38 @@ ScreenToGif-like functionality for FlashRecord v0.3.0
 With KAIROS-inspired compression
 """
 
+import math
 import os
 import threading
 import time
 
-import imageio
-from PIL import ImageGrab
-
-from .compression import GIFCompressor
+from .capture_backends import CaptureEnded, create_capture_backend
+from .capture_region import resolve_region
+from .compression import FrameStack, GIFCompressor
+from .frame_store import FrameRing
+from .live_encoder import LiveEncoder
+from .scheduler import FrameScheduler
 from .utils import get_timestamp
 
+DEFAULT_BUFFER_MB = 1024  # Capture buffer of recordings without a duration
+
 
 class ScreenRecorder:
     """Record screen to animated GIF"""
 
-    def __init__(self, fps=10, quality=85, compression="balanced"):
+    def __init__(
+        self,
+        fps=10,
+        quality=85,
+        compression="balanced",
+        buffer_frames=None,
+        buffer_mb=None,
+        overflow="stop",
+        live=False,
+        live_workers=2,
+        capture_backend=None,
+        region=None,
+    ):
         """
         Initialize screen recorder
 
@@ -26,14 +43,50 @@ class ScreenRecorder:
             fps: Frames per second (default: 10)
             quality: GIF quality 1-100 (default: 85)
             compression: 'high', 'balanced', 'compact', or 'none' (default: 'balanced')
+            buffer_frames: Capture buffer capacity in frames (overrides buffer_mb)
+            buffer_mb: Capture buffer budget in MB of raw RGB frames. Default:
+                       recordings with a duration get a buffer for the whole
+                       duration; without one, 1024 MB (about 170 frames at
+                       1920x1080, or 17s at 10 fps). An explicit budget that
+                       cannot hold a duration is reported when capture starts
+            overflow: When the buffer is full - 'stop' (end the recording with
+                      a message; default) or 'drop-oldest' (keep the latest
+                      frames; the dropped count is reported on save)
+            live: Compress while recording (LiveEncoder) so stopping only
+                  leaves the palette fix-up and encode; ignored with
+                  compression 'none'
+            live_workers: Worker threads of the live encoder
+            capture_backend: Capture backend name or CaptureBackend instance
+                             (default: first available, e.g. 'xshm' on X11;
+                             see capture_backends)
+            region: Part of the screen to record: (left, top, right, bottom),
+                    'WxH+X+Y', monitor index / 'monitor:N' or 'window:<title>'
+                    (default: whole screen; see capture_region). Resolved when
+                    each recording starts
         """
         self.fps = fps
         self.quality = quality
         self.compression_mode = compression
-        self.frames = []
+        # Captures are copied into one preallocated ring buffer
+        self.buffer_frames = buffer_frames
+        self.buffer_mb = buffer_mb
+        self.store = FrameRing(
+            capacity=buffer_frames,
+            max_bytes=int((DEFAULT_BUFFER_MB if buffer_mb is None else buffer_mb) * 1024 * 1024),
+            overflow=overflow,
+        )
+        self.frames = []  # Frames added by callers (used when nothing was captured)
+        self.live_encoding = live
+        self.live_workers = live_workers
+        self.live = None  # LiveEncoder of the current recording (live mode)
+        self.capture_backend = capture_backend
+        self.capture = None  # CaptureBackend of the current/last recording
+        self.region = region
+        self.bbox = None  # Screen rectangle of the current/last recording (None = all)
         self.is_recording = False
         self._capture_thread = None
-        self._start_time = None
+        self.scheduler = None  # FrameScheduler pacing the current/last recording
+        self.last_save = None  # Size and stage timings of the last save_gif()
 
     def start_recording(self, duration=None):
         """
@@ -41,14 +94,45 @@ class ScreenRecorder:
 
         Args:
             duration: Optional duration in seconds (None = manual stop)
+
+        Returns:
+            True if capture started; False (recorder state unchanged) when
+            already recording or the region or capture backend is invalid
         """
         if self.is_recording:
             print("[-] Already recording")
             return False
-
+        try:
+            bbox = resolve_region(self.region)
+        except ValueError as e:
+            print(f"[-] Capture region: {e}")
+            return False
+        try:
+            capture = create_capture_backend(self.capture_backend)
+        except Exception as e:
+            print(f"[-] Capture backend: {e}")
+            return False
+        if self.region is not None:
+            try:
+                capture.set_bbox(bbox)
+            except ValueError as e:
+                capture.close()
+                print(f"[-] Capture region: {e}")
+                return False
+
+        self.bbox = bbox
+        self.capture = capture
         self.is_recording = True
-        self.frames = []
-        self._start_time = time.time()
+        self.clear_frames()
+        if self.buffer_frames is None and self.buffer_mb is None:
+            # A timed recording gets a buffer for its whole duration
+            self.store.reserve(math.ceil(duration * self.fps) if duration else None)
+        if self.live_encoding and self.compression_mode and self.compression_mode != "none":
+            compressor = GIFCompressor(target_size_mb=10, quality=self.compression_mode)
+            self.live = LiveEncoder(
+                compressor, input_fps=self.fps, dither=True, workers=self.live_workers
+            ).start()
+        self.scheduler = FrameScheduler(self.fps).start()
 
         # Start capture thread
         self._capture_thread = threading.Thread(
@@ -73,81 +157,234 @@ class ScreenRecorder:
         """
         Capture frames at specified FPS
 
+        Grabs are paced by self.scheduler against absolute deadlines on the
+        monotonic clock; slots missed by slow grabs are skipped (and counted)
+        rather than captured late in a burst. Every frame is stored with its
+        capture timestamp. Persistent backends (e.g. xshm) keep their
+        connection for the whole loop and are closed when it ends.
+
         Args:
             duration: Optional auto-stop duration in seconds
         """
-        interval = 1.0 / self.fps
-        frame_count = 0
-
-        while self.is_recording:
-            loop_start = time.time()
-
-            # Check duration limit
-            if duration and (loop_start - self._start_time) >= duration:
-                self.is_recording = False
-                break
-
-            try:
-                # Capture screen
-                screenshot = ImageGrab.grab()
-
-                # Optional: Resize for smaller GIF (50% scale)
-                # screenshot = screenshot.resize(
-                #     (screenshot.width // 2, screenshot.height // 2)
-                # )
+        scheduler = self.scheduler
+        try:
+            while self.is_recording:
+                timestamp = scheduler.wait()
+                if not self.is_recording:
+                    break  # Stopped while waiting for the slot
+
+                # Check duration limit
+                if duration and timestamp >= duration:
+                    self.is_recording = False
+                    break
+
+                try:
+                    # Capture screen (arrays may be views of the backend's buffer;
+                    # the ring and the live encoder copy them)
+                    screenshot = self.capture.grab()
+
+                    if self.live is not None:
+                        # Blocks while the encoder is behind (bounded queue)
+                        self.live.submit(screenshot, timestamp)
+                    elif self.store.push(screenshot, timestamp):
+                        if duration and len(self.store) == 1:
+                            self._check_buffer(duration)
+                    else:
+                        print(
+                            f"[!] Capture buffer full after {len(self.store)} frames "
+                            f"({timestamp:.1f}s, {self.store.nbytes / 2**20:.0f}MB), "
+                            "recording stopped - raise buffer_mb to record longer"
+                        )
+                        self.is_recording = False
+                        break
+
+                except CaptureEnded:
+                    print("[*] Capture source ended, recording stopped")
+                    self.is_recording = False
+                    break
+                except Exception as e:
+                    print(f"[-] Frame capture error: {e}")
+        finally:
+            self.capture.close()
+
+    def _check_buffer(self, duration):
+        """Report, on the first frame, a capture buffer too small for duration"""
+        seconds = self.store.capacity / float(self.fps)
+        if seconds < duration:
+            width, height = self.store.size
+            print(
+                f"[!] Capture buffer holds {self.store.capacity} frames of {width}x{height} "
+                f"({seconds:.1f}s at {self.fps} fps, {self.store.nbytes / 2**20:.0f}MB): "
+                f"the {duration}s recording will stop early - raise buffer_mb or use live mode"
+            )
 
-                self.frames.append(screenshot)
-                frame_count += 1
+    def clear_frames(self):
+        """Drop captured and caller-added frames (the capture buffer is reused)"""
+        self.store.clear()
+        self.frames = []
+        self.live = None
 
-            except Exception as e:
-                print(f"[-] Frame capture error: {e}")
+    def recorded_frames(self):
+        """
+        Frames to encode, in capture order
 
-            # Maintain FPS
-            elapsed = time.time() - loop_start
-            sleep_time = max(0, interval - elapsed)
-            time.sleep(sleep_time)
+        Returns:
+            FrameStack view over the capture buffer, or the caller-added
+            frames list when nothing was captured
+        """
+        if self.store:
+            return self.store.stack()
+        return self.frames
 
     def save_gif(self, output_path):
         """
         Save captured frames as GIF with KAIROS-inspired compression
 
+        Frames are quantized once, against one global palette, and streamed
+        frame by frame into the file (the GIF is never built in memory):
+        compress_to_target(output=) when compression is on (with the
+        recorder's fps as input_fps), or a single full-resolution global
+        palette with compression 'none'. Captured frames carry their
+        capture timestamps, so frame durations follow the measured gaps
+        (late or skipped slots included) rather than 1000 / fps. Stage
+        timings and the final size are kept in self.last_save and reported by
+        get_stats().
+
+        After a live recording the frames were already scaled and quantized
+        during capture; only LiveEncoder.finish() (palette fix-up and encode,
+        streamed into the file) runs here. The live path makes a single pass at the preset scale
+        instead of searching for the target size.
+
         Args:
             output_path: Path to save GIF file
 
         Returns:
             True if successful, False otherwise
         """
-        if not self.frames:
+        if self.live is not None:
+            return self._save_live(output_path)
+
+        frames_in = self.recorded_frames()
+        if not len(frames_in):
             print("[-] No frames to save")
             return False
+        timestamps = self.store.timestamps() if self.store else None
+        if self.store and self.store.dropped:
+            start_s = self.store.dropped / float(self.fps)
+            if timestamps is not None:
+                start_s = float(timestamps[0])
+            print(
+                f"[!] Capture buffer overflowed: {self.store.dropped} oldest frames dropped, "
+                f"GIF starts {start_s:.1f}s into the recording"
+            )
 
         try:
+            start = time.perf_counter()
+
             # Ensure directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
-            # Apply compression if enabled
-            frames_to_save = self.frames
             if self.compression_mode and self.compression_mode != "none":
                 compressor = GIFCompressor(target_size_mb=10, quality=self.compression_mode)
-                frames_to_save = compressor.compress_frames(self.frames)
-
-                # Show compression stats
-                stats = compressor.estimate_compression_ratio(self.frames, frames_to_save)
-                if stats:
-                    print(
-                        f"[*] Compression: {stats['original_frames']} -> {stats['compressed_frames']} frames"
+                with open(output_path, "wb") as f:
+                    _, meta = compressor.compress_to_target(
+                        frames_in,
+                        target_mb=compressor.target_size_mb,
+                        input_fps=self.fps,
+                        dither=True,
+                        timestamps=timestamps,
+                        output=f,
                     )
-                    print(f"[*] Frame reduction: {stats['frame_reduction']}")
-
-            # Save as GIF with imageio
-            imageio.mimsave(
-                output_path,
-                frames_to_save,
-                duration=1000 / self.fps,  # Duration per frame in ms
-                loop=0,  # Infinite loop
-            )
+                timings = dict(meta["timings_ms"])
+                # Encodes stream straight into the file, so encoding is the write
+                timings["write"] = timings.pop("encode")
+                frames_out = meta["frames_out"]
+                print(f"[*] Compression: {len(frames_in)} -> {frames_out} frames")
+            else:
+                # Full resolution, every frame: one global palette, streamed to disk
+                compressor = GIFCompressor(target_size_mb=10)
+                frames = frames_in
+                if not isinstance(frames, FrameStack):
+                    frames = [compressor._safe_convert(f, "RGB") for f in frames]
+                durations = None
+                if timestamps is not None:
+                    frame_ms = compressor._frame_times_ms(timestamps, self.fps)
+                    durations = compressor._durations_for_preserve(
+                        len(frames),
+                        len(frames) * 1000.0 / float(frame_ms.sum()),
+                        len(frames),
+                        weights=frame_ms,
+                    )
+                timings = {}
+                pal = compressor._timed(
+                    timings, "palette", compressor._build_global_palette, frames
+                )
+                qframes = compressor._timed(
+                    timings, "quantize", compressor._apply_global_palette, frames, pal, dither=True
+                )
+                compressor._timed(
+                    timings,
+                    "write",
+                    compressor.write_gif,
+                    qframes,
+                    output_path,
+                    duration_ms=1000 / self.fps,
+                    durations_ms=durations,
+                    loop=0,
+                )
+                timings = {k: round(v, 1) for k, v in timings.items()}
+                frames_out = len(qframes)
+
+            size = os.path.getsize(output_path)
+            timings["total"] = round((time.perf_counter() - start) * 1000.0, 1)
+            self.last_save = {
+                "path": output_path,
+                "compression": self.compression_mode,
+                "input_fps": self.fps,
+                "frames_in": len(frames_in),
+                "frames_out": frames_out,
+                "size_bytes": size,
+                "size_mb": round(size / (1024 * 1024), 4),
+                "timings_ms": timings,
+            }
+            return True
 
-            return os.path.exists(output_path)
+        except Exception as e:
+            print(f"[-] GIF save error: {e}")
+            return False
+
+    def _save_live(self, output_path):
+        """Finish the live encoder and write its GIF (see save_gif)"""
+        live, self.live = self.live, None
+        if not live.frames_in:
+            print("[-] No frames to save")
+            return False
+
+        try:
+            start = time.perf_counter()
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+            _, meta = live.finish(output=output_path)
+            timings = dict(meta["timings_ms"])
+            # The GIF streams straight into the file, so encoding is the write
+            timings["write"] = timings.pop("encode")
+            print(f"[*] Compression: {live.frames_in} -> {meta['frames_out']} frames (live)")
+            if meta["size_mb"] > live.compressor.target_size_mb:
+                print(f"[!] Live GIF is {meta['size_mb']:.1f}MB, above the size target")
+            timings["total"] = round((time.perf_counter() - start) * 1000.0, 1)
+
+            self.last_save = {
+                "path": output_path,
+                "compression": self.compression_mode,
+                "live": True,
+                "input_fps": self.fps,
+                "frames_in": live.frames_in,
+                "frames_out": meta["frames_out"],
+                "size_bytes": os.path.getsize(output_path),
+                "size_mb": meta["size_mb"],
+                "timings_ms": timings,
+            }
+            return True
 
         except Exception as e:
             print(f"[-] GIF save error: {e}")
@@ -158,20 +395,40 @@ class ScreenRecorder:
         Get recording statistics
 
         Returns:
-            dict with frame_count, duration, fps
+            dict with frame_count, duration, fps, recording, last_save (size
+            and per-stage timings_ms of the last save_gif(), or None), the
+            capture buffer's capacity, bytes and dropped frames, the
+            scheduler's achieved_fps, jitter_ms percentiles and dropped_slots,
+            and the capture backend and region (bbox)
         """
-        frame_count = len(self.frames)
-        duration = frame_count / self.fps if frame_count > 0 else 0
+        if self.live is not None:
+            frame_count = self.live.frames_in
+        else:
+            frame_count = len(self.recorded_frames())
+        capture = self.scheduler.stats() if self.scheduler else {}
+        achieved = capture.get("achieved_fps") or self.fps
+        duration = frame_count / achieved if frame_count > 0 else 0
 
         return {
             "frame_count": frame_count,
             "duration": duration,
             "fps": self.fps,
             "recording": self.is_recording,
+            "last_save": self.last_save,
+            "buffer_capacity": self.store.capacity,
+            "buffer_bytes": self.store.nbytes,
+            "dropped_frames": self.store.dropped,
+            "achieved_fps": capture.get("achieved_fps", 0.0),
+            "jitter_ms": capture.get("jitter_ms"),
+            "dropped_slots": capture.get("dropped_slots", 0),
+            "capture_backend": self.capture.name if self.capture else None,
+            "region": self.bbox,
         }
 
 
-def record_screen_to_gif(duration=5, fps=10, output_dir=None, compression="balanced"):
+def record_screen_to_gif(
+    duration=5, fps=10, output_dir=None, compression="balanced", live=False, region=None
+):
     """
     Convenience function: Record screen for duration and save as GIF
 
@@ -180,16 +437,23 @@ def record_screen_to_gif(duration=5, fps=10, output_dir=None, compression="balan
         fps: Frames per second (default: 10)
         output_dir: Output directory (default: flashrecord-save)
         compression: 'high', 'balanced', 'compact', or 'none' (default: 'balanced')
+        live: Compress while recording instead of after (see ScreenRecorder)
+        region: Part of the screen to record (see ScreenRecorder; default: all)
 
     Returns:
         Path to saved GIF file, or None on failure
     """
-    recorder = ScreenRecorder(fps=fps, compression=compression)
-
-    print(f"[>] Recording screen for {duration} seconds...")
+    recorder = ScreenRecorder(fps=fps, compression=compression, live=live, region=region)
 
     # Start recording
-    recorder.start_recording(duration=duration)
+    if not recorder.start_recording(duration=duration):
+        return None
+    if recorder.bbox is None:
+        print(f"[>] Recording screen for {duration} seconds...")
+    else:
+        left, top, right, bottom = recorder.bbox
+        area = f"{right - left}x{bottom - top}+{left}+{top}"
+        print(f"[>] Recording region {area} for {duration} seconds...")
 
     # Wait for completion with progress
     start_time = time.time()
@@ -213,15 +477,22 @@ def record_screen_to_gif(duration=5, fps=10, output_dir=None, compression="balan
     filepath = os.path.join(output_dir, filename)
 
     # Save GIF
-    print("[+] Encoding GIF...")
+    print("[+] Finishing GIF..." if recorder.live is not None else "[+] Encoding GIF...")
     if recorder.save_gif(filepath):
         stats = recorder.get_stats()
-        file_size = os.path.getsize(filepath) / (1024 * 1024)  # MB
+        saved = stats["last_save"]
+        file_size = saved["size_mb"]
 
         print(f"[+] GIF saved: {filepath}")
         print(
             f"[+] Size: {file_size:.1f} MB, {stats['frame_count']} frames, {stats['duration']:.1f}s"
         )
+        print(
+            f"[*] Capture: {stats['achieved_fps']:.1f} fps achieved, "
+            f"jitter p95 {stats['jitter_ms']['p95']:.1f}ms, {stats['dropped_slots']} slots dropped"
+        )
+        stages = ", ".join(f"{k}={v:.0f}ms" for k, v in saved["timings_ms"].items())
+        print(f"[*] Stages: {stages}")
         return filepath
     else:
         print("[-] Failed to save GIF")
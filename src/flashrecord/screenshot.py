@@ -6,15 +6,19 @@ Supports Windows, macOS, and Linux platforms
 import os
 import sys
 
+import numpy as np
+
+from .capture_backends import create_capture_backend
+from .capture_region import resolve_region
 from .utils import get_timestamp
 
 
-def _capture_windows():
-    """Capture screenshot on Windows using native PIL/Pillow"""
+def _capture_windows(bbox=None):
+    """Capture screenshot on Windows using native PIL/Pillow (bbox across all monitors)"""
     try:
         from PIL import ImageGrab
 
-        return ImageGrab.grab()
+        return ImageGrab.grab(bbox=bbox, all_screens=bbox is not None)
     except ImportError:
         return None
     except Exception as e:
@@ -22,8 +26,8 @@ def _capture_windows():
         return None
 
 
-def _capture_macos():
-    """Capture screenshot on macOS using screencapture"""
+def _capture_macos(bbox=None):
+    """Capture screenshot on macOS using screencapture (-R for a bbox)"""
     import subprocess
     import tempfile
 
@@ -31,7 +35,11 @@ def _capture_macos():
         with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
             tmp_path = tmp.name
 
-        result = subprocess.run(["screencapture", "-x", tmp_path], capture_output=True, timeout=5)
+        argv = ["screencapture", "-x"]
+        if bbox is not None:
+            left, top, right, bottom = bbox
+            argv += ["-R", f"{left},{top},{right - left},{bottom - top}"]
+        result = subprocess.run(argv + [tmp_path], capture_output=True, timeout=5)
 
         if result.returncode == 0 and os.path.exists(tmp_path):
             from PIL import Image
@@ -45,45 +53,34 @@ def _capture_macos():
         return None
 
 
-def _capture_linux():
-    """Capture screenshot on Linux using available tools"""
-    import subprocess
-    import tempfile
-
-    # Try multiple tools in order
-    tools = [
-        (["gnome-screenshot", "-f"], "gnome-screenshot"),
-        (["scrot"], "scrot"),
-        (["import", "-window", "root"], "ImageMagick"),
-    ]
-
-    for cmd_prefix, tool_name in tools:
+def _capture_linux(bbox=None):
+    """
+    Capture screenshot on Linux: persistent X11/XShm grab when a display is
+    reachable, then gnome-screenshot, scrot or ImageMagick as fallbacks
+    """
+    for name in ("xshm", "gnome-screenshot", "scrot", "import"):
+        backend = create_capture_backend(name)
+        if not backend.available():
+            continue
+        backend.set_bbox(bbox)
         try:
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp_path = tmp.name
-
-            # Adjust command for tool
-            if tool_name == "gnome-screenshot":
-                cmd = cmd_prefix + [tmp_path]
-            elif tool_name == "scrot":
-                cmd = cmd_prefix + [tmp_path]
-            else:  # ImageMagick
-                cmd = cmd_prefix + [tmp_path]
-
-            result = subprocess.run(cmd, capture_output=True, timeout=5)
-
-            if result.returncode == 0 and os.path.exists(tmp_path):
-                from PIL import Image
-
-                img = Image.open(tmp_path)
-                os.unlink(tmp_path)
-                return img
+            with backend:
+                return _as_image(backend.grab())
         except Exception:
             continue
 
     return None
 
 
+def _as_image(frame):
+    """PIL image from a capture backend frame (arrays are copied)"""
+    if isinstance(frame, np.ndarray):
+        from PIL import Image
+
+        return Image.fromarray(np.ascontiguousarray(frame))
+    return frame
+
+
 def _save_image(img, filepath, compress=False, quality="balanced"):
     """
     Save PIL Image to file with optional compression
@@ -134,14 +131,14 @@ def _save_image(img, filepath, compress=False, quality="balanced"):
         return False
 
 
-def take_screenshot(output_dir=None, compress=False, quality="balanced"):
+def take_screenshot(output_dir=None, compress=False, quality="balanced", backend=None, region=None):
     """
     Take screenshot natively without external dependencies
 
     Supports:
     - Windows: PIL/Pillow (ImageGrab)
     - macOS: screencapture command
-    - Linux: gnome-screenshot, scrot, or ImageMagick
+    - Linux: X11 shared memory (xshm), then gnome-screenshot, scrot, or ImageMagick
 
     Compression (v0.3.3):
     - Phase 1: Always applies optimize=True (5-15% reduction, lossless)
@@ -154,6 +151,11 @@ def take_screenshot(output_dir=None, compress=False, quality="balanced"):
                  - 'high': 70% scale (minimal quality loss, ~50% size reduction)
                  - 'balanced': 50% scale (good balance, ~75% size reduction)
                  - 'compact': 30% scale (maximum compression, ~90% size reduction)
+        backend: Capture backend name or CaptureBackend instance (default:
+                 the platform chain above; see capture_backends)
+        region: Part of the screen to capture: (left, top, right, bottom),
+                'WxH+X+Y', 'monitor:N' or 'window:<title>' (default: whole
+                screen; see capture_region)
 
     Returns:
         Path to saved screenshot file, or None on failure
@@ -162,6 +164,7 @@ def take_screenshot(output_dir=None, compress=False, quality="balanced"):
         take_screenshot()                           # optimize only (2.1 MB)
         take_screenshot(compress=True)              # balanced (0.6 MB)
         take_screenshot(compress=True, quality='high')  # high quality (1.2 MB)
+        take_screenshot(region='window:Terminal')   # one window only
     """
     try:
         if output_dir is None:
@@ -177,13 +180,20 @@ def take_screenshot(output_dir=None, compress=False, quality="balanced"):
         filename = f"screenshot_{timestamp}.png"
         filepath = os.path.join(output_dir, filename)
 
+        bbox = resolve_region(region)
+
         # Capture based on platform
-        if sys.platform == "win32":
-            img = _capture_windows()
+        if backend is not None:
+            with create_capture_backend(backend) as source:
+                if region is not None:
+                    source.set_bbox(bbox)
+                img = _as_image(source.grab())
+        elif sys.platform == "win32":
+            img = _capture_windows(bbox)
         elif sys.platform == "darwin":
-            img = _capture_macos()
+            img = _capture_macos(bbox)
         elif sys.platform.startswith("linux"):
-            img = _capture_linux()
+            img = _capture_linux(bbox)
         else:
             print(f"[-] Unsupported platform: {sys.platform}")
             return None
@@ -0,0 +1,220 @@
+"""
+Unit tests for flashrecord.capture_backends module
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from flashrecord import capture_backends
+from flashrecord.capture_backends import (
+    CaptureBackend,
+    ToolBackend,
+    XShmBackend,
+    available_capture_backends,
+    create_capture_backend,
+    register_capture_backend,
+)
+
+
+@pytest.fixture
+def xvfb():
+    """Display name of a private Xvfb server (skips when Xvfb is missing)"""
+    if not sys.platform.startswith("linux") or shutil.which("Xvfb") is None:
+        pytest.skip("Xvfb not installed")
+    display = f":{90 + os.getpid() % 100}"
+    proc = subprocess.Popen(
+        ["Xvfb", display, "-screen", "0", "320x240x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(50):
+            if XShmBackend(display).available():
+                break
+            time.sleep(0.1)
+        else:
+            pytest.skip("Xvfb did not start with MIT-SHM")
+        yield display
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+class TestRegistry:
+    """Tests for backend lookup and registration"""
+
+    def test_unknown_backend_raises(self):
+        """Test lookup of an unregistered backend fails loudly"""
+        with pytest.raises(ValueError):
+            create_capture_backend("bmp")
+
+    def test_instances_pass_through(self):
+        """Test an instance is used as-is"""
+        backend = ToolBackend("x", ["true"])
+
+        assert create_capture_backend(backend) is backend
+
+    def test_each_call_creates_a_new_backend(self):
+        """Test persistent backends are never shared between callers"""
+        assert create_capture_backend("xshm") is not create_capture_backend("xshm")
+
+    def test_auto_falls_back_to_pillow(self, monkeypatch):
+        """Test the default chain ends at Pillow when nothing else can capture"""
+        monkeypatch.setattr(capture_backends, "_DEFAULT_ORDER", {})
+
+        assert create_capture_backend().name == "pillow"
+
+    @pytest.mark.parametrize("spec", ["scrot:foo", "pillow:1", "replay"])
+    def test_spec_arguments_are_checked(self, spec):
+        """Test stray and missing spec arguments are rejected before building"""
+        with pytest.raises(ValueError):
+            create_capture_backend(spec)
+
+    def test_factory_errors_are_not_masked(self, monkeypatch):
+        """Test a TypeError inside a factory is not reported as a bad argument"""
+        monkeypatch.setattr(capture_backends, "_BACKENDS", dict(capture_backends._BACKENDS))
+
+        def broken(path):
+            raise TypeError("bug in the backend")
+
+        register_capture_backend("broken-test", broken)
+
+        with pytest.raises(TypeError, match="bug in the backend"):
+            create_capture_backend("broken-test:x")
+
+    def test_register_custom_backend(self, monkeypatch):
+        """Test a registered factory is reachable by name and listed"""
+        monkeypatch.setattr(capture_backends, "_BACKENDS", dict(capture_backends._BACKENDS))
+
+        class BlankBackend(CaptureBackend):
+            name = "blank-test"
+
+            def grab(self):
+                return np.zeros((4, 4, 3), dtype=np.uint8)
+
+        register_capture_backend("blank-test", BlankBackend)
+
+        assert isinstance(create_capture_backend("blank-test"), BlankBackend)
+        assert "blank-test" in available_capture_backends()
+
+
+class TestToolBackend:
+    """Tests for subprocess screenshot tools"""
+
+    def test_grab_reads_tool_output(self, tmp_path):
+        """Test the tool's PNG is decoded and its temporary file removed"""
+        script = tmp_path / "fake-shot"
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            "from PIL import Image\n"
+            "Image.new('RGB', (8, 6), (1, 2, 3)).save(sys.argv[-1])\n"
+        )
+        script.chmod(0o755)
+        backend = ToolBackend("fake-shot", [str(script)], platform=sys.platform)
+
+        img = backend.grab()
+
+        assert backend.available()
+        assert img.size == (8, 6)
+        assert img.getpixel((0, 0)) == (1, 2, 3)
+
+    def test_region_uses_tool_geometry(self, tmp_path):
+        """Test a bbox is passed through the tool's geometry options"""
+        script = tmp_path / "fake-shot"
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            "from PIL import Image\n"
+            "x, y, w, h = map(int, sys.argv[2].split(','))\n"
+            "Image.new('RGB', (w, h), (x, y, 0)).save(sys.argv[-1])\n"
+        )
+        script.chmod(0o755)
+        backend = ToolBackend(
+            "fake-shot", [str(script)], platform=sys.platform, region_argv=["-a", "{x},{y},{w},{h}"]
+        )
+        backend.set_bbox((10, 20, 50, 80))
+
+        img = backend.grab()
+
+        assert img.size == (40, 60)
+        assert img.getpixel((0, 0)) == (10, 20, 0)
+
+    def test_region_without_geometry_crops(self, tmp_path):
+        """Test tools without geometry options capture everything and crop"""
+        script = tmp_path / "fake-shot"
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            "from PIL import Image\n"
+            "Image.new('RGB', (100, 80), (1, 2, 3)).save(sys.argv[-1])\n"
+        )
+        script.chmod(0o755)
+        backend = ToolBackend("fake-shot", [str(script)], platform=sys.platform)
+        backend.set_bbox((10, 20, 50, 80))
+
+        assert backend.grab().size == (40, 60)
+
+    def test_failing_tool_raises(self):
+        """Test a non-zero exit is reported instead of returning nothing"""
+        backend = ToolBackend("false", ["false"], platform=sys.platform)
+        if not backend.available():
+            pytest.skip("no 'false' command")
+
+        with pytest.raises(RuntimeError):
+            backend.grab()
+
+    def test_missing_tool_is_unavailable(self):
+        """Test tools not on PATH are skipped"""
+        assert not ToolBackend("nope", ["flashrecord-no-such-tool"]).available()
+
+
+class TestXShmBackend:
+    """Tests for the persistent X11 shared-memory grabber"""
+
+    def test_unavailable_without_display(self, monkeypatch):
+        """Test no display means the backend is skipped rather than failing"""
+        monkeypatch.delenv("DISPLAY", raising=False)
+
+        assert not XShmBackend().available()
+
+    def test_grabs_reuse_one_segment(self, xvfb):
+        """Test repeated grabs return RGB views over the same shared buffer"""
+        backend = XShmBackend(xvfb)
+        try:
+            first = backend.grab()
+            second = backend.grab()
+
+            assert first.shape == (240, 320, 3)
+            assert np.shares_memory(first, second)
+            assert Image.fromarray(np.ascontiguousarray(second)).size == (320, 240)
+        finally:
+            backend.close()
+
+    def test_region_sizes_the_shared_image(self, xvfb):
+        """Test a bbox grabs only its rectangle, clipped to the screen"""
+        backend = XShmBackend(xvfb)
+        try:
+            backend.set_bbox((200, 100, 400, 180))
+            assert backend.grab().shape == (80, 120, 3)
+            assert backend.size == (120, 80)
+        finally:
+            backend.close()
+
+    def test_close_then_grab_reconnects(self, xvfb):
+        """Test a closed backend reopens its connection on the next grab"""
+        backend = XShmBackend(xvfb)
+        backend.grab()
+        backend.close()
+
+        try:
+            assert backend.grab().shape == (240, 320, 3)
+        finally:
+            backend.close()
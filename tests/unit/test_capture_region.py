@@ -0,0 +1,87 @@
+"""
+Unit tests for flashrecord.capture_region module
+"""
+
+import pytest
+
+from flashrecord import capture_region
+from flashrecord.capture_region import parse_bbox, resolve_region
+
+
+@pytest.fixture
+def two_monitors(monkeypatch):
+    """Side-by-side 1920x1080 and 1280x1024 monitors"""
+    monitors = [(0, 0, 1920, 1080), (1920, 0, 3200, 1024)]
+    monkeypatch.setattr(capture_region, "list_monitors", lambda: monitors)
+    return monitors
+
+
+class TestParseBBox:
+    """Tests for bounding box specs"""
+
+    def test_tuple_and_comma_forms(self):
+        """Test tuples and 'left,top,right,bottom' strings give the same box"""
+        assert parse_bbox((10, 20, 110, 220)) == (10, 20, 110, 220)
+        assert parse_bbox("10,20,110,220") == (10, 20, 110, 220)
+
+    def test_x11_geometry(self):
+        """Test 'WxH+X+Y' is converted to (left, top, right, bottom)"""
+        assert parse_bbox("800x600+1920+40") == (1920, 40, 2720, 640)
+        assert parse_bbox("100x50-10+0") == (-10, 0, 90, 50)
+
+    @pytest.mark.parametrize("spec", ["", "1,2,3", "10,10,5,20", "0x10+0+0", "abc", (1, 2)])
+    def test_invalid_boxes_raise(self, spec):
+        """Test malformed or empty boxes are rejected"""
+        with pytest.raises(ValueError):
+            parse_bbox(spec)
+
+
+class TestResolveRegion:
+    """Tests for region spec resolution"""
+
+    def test_full_screen(self):
+        """Test None and 'full' mean no bounding box"""
+        assert resolve_region(None) is None
+        assert resolve_region("full") is None
+
+    def test_monitor_by_index(self, two_monitors):
+        """Test ints and 'monitor:N' select a monitor's box"""
+        assert resolve_region(1) == two_monitors[1]
+        assert resolve_region("monitor:0") == two_monitors[0]
+
+    def test_missing_monitor_raises(self, two_monitors):
+        """Test an index past the last monitor fails loudly"""
+        with pytest.raises(ValueError):
+            resolve_region("monitor:2")
+        with pytest.raises(ValueError):
+            resolve_region("monitor:left")
+
+    def test_window_by_title(self, monkeypatch):
+        """Test 'window:<title>' uses the found window's box"""
+        seen = []
+
+        def find(title):
+            seen.append(title)
+            return (100, 50, 900, 650)
+
+        monkeypatch.setattr(capture_region, "find_window", find)
+
+        assert resolve_region("window:My Editor") == (100, 50, 900, 650)
+        assert seen == ["My Editor"]
+
+    def test_missing_window_raises(self, monkeypatch):
+        """Test a title matching no window fails loudly"""
+        monkeypatch.setattr(capture_region, "find_window", lambda title: None)
+
+        with pytest.raises(ValueError):
+            resolve_region("window:nothing like this")
+
+    def test_unknown_kind_raises(self):
+        """Test only monitor: and window: prefixes are accepted"""
+        with pytest.raises(ValueError):
+            resolve_region("screen:1")
+
+    def test_clamp_to_screen(self):
+        """Test window boxes are clipped to the screen"""
+        assert capture_region._clamp((-20, 10, 300, 900), (1024, 768)) == (0, 10, 300, 768)
+        assert capture_region._clamp((2000, 0, 2100, 50), (1024, 768)) is None
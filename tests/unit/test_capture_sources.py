@@ -0,0 +1,171 @@
+"""
+Unit tests for flashrecord.capture_sources module
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from flashrecord.capture_backends import CaptureEnded, create_capture_backend
+from flashrecord.capture_sources import ReplayBackend, SyntheticBackend
+from flashrecord.screen_recorder import ScreenRecorder
+from flashrecord.screenshot import take_screenshot
+
+
+def _grab_all(backend):
+    frames = []
+    while True:
+        try:
+            frames.append(np.array(backend.grab()))
+        except CaptureEnded:
+            return frames
+
+
+def _write_gif(path, n=5, size=(32, 24)):
+    frames = [Image.new("RGB", size, (25 * i, 0, 255 - 25 * i)) for i in range(n)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100)
+    return frames
+
+
+class TestSyntheticBackend:
+    """Tests for scripted synthetic screens"""
+
+    def test_same_seed_same_pixels(self):
+        """Test two sources with one seed render identical recordings"""
+        script = (("terminal", 5), ("scroll", 5), ("video", 5))
+        a = _grab_all(SyntheticBackend(script, size=(160, 90), loop=False))
+        b = _grab_all(SyntheticBackend(script, size=(160, 90), loop=False))
+
+        assert len(a) == 15
+        assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+    def test_scene_behaviour(self):
+        """Test idle frames repeat, typing changes few pixels and video many"""
+        script = (("terminal", 3), ("idle", 3), ("video", 3))
+        frames = _grab_all(SyntheticBackend(script, size=(320, 180), loop=False))
+
+        def changed(i):
+            return float((frames[i] != frames[i - 1]).any(axis=2).mean())
+
+        assert 0 < changed(1) < 0.01  # A few glyphs typed
+        assert changed(4) == 0.0  # Idle
+        assert changed(7) > 0.15  # Video region
+
+    def test_scroll_moves_document(self):
+        """Test scroll frames are the previous frame shifted up"""
+        frames = _grab_all(SyntheticBackend((("scroll", 3),), size=(160, 120), loop=False))
+
+        assert np.array_equal(frames[2][:-24], frames[1][24:])
+
+    def test_loop_restarts_script(self):
+        """Test a looping source replays the script from the start"""
+        source = SyntheticBackend((("terminal", 4),), size=(120, 60))
+        first = [np.array(source.grab()) for _ in range(4)]
+        second = [np.array(source.grab()) for _ in range(4)]
+
+        assert all(np.array_equal(x, y) for x, y in zip(first, second))
+
+    def test_unknown_scene_raises(self):
+        """Test scripts only accept known scenes"""
+        with pytest.raises(ValueError):
+            SyntheticBackend((("slideshow", 3),))
+
+    def test_bbox_crops_frames(self):
+        """Test a bbox returns the matching part of the full screen"""
+        script = (("terminal", 3), ("video", 2))
+        full = _grab_all(SyntheticBackend(script, size=(160, 90), loop=False))
+        source = SyntheticBackend(script, size=(160, 90), loop=False)
+        source.set_bbox((40, 20, 120, 70))
+
+        cropped = _grab_all(source)
+
+        assert cropped[0].shape == (50, 80, 3)
+        assert all(np.array_equal(c, f[20:70, 40:120]) for c, f in zip(cropped, full))
+
+    def test_spec_selects_scene(self):
+        """Test 'synthetic:<scene>' builds a single-scene source"""
+        source = create_capture_backend("synthetic:video")
+
+        assert isinstance(source, SyntheticBackend)
+        assert source.script == (("video", 60),)
+
+
+class TestReplayBackend:
+    """Tests for replaying recorded frames"""
+
+    def test_gif_frames_in_order(self, tmp_path):
+        """Test a GIF replays frame by frame and then ends"""
+        path = tmp_path / "in.gif"
+        want = _write_gif(path)
+
+        got = _grab_all(create_capture_backend(f"replay:{path}"))
+
+        assert len(got) == len(want)
+        assert all(np.abs(g.astype(int) - np.asarray(w)).max() <= 8 for g, w in zip(got, want))
+
+    def test_png_directory_sorted_by_name(self, tmp_path):
+        """Test a PNG directory replays in file-name order"""
+        for i in (2, 0, 1):
+            Image.new("RGB", (8, 8), (i * 100, 0, 0)).save(tmp_path / f"frame_{i:03d}.png")
+
+        got = _grab_all(ReplayBackend(str(tmp_path)))
+
+        assert [int(f[0, 0, 0]) for f in got] == [0, 100, 200]
+
+    def test_rate_follows_wall_clock(self, tmp_path):
+        """Test a paced replay holds or skips frames to match grab times"""
+        path = tmp_path / "in.gif"
+        _write_gif(path, n=10)
+        clock = iter([5.0, 5.05, 5.25, 5.95, 6.2])
+        source = ReplayBackend(str(path), rate=10, clock=lambda: next(clock))
+
+        grabs = [source.grab() for _ in range(4)]
+
+        assert [_index(source, g) for g in grabs] == [0, 0, 2, 9]
+        with pytest.raises(CaptureEnded):
+            source.grab()
+
+    def test_bbox_crops_frames(self, tmp_path):
+        """Test replayed frames are cut to the bbox"""
+        path = tmp_path / "in.gif"
+        _write_gif(path, n=3, size=(32, 24))
+        source = ReplayBackend(str(path))
+        source.set_bbox((4, 2, 20, 12))
+
+        assert [f.shape for f in _grab_all(source)] == [(10, 16, 3)] * 3
+
+    def test_mismatched_sizes_raise(self, tmp_path):
+        """Test replay frames must share one size"""
+        Image.new("RGB", (8, 8)).save(tmp_path / "a.png")
+        Image.new("RGB", (9, 8)).save(tmp_path / "b.png")
+
+        with pytest.raises(ValueError):
+            ReplayBackend(str(tmp_path)).grab()
+
+
+def _index(source, frame):
+    return next(i for i, f in enumerate(source.frames) if f is frame)
+
+
+class TestHeadlessPipeline:
+    """Tests for capture -> compress -> write without a display"""
+
+    def test_recorder_records_replay_until_it_ends(self, tmp_path):
+        """Test the recorder stops by itself when a replay runs out"""
+        path = tmp_path / "in.gif"
+        _write_gif(path, n=6)
+        recorder = ScreenRecorder(fps=100, capture_backend=ReplayBackend(str(path)))
+
+        recorder.start_recording()
+        recorder._capture_thread.join(timeout=5)
+
+        assert not recorder.is_recording
+        assert recorder.get_stats()["frame_count"] == 6
+        assert recorder.save_gif(str(tmp_path / "out.gif"))
+
+    def test_take_screenshot_from_synthetic_source(self, tmp_path):
+        """Test screenshots can be taken from a synthetic source"""
+        path = take_screenshot(output_dir=str(tmp_path), backend=SyntheticBackend(size=(64, 48)))
+
+        with Image.open(path) as img:
+            assert img.size == (64, 48)
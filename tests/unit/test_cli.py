@@ -45,3 +45,34 @@ class TestFlashRecordCLI:
         captured = capsys.readouterr()
         assert len(captured.out) > 0
         assert "FlashRecord" in captured.out
+
+    def test_region_option_parsing(self):
+        """Test '-r' takes the next argument, keeping case and quoted spaces"""
+        cli = FlashRecordCLI()
+
+        assert cli._parse_options("@sv -r 800x600+0+0")["region"] == "800x600+0+0"
+        assert cli._parse_options('@sc -c high -r "window:My Editor"')["region"] == (
+            "window:My Editor"
+        )
+        assert cli._parse_options("@sc -c")["region"] is None
+
+    def test_options_in_any_order(self, monkeypatch):
+        """Test -c and -r are recognised whichever comes first"""
+        cli = FlashRecordCLI()
+        calls = []
+        monkeypatch.setattr(cli, "handle_screenshot", lambda **kw: calls.append(kw))
+
+        cli.handle_screenshot_with_args("@sc -r 0,0,640,480 -c high")
+        cli.handle_screenshot_with_args("@sc -c compact -r monitor:1")
+
+        assert calls == [
+            {"compress": True, "quality": "high", "region": "0,0,640,480"},
+            {"compress": True, "quality": "compact", "region": "monitor:1"},
+        ]
+
+    def test_region_commands_map_to_actions(self):
+        """Test @sv and @sc accept a region option"""
+        cli = FlashRecordCLI()
+
+        assert cli.map_command("@sv -r monitor:1") == "gif_record"
+        assert cli.map_command("@sc -r monitor:1") == "screenshot_compressed"
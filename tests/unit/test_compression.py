@@ -2,11 +2,21 @@
 Unit tests for flashrecord.compression module
 """
 
+from io import BytesIO
+
 import numpy as np
 import pytest
-from PIL import Image
+from PIL import Image, ImageFilter
 
-from flashrecord.compression import CWAMInspiredCompressor
+from flashrecord.compression import (
+    CWAMInspiredCompressor,
+    FramePipeline,
+    FramePyramid,
+    FrameStack,
+    InverseColormap,
+    PalettePlan,
+    SaliencyTables,
+)
 
 
 class TestCWAMInspiredCompressor:
@@ -38,3 +48,756 @@ class TestCWAMInspiredCompressor:
         # Test that compress method exists and can be called
         # Note: We don't test actual compression as it requires file I/O
         assert hasattr(compressor, "compress_frames")
+
+
+def _patch_entropy(patch, n_bins=32):
+    """Shannon entropy of one patch from np.histogram (reference for the batched bincount)"""
+    hist, _ = np.histogram(patch, bins=n_bins, range=(0, 255))
+    p = hist.astype(np.float64)
+    p = p / (p.sum() + 1e-12)
+    return float(-(p * np.log2(p + 1e-12)).sum())
+
+
+def _loop_saliency(img, tile_size=16):
+    """Per-tile loop saliency: the definition SaliencyTables must reproduce"""
+    h, w = img.shape
+    saliency = np.zeros((max(1, h // tile_size), max(1, w // tile_size)), dtype=np.float32)
+    edges = np.array(
+        Image.fromarray(img.astype(np.uint8)).filter(ImageFilter.FIND_EDGES), dtype=np.float32
+    )
+    for ty in range(saliency.shape[0]):
+        for tx in range(saliency.shape[1]):
+            y, x = ty * tile_size, tx * tile_size
+            tile = img[y : y + tile_size, x : x + tile_size]
+            if tile.size < tile_size * tile_size // 4:
+                continue
+            edge_tile = edges[y : y + tile_size, x : x + tile_size]
+            saliency[ty, tx] = (
+                0.5 * float(np.var(tile))
+                + 0.3 * float(np.mean(edge_tile))
+                + 0.2 * _patch_entropy(tile)
+            )
+    if saliency.max() > 0:
+        saliency = saliency / saliency.max()
+    return saliency
+
+
+class TestSaliency:
+    """Tests for tile saliency computation"""
+
+    @pytest.mark.parametrize("shape", [(120, 200), (37, 53), (7, 100)])
+    @pytest.mark.parametrize("tile_size", [8, 16, 32])
+    def test_tables_match_tile_loop(self, shape, tile_size):
+        """Test summed-area table saliency matches the per-tile loop"""
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 256, shape).astype(np.float32)
+        img[: shape[0] // 2] = np.round(img[: shape[0] // 2] / 40) * 40
+
+        fast = SaliencyTables(img).saliency(tile_size=tile_size)
+        ref = _loop_saliency(img, tile_size=tile_size)
+
+        assert fast.shape == ref.shape
+        np.testing.assert_allclose(fast, ref, atol=1e-5)
+
+    def test_tile_entropy_matches_histogram(self):
+        """Test batched tile entropy matches np.histogram per patch"""
+        rng = np.random.default_rng(1)
+        img = rng.integers(0, 256, (32, 48)).astype(np.uint8)
+
+        _, _, entropy = SaliencyTables(img).tile_stats(tile_size=16)
+
+        for ty in range(2):
+            for tx in range(3):
+                patch = img[ty * 16 : (ty + 1) * 16, tx * 16 : (tx + 1) * 16]
+                assert entropy[ty, tx] == pytest.approx(_patch_entropy(patch))
+
+    @pytest.mark.parametrize("tile_size", [8, 16, 32])
+    def test_coarse_level_matches_half_resolution(self, tile_size):
+        """Test the coarse level is the saliency of the BILINEAR half-size frame"""
+        rng = np.random.default_rng(2)
+        gray = rng.integers(0, 256, (96, 160)).astype(np.uint8)
+        gray[:40] = 200
+        tables = SaliencyTables(gray)
+
+        half = Image.fromarray(gray).resize((80, 48), Image.Resampling.BILINEAR)
+        coarse = _loop_saliency(np.array(half, dtype=np.float32), tile_size=tile_size)
+
+        np.testing.assert_allclose(tables.saliency(tile_size, level=1), coarse, atol=1e-5)
+
+    def test_cw_saliency_maps_shape(self):
+        """Test one saliency map per frame with consistent shapes"""
+        compressor = CWAMInspiredCompressor()
+        frames = [
+            Image.fromarray(np.random.default_rng(i).integers(0, 256, (64, 96, 3), dtype=np.uint8))
+            for i in range(4)
+        ]
+
+        maps = compressor._compute_cw_saliency_maps(frames)
+
+        assert len(maps) == 4
+        assert all(m.shape == maps[0].shape for m in maps)
+
+    def test_parallel_saliency_matches_serial(self):
+        """Test process-pool saliency gives identical maps to the serial path"""
+        rng = np.random.default_rng(3)
+        frames = [
+            Image.fromarray(rng.integers(0, 256, (48, 80, 3), dtype=np.uint8)) for _ in range(6)
+        ]
+
+        serial = CWAMInspiredCompressor(workers=1)._compute_cw_saliency_maps(frames)
+        parallel = CWAMInspiredCompressor(workers=2)._compute_cw_saliency_maps(frames)
+
+        assert len(parallel) == len(serial)
+        for a, b in zip(serial, parallel):
+            np.testing.assert_array_equal(a, b)
+
+    def test_workers_default_to_cpu_count(self):
+        """Test workers=0 resolves to the CPU count"""
+        compressor = CWAMInspiredCompressor(workers=0)
+        assert compressor.workers >= 1
+
+
+class TestPalette:
+    """Tests for global palette building and application"""
+
+    def test_threaded_palette_matches_serial(self):
+        """Test thread-pool palette application keeps frame order and output"""
+        rng = np.random.default_rng(4)
+        frames = [
+            Image.fromarray(rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)) for _ in range(8)
+        ]
+        compressor = CWAMInspiredCompressor(threads=1)
+        pal = compressor._build_global_palette(frames, colors=64)
+
+        serial = compressor._apply_global_palette(frames, pal, dither=True)
+        compressor.threads = 4
+        threaded = compressor._apply_global_palette(frames, pal, dither=True)
+
+        assert [im.mode for im in threaded] == ["P"] * 8
+        for a, b in zip(serial, threaded):
+            np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+
+    def test_palette_reproduces_few_colors(self):
+        """Test palette holds every color exactly when there are fewer than requested"""
+        arr = np.zeros((16, 16, 3), dtype=np.uint8)
+        arr[:8] = (200, 30, 30)
+        arr[8:, :8] = (10, 10, 10)
+        arr[8:, 8:] = (40, 220, 90)
+        compressor = CWAMInspiredCompressor()
+
+        pal = compressor._build_global_palette([Image.fromarray(arr)], colors=16)
+
+        assert len(pal) == 768
+        triplets = {tuple(pal[i : i + 3]) for i in range(0, 9, 3)}
+        assert triplets == {(200, 30, 30), (10, 10, 10), (40, 220, 90)}
+
+    def test_median_cut_respects_color_count(self):
+        """Test weighted median cut returns at most the requested colors"""
+        rng = np.random.default_rng(5)
+        rgb = rng.uniform(0, 255, (500, 3))
+        weights = rng.uniform(0.5, 2.0, 500)
+        compressor = CWAMInspiredCompressor()
+
+        palette = compressor._median_cut(rgb, weights, colors=32)
+
+        assert palette.shape == (32, 3)
+        assert palette.dtype == np.uint8
+
+    def test_color_histogram_sample_budget(self):
+        """Test histogram sampling stays within the pixel budget for long recordings"""
+        frames = [Image.new("RGB", (64, 64), (i, 100, 50)) for i in range(50)]
+        compressor = CWAMInspiredCompressor()
+
+        rgb, weights = compressor._color_histogram(frames, max_samples=64 * 64 * 10)
+
+        assert weights.sum() <= 64 * 64 * 10 * 1.5
+        assert len(rgb) == len(weights)
+
+
+class TestInverseColormap:
+    """Tests for the palette-index lookup table"""
+
+    def test_maps_palette_colors_to_their_index(self):
+        """Test exact palette colors map back to their own index"""
+        colors = [(0, 0, 0), (255, 255, 255), (200, 30, 30), (20, 40, 220)]
+        pal = [c for rgb in colors for c in rgb]
+        pal += list(pal[:3]) * ((768 - len(pal)) // 3)  # pad with the first color
+        lut = InverseColormap(pal)
+
+        rgb = np.array([colors], dtype=np.uint8)
+
+        assert lut.map(rgb).tolist() == [[0, 1, 2, 3]]
+
+    def test_matches_pillow_nearest_color(self):
+        """Test non-dithered lookup agrees with Pillow's palette mapping"""
+        rng = np.random.default_rng(6)
+        frame = Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+        compressor = CWAMInspiredCompressor()
+        pal = compressor._build_global_palette([frame], colors=64)
+        palette_img = Image.new("P", (1, 1))
+        palette_img.putpalette(pal)
+
+        expected = np.asarray(frame.quantize(palette=palette_img, dither=Image.Dither.NONE))
+        indices = InverseColormap(pal).map(np.asarray(frame))
+
+        assert (indices == expected).mean() > 0.9
+
+    def test_ordered_dither_is_stable_across_frames(self):
+        """Test ordered dithering gives identical indices for identical pixels"""
+        rng = np.random.default_rng(7)
+        static = rng.integers(0, 256, (40, 40, 3), dtype=np.uint8)
+        moving = static.copy()
+        moving[:10] = 255 - moving[:10]
+        compressor = CWAMInspiredCompressor()
+        pal = compressor._build_global_palette([Image.fromarray(static)], colors=32)
+
+        a, b = compressor._apply_global_palette(
+            [Image.fromarray(static), Image.fromarray(moving)], pal, dither="ordered"
+        )
+
+        np.testing.assert_array_equal(np.asarray(a)[10:], np.asarray(b)[10:])
+
+    def test_unknown_dither_mode_raises(self):
+        """Test invalid dither names are rejected"""
+        compressor = CWAMInspiredCompressor()
+        with pytest.raises(ValueError):
+            compressor._apply_global_palette([Image.new("RGB", (4, 4))], [0] * 768, dither="x")
+
+
+class TestFrameStack:
+    """Tests for the contiguous frame stack"""
+
+    @staticmethod
+    def _frames(n=6, size=(96, 64)):
+        rng = np.random.default_rng(11)
+        return [
+            Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+            for _ in range(n)
+        ]
+
+    def test_luma_matches_pillow(self):
+        """Test cached luma equals PIL's RGB -> L conversion"""
+        frames = self._frames()
+        stack = FrameStack.from_images(frames)
+
+        for i, f in enumerate(frames):
+            assert np.array_equal(stack.luma(i), np.asarray(f.convert("L")))
+        assert stack.luma(0) is stack.luma(0)
+
+    def test_subsets_and_slices_share_the_buffer(self):
+        """Test subsets are views over one buffer and share the luma cache"""
+        stack = FrameStack.from_images(self._frames())
+
+        sub = stack.subset([False, True, False, True, True, False])
+        part = stack[2:4]
+
+        assert len(sub) == 3 and len(part) == 2
+        assert np.shares_memory(sub[0], stack.data)
+        assert np.array_equal(part[0], stack[2])
+        assert sub.luma(1) is stack.luma(3)
+        assert sub.size == (96, 64)
+
+    def test_resized_and_images(self):
+        """Test resizing into a new stack and converting back to PIL"""
+        frames = self._frames(n=2)
+        stack = FrameStack.from_images(frames)
+
+        small = stack.resized((48, 32))
+
+        assert small.data.shape == (2, 32, 48, 3)
+        assert np.array_equal(
+            np.asarray(small.image(1)), np.asarray(frames[1].resize((48, 32), Image.Resampling.BOX))
+        )
+
+    def test_rejects_mixed_sizes(self):
+        """Test frames of different sizes cannot share a stack"""
+        with pytest.raises(ValueError):
+            FrameStack.from_images([Image.new("RGB", (4, 4)), Image.new("RGB", (5, 4))])
+
+    def test_stages_match_pil_frames(self):
+        """Test saliency, palette build and mapping give the same results on a stack"""
+        compressor = CWAMInspiredCompressor()
+        frames = self._frames()
+        stack = FrameStack.from_images(frames)
+
+        for a, b in zip(
+            compressor._compute_cw_saliency_maps(frames),
+            compressor._compute_cw_saliency_maps(stack),
+        ):
+            assert np.allclose(a, b)
+
+        pal = compressor._build_global_palette(frames, colors=32)
+        assert compressor._build_global_palette(stack, colors=32) == pal
+
+        for dither in (True, "ordered"):
+            for a, b in zip(
+                compressor._apply_global_palette(frames, pal, dither=dither),
+                compressor._apply_global_palette(stack, pal, dither=dither),
+            ):
+                assert np.array_equal(np.asarray(a), np.asarray(b))
+
+
+class TestFramePipeline:
+    """Tests for the lazy frame pipeline"""
+
+    @staticmethod
+    def _frames(n=10, size=(120, 80)):
+        rng = np.random.default_rng(5)
+        return [
+            Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+            for _ in range(n)
+        ]
+
+    def test_dropped_frames_are_never_transformed(self):
+        """Test transforms only run for frames that survive every selection"""
+        seen = []
+        pipeline = FramePipeline(list(range(6)))
+        pipeline.transform("double", lambda i, f: seen.append(i) or f * 2)
+        pipeline.select("even", [0, 2, 4])
+        pipeline.select("mask", [True, False, True])
+
+        assert pipeline.frames() == [0, 8]
+        assert seen == [0, 4]
+        assert pipeline.stats()["transforms"] == {"double": {"run": 2, "skipped": 4}}
+        assert pipeline.stats()["selections"] == {"even": [6, 3], "mask": [3, 2]}
+
+    @staticmethod
+    def _eager_preprocess(compressor, frames, target_fps=8):
+        """Resize every frame, then subsample (the order the pipeline reorders)"""
+        size = compressor._scaled_size(frames[0].size)
+        scaled = [f.resize(size, Image.Resampling.LANCZOS) for f in frames]
+        return [scaled[i] for i in compressor._frame_rate_indices(len(frames), target_fps)]
+
+    def test_preprocess_matches_eager_stages(self):
+        """Test lazy scale + subsampling equals scaling everything then subsampling"""
+        compressor = CWAMInspiredCompressor()
+        frames = self._frames()
+
+        eager = self._eager_preprocess(compressor, frames)
+        pipeline = compressor._preprocess_pipeline(frames, target_fps=8)
+        lazy = pipeline.frames()
+
+        assert len(lazy) == len(eager)
+        for a, b in zip(lazy, eager):
+            assert np.array_equal(np.asarray(a), np.asarray(b))
+        assert pipeline.stats()["transforms"]["scale"]["skipped"] == len(frames) - len(eager)
+
+    def test_compress_frames_output_unchanged(self):
+        """Test compress_frames matches the eager stage order"""
+        compressor = CWAMInspiredCompressor()
+        frames = self._frames()
+
+        scaled = self._eager_preprocess(compressor, frames)
+        keep = compressor._keep_mask_from_saliency(
+            compressor._compute_cw_saliency_maps(scaled), thr=0.25
+        )
+        expected = [f for i, f in enumerate(scaled) if keep[i]]
+
+        out = compressor.compress_frames(frames)
+
+        assert len(out) == len(expected)
+        for a, b in zip(out, expected):
+            assert np.array_equal(np.asarray(a), np.asarray(b))
+
+
+class TestCoalescing:
+    """Tests for duplicate-frame coalescing"""
+
+    @staticmethod
+    def _idle_frames(n=40, size=(96, 64)):
+        """Static screen with a change every 10 frames and mild sensor noise"""
+        rng = np.random.default_rng(2)
+        base = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        frames = []
+        for i in range(n):
+            arr = base.copy()
+            arr[: 8 * (i // 10 + 1), :16] = (255, 255, 255)
+            arr[-1, -1] = base[-1, -1] ^ (i % 2)  # Noise within coalesce_tolerance
+            frames.append(Image.fromarray(arr))
+        return frames
+
+    def test_merge_weights_follow_dropped_frames(self):
+        """Test merged selections hand dropped weights to the preceding kept frame"""
+        pipeline = FramePipeline(list(range(7)))
+        pipeline.select("coalesce", [False, True, False, False, True, True, False], merge=True)
+
+        assert pipeline.indices == [1, 4, 5]
+        assert pipeline.weights.tolist() == [4, 1, 2]  # Leading drop goes to the first kept
+
+    def test_run_starts_detect_changes(self):
+        """Test only frames that differ from their run start are kept"""
+        compressor = CWAMInspiredCompressor()
+        starts = compressor._run_starts(self._idle_frames(n=30))
+
+        assert np.flatnonzero(starts).tolist() == [0, 10, 20]
+
+    def test_disabled_coalescing_keeps_every_frame(self):
+        """Test coalesce_tolerance=None skips the stage"""
+        compressor = CWAMInspiredCompressor()
+        compressor.coalesce_tolerance = None
+
+        pipeline = compressor._preprocess_pipeline(self._idle_frames(), input_fps=8)
+
+        assert len(pipeline) == 40
+        assert "coalesce" not in pipeline.stats()["selections"]
+
+    def test_durations_follow_weights(self):
+        """Test weighted durations split total time by run length"""
+        compressor = CWAMInspiredCompressor()
+
+        durs = compressor._durations_for_preserve(40, 10, 3, weights=[20, 10, 10])
+
+        assert durs == [2000, 1000, 1000]
+        assert compressor._durations_for_preserve(40, 10, 4) == [1000] * 4
+
+    def test_compress_to_target_merges_idle_runs(self):
+        """Test idle recordings collapse to a few frames with their time preserved"""
+        compressor = CWAMInspiredCompressor()
+
+        data, meta = compressor.compress_to_target(
+            self._idle_frames(), target_mb=5, input_fps=8, dither="ordered"
+        )
+
+        assert meta["frames_out"] <= 4
+        assert meta["pipeline"]["selections"]["coalesce"] == [40, 4]
+        assert meta["preserve_timing_ok"]
+        assert Image.open(BytesIO(data)).n_frames == meta["frames_out"]
+
+    def test_frame_times_follow_timestamp_gaps(self):
+        """Test each frame is shown until the next capture; the last gets the median gap"""
+        compressor = CWAMInspiredCompressor()
+
+        times = compressor._frame_times_ms([0.0, 0.1, 0.2, 0.5, 0.6], 10)
+
+        assert times.tolist() == [100, 100, 300, 100, 100]
+        with pytest.raises(ValueError):
+            compressor._frame_times_ms([0.0, 0.2, 0.1], 10)
+
+    def test_compress_to_target_uses_timestamps(self):
+        """Test measured capture gaps, not 1000 / fps, set the frame durations"""
+        compressor = CWAMInspiredCompressor()
+        # Second run captured at a third of the nominal rate
+        gaps = [0.1] * 10 + [0.3] * 10 + [0.1] * 19
+        timestamps = np.concatenate([[0.0], np.cumsum(gaps)])
+
+        data, meta = compressor.compress_to_target(
+            self._idle_frames(),
+            target_mb=5,
+            input_fps=10,
+            dither="ordered",
+            selection="motion",
+            timestamps=timestamps,
+        )
+
+        with Image.open(BytesIO(data)) as im:
+            durations = [im.seek(i) or im.info["duration"] for i in range(im.n_frames)]
+        assert sum(durations) == 6000
+        assert durations[:2] == [1000, 3000]
+
+    def test_compress_frames_reports_weights(self):
+        """Test compress_frames exposes how many inputs each output frame covers"""
+        compressor = CWAMInspiredCompressor()
+
+        out = compressor.compress_frames(self._idle_frames(), dither=False)
+
+        assert len(compressor.frame_weights) == len(out)
+        assert max(compressor.frame_weights) > 1
+
+
+class TestMotionSelection:
+    """Tests for motion-energy keyframe selection"""
+
+    @staticmethod
+    def _bounce_frames(size=(96, 64)):
+        """Box moves right for 6 frames, rests for 8, moves back left for 6"""
+        xs = [8 * i for i in range(6)] + [40] * 8 + [40 - 8 * i for i in range(1, 7)]
+        frames = []
+        for x in xs:
+            arr = np.full((size[1], size[0], 3), 30, dtype=np.uint8)
+            arr[20:36, x : x + 16] = (240, 240, 240)
+            frames.append(Image.fromarray(arr))
+        return frames
+
+    def test_energy_and_direction_changes(self):
+        """Test static frames have no energy and the reversal is flagged"""
+        compressor = CWAMInspiredCompressor()
+        stack = FrameStack.from_images(self._bounce_frames())
+
+        energy, turns = compressor._motion_energy(stack)
+
+        assert energy[0] == 0
+        assert np.all(energy[6:14] == 0)  # Resting box
+        assert np.all(energy[1:6] > compressor.motion_static)
+        assert turns[5]  # Last step right, then it stops
+
+    def test_static_stretch_is_dropped(self):
+        """Test the resting span keeps no frames beyond the min_frames floor"""
+        compressor = CWAMInspiredCompressor()
+        energy = np.array([0, 5, 5, 6, 0, 0, 0, 0, 0, 0, 4, 0], dtype=float)
+        turns = np.zeros(len(energy), dtype=bool)
+
+        keep = compressor._keep_mask_from_motion(energy, turns)
+
+        assert keep[[0, 1, 3, 10, 11]].all()
+        assert keep.sum() == max(2, int(0.6 * len(energy)))
+
+    def test_motion_keeps_moving_frames_saliency_would_drop(self):
+        """Test a flat moving frame survives where a detailed static one would win"""
+        compressor = CWAMInspiredCompressor()
+        energy = np.array([0, 0, 0, 0, 0, 9, 0, 0, 0, 0], dtype=float)
+
+        keep = compressor._keep_mask_from_motion(energy, np.zeros(10, dtype=bool))
+
+        assert keep[5]
+
+    def test_compress_to_target_motion_mode(self):
+        """Test motion selection folds static time into keyframes and keeps total time"""
+        compressor = CWAMInspiredCompressor()
+        compressor.coalesce_tolerance = None  # Exercise selection, not coalescing
+
+        data, meta = compressor.compress_to_target(
+            self._bounce_frames(), target_mb=5, input_fps=8, selection="motion"
+        )
+
+        assert meta["selection"] == "motion"
+        assert meta["preserve_timing_ok"]
+        assert meta["frames_out"] < 20
+        assert Image.open(BytesIO(data)).n_frames == meta["frames_out"]
+
+    def test_unknown_selection_raises(self):
+        """Test invalid selection names are rejected"""
+        with pytest.raises(ValueError):
+            CWAMInspiredCompressor().compress_frames(self._bounce_frames(), selection="x")
+
+
+class TestFramePyramid:
+    """Tests for the per-job resolution pyramid"""
+
+    @staticmethod
+    def _frames(n=10, size=(120, 80)):
+        rng = np.random.default_rng(3)
+        return [
+            Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+            for _ in range(n)
+        ]
+
+    def test_levels_are_cached(self, monkeypatch):
+        """Test each level is analyzed once and reused afterwards"""
+        compressor = CWAMInspiredCompressor()
+        pyramid = FramePyramid(compressor, self._frames())
+        calls = []
+        original = compressor._compute_cw_saliency_maps
+        monkeypatch.setattr(
+            compressor,
+            "_compute_cw_saliency_maps",
+            lambda frames: calls.append(len(frames)) or original(frames),
+        )
+
+        first = pyramid.level(0.3)
+        again = pyramid.level(0.3)
+        pyramid.palette(0.3, 16)
+        pyramid.palette(0.3, 16)
+
+        assert again is first
+        assert len(calls) == 1
+        assert pyramid.hits >= 2
+        assert list(first["palettes"]) == [16]
+
+    def test_levels_resample_the_base(self):
+        """Test smaller levels come from the base level at the requested size"""
+        compressor = CWAMInspiredCompressor(quality="balanced")
+        frames = self._frames()
+        pyramid = FramePyramid(compressor, frames)
+
+        base = pyramid.level(0.5)
+        small = pyramid.level(0.25)
+
+        assert base["size"] == (60, 40)
+        assert small["size"] == (30, 20)
+        assert small["frames"].size == (30, 20)
+        assert len(small["keep"]) == len(pyramid.base)
+        assert len(pyramid.base) == len(compressor._frame_rate_indices(len(frames), target_fps=8))
+
+    def test_scale_above_base_is_clamped(self):
+        """Test levels never exceed the base resolution"""
+        pyramid = FramePyramid(CWAMInspiredCompressor(quality="compact"), self._frames())
+
+        assert pyramid.level(0.9)["size"] == pyramid.base.size
+
+
+class TestScenePalettes:
+    """Tests for scene cuts and per-scene palettes"""
+
+    @staticmethod
+    def _frames(pattern="ABA", per_scene=4, size=(64, 48)):
+        rng = np.random.default_rng(6)
+        looks = {
+            "A": rng.integers(0, 60, (size[1], size[0], 3), dtype=np.uint8),
+            "B": rng.integers(180, 256, (size[1], size[0], 3), dtype=np.uint8),
+        }
+        frames = []
+        for scene in pattern:
+            for i in range(per_scene):
+                arr = looks[scene].copy()
+                arr[: 4 + i, :4] = 128
+                frames.append(Image.fromarray(arr))
+        return frames
+
+    def test_cuts_at_content_switch(self):
+        """Test scene starts land exactly on the dark/bright switches"""
+        compressor = CWAMInspiredCompressor()
+
+        assert compressor._scene_cuts(self._frames("ABA")) == [0, 4, 8]
+        assert compressor._scene_cuts(self._frames("A")) == [0]
+
+    def test_similar_scenes_share_a_palette(self):
+        """Test a returning scene reuses the cached palette"""
+        compressor = CWAMInspiredCompressor()
+        frames = self._frames("ABA")
+
+        plan = compressor._scene_palettes(frames, colors=16)
+
+        assert plan.starts == [0, 4, 8]
+        assert len(plan.palettes) == 2
+        assert plan.palette_of.tolist() == [0] * 4 + [1] * 4 + [0] * 4
+        assert plan.palette == plan.palettes[0]
+
+    def test_apply_plan_keeps_frame_order(self):
+        """Test each frame is mapped to its own scene's palette"""
+        compressor = CWAMInspiredCompressor()
+        frames = self._frames("ABA")
+        plan = compressor._scene_palettes(frames, colors=16)
+
+        out = compressor._apply_palette_plan(frames, plan, dither=False)
+
+        assert [f.getpalette()[:48] for f in out] == [
+            plan.palette_at(i)[:48] for i in range(len(frames))
+        ]
+
+    def test_single_plan_matches_global_palette(self):
+        """Test a one-palette plan maps like _apply_global_palette"""
+        compressor = CWAMInspiredCompressor()
+        frames = self._frames("AB")
+        pal = compressor._build_global_palette(frames, colors=16)
+
+        single = compressor._apply_palette_plan(frames, PalettePlan.single(pal, 8), dither=False)
+        direct = compressor._apply_global_palette(frames, pal, dither=False)
+
+        assert all(np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(single, direct))
+
+    def test_compress_to_target_with_scenes(self):
+        """Test scene palettes are recorded and the GIF decodes closer to the input"""
+        frames = self._frames("AB", per_scene=6)
+
+        def error(data):
+            with Image.open(BytesIO(data)) as im:
+                im.seek(im.n_frames - 1)
+                got = np.asarray(im.convert("RGB"), dtype=np.int32)
+            want = np.asarray(frames[-1].resize(got.shape[1::-1]), dtype=np.int32)
+            return np.abs(got - want).mean()
+
+        results = {}
+        for scenes in (False, True):
+            compressor = CWAMInspiredCompressor(quality="high")
+            compressor.coalesce_tolerance = None
+            results[scenes] = compressor.compress_to_target(
+                frames, target_mb=5, init_colors=16, dither=False, scenes=scenes
+            )
+
+        meta = results[True][1]
+        assert (meta["scenes"], meta["palettes"]) == (2, 2)
+        assert (results[False][1]["scenes"], results[False][1]["palettes"]) == (1, 1)
+        assert error(results[True][0]) < error(results[False][0])
+
+
+class TestCompressToTarget:
+    """Tests for target-driven GIF compression"""
+
+    @staticmethod
+    def _frames(n=12, size=(64, 48)):
+        rng = np.random.default_rng(8)
+        base = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        frames = []
+        for i in range(n):
+            arr = base.copy()
+            arr[:8, (i * 4) % size[0] :][:, :8] = (255, 0, 0)
+            frames.append(Image.fromarray(arr))
+        return frames
+
+    @pytest.mark.parametrize("dither", [True, False, "ordered"])
+    def test_dither_modes_produce_gif(self, dither):
+        """Test every dither mode yields a decodable GIF and records the mode"""
+        compressor = CWAMInspiredCompressor()
+
+        data, meta = compressor.compress_to_target(self._frames(), target_mb=5, dither=dither)
+
+        assert data[:6] == b"GIF89a"
+        assert meta["dither"] == compressor._dither_mode(dither)
+        assert Image.open(BytesIO(data)).n_frames == meta["frames_out"]
+
+    def test_metadata_reports_predicted_and_actual_size(self):
+        """Test the returned setting carries both the prediction and the real size"""
+        compressor = CWAMInspiredCompressor()
+
+        data, meta = compressor.compress_to_target(self._frames(), target_mb=5)
+
+        assert meta["size_mb"] == round(len(data) / (1024 * 1024), 4)
+        assert meta["predicted_mb"] > 0
+        assert meta["full_encodes"] == 1
+        assert {"pipeline", "selection", "palette", "quantize", "encode"} <= set(meta["timings_ms"])
+
+    def test_predicted_overshoot_skips_full_encodes(self):
+        """Test settings predicted far above target are never fully encoded"""
+        compressor = CWAMInspiredCompressor()
+
+        _, meta = compressor.compress_to_target(self._frames(), target_mb=0.0001, max_iterations=4)
+
+        assert meta["iteration"] == 4
+        assert meta["full_encodes"] == 1
+
+    def test_output_receives_the_returned_gif(self):
+        """Test output= streams the GIF into a file, overwriting overshooting attempts"""
+
+        def run(**kwargs):
+            compressor = CWAMInspiredCompressor()
+            compressor.predict_margin = 1e9  # Fully encode every attempt
+            return compressor.compress_to_target(self._frames(), target_mb=0.002, **kwargs)
+
+        data, meta = run()
+        out = BytesIO()
+        out.write(b"head")
+        streamed, streamed_meta = run(output=out)
+
+        assert meta["full_encodes"] > 1
+        assert streamed is None
+        assert out.getvalue() == b"head" + data
+        assert streamed_meta["size_mb"] == meta["size_mb"]
+
+    def test_resolution_reduction_uses_pyramid(self):
+        """Test resolution reductions add pyramid levels instead of rescaling the input"""
+        compressor = CWAMInspiredCompressor()
+        compressor.min_colors = 256  # Skip color reduction, go straight to resolution
+
+        data, meta = compressor.compress_to_target(self._frames(), target_mb=0.002)
+
+        assert meta["pyramid_levels"] > 1
+        assert meta["scale_factor"] < 0.5
+        w, h = Image.open(BytesIO(data)).size
+        assert (w, h) == (int(64 * meta["scale_factor"]), int(48 * meta["scale_factor"]))
+
+    def test_scale_steps_follow_area(self):
+        """Test resolution jumps cover the size ratio assuming size ~ area"""
+        compressor = CWAMInspiredCompressor()
+
+        assert compressor._scale_steps(0.5) == 1
+        assert compressor._scale_steps(1.2) == 1
+        assert 0.85 ** (2 * compressor._scale_steps(4.0)) <= 0.25
+
+    def test_compress_frames_with_dither_returns_palette_frames(self):
+        """Test compress_frames maps kept frames onto one shared palette"""
+        compressor = CWAMInspiredCompressor()
+
+        out = compressor.compress_frames(self._frames(), dither="ordered")
+
+        assert out and all(f.mode == "P" for f in out)
+        assert len({tuple(f.getpalette()) for f in out}) == 1
@@ -0,0 +1,163 @@
+"""
+Unit tests for flashrecord.frame_store module
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from flashrecord.compression import CWAMInspiredCompressor
+from flashrecord.frame_store import FrameRing
+
+
+def _frame(value, size=(16, 12)):
+    return np.full((size[1], size[0], 3), value, dtype=np.uint8)
+
+
+class TestFrameRing:
+    """Tests for the preallocated capture ring buffer"""
+
+    def test_capacity_from_byte_budget(self):
+        """Test a byte budget sizes the buffer in whole frames"""
+        ring = FrameRing(max_bytes=16 * 12 * 3 * 5 + 100)
+
+        ring.push(_frame(0))
+
+        assert ring.capacity == 5
+        assert ring.nbytes == 16 * 12 * 3 * 5
+
+    def test_budget_below_one_frame_raises(self):
+        """Test a budget too small for one frame is rejected"""
+        with pytest.raises(ValueError):
+            FrameRing(max_bytes=10).push(_frame(0))
+
+    def test_drop_oldest_keeps_latest_in_order(self):
+        """Test overflow overwrites the oldest frames and keeps capture order"""
+        ring = FrameRing(capacity=3)
+
+        for v in range(5):
+            assert ring.push(_frame(v))
+
+        assert len(ring) == 3
+        assert ring.dropped == 2
+        assert [int(f[0, 0, 0]) for f in ring.stack()] == [2, 3, 4]
+
+    def test_stop_policy_refuses_when_full(self):
+        """Test the 'stop' policy keeps the first frames and refuses the rest"""
+        ring = FrameRing(capacity=2, overflow="stop")
+
+        results = [ring.push(_frame(v)) for v in range(3)]
+
+        assert results == [True, True, False]
+        assert ring.full
+        assert [int(f[0, 0, 0]) for f in ring.stack()] == [0, 1]
+
+    def test_stack_is_a_view(self):
+        """Test the FrameStack shares the ring buffer instead of copying"""
+        ring = FrameRing(capacity=4)
+        for v in range(3):
+            ring.push(_frame(v))
+
+        stack = ring.stack()
+
+        assert stack.data is ring.data
+        assert len(stack) == 3
+
+    def test_pil_frames_are_converted(self):
+        """Test PIL images in other modes land in the slot as RGB"""
+        ring = FrameRing(capacity=2)
+
+        ring.push(Image.new("RGBA", (16, 12), (10, 20, 30, 255)))
+
+        assert ring.stack()[0][0, 0].tolist() == [10, 20, 30]
+
+    def test_strided_views_are_copied(self):
+        """Test BGRX -> RGB views (as from capture backends) land as RGB pixels"""
+        bgrx = np.zeros((12, 16, 4), dtype=np.uint8)
+        bgrx[..., :3] = (30, 20, 10)  # B, G, R
+        ring = FrameRing(capacity=2)
+
+        ring.push(bgrx[..., 2::-1])
+        bgrx[...] = 0  # The capture buffer is reused
+
+        assert ring.stack()[0][0, 0].tolist() == [10, 20, 30]
+
+    def test_size_mismatch_raises(self):
+        """Test frames must match the buffer's frame size"""
+        ring = FrameRing(capacity=2)
+        ring.push(_frame(0))
+
+        with pytest.raises(ValueError):
+            ring.push(_frame(0, size=(8, 8)))
+
+    def test_clear_reuses_buffer(self):
+        """Test clear() empties the ring without reallocating"""
+        ring = FrameRing(capacity=2)
+        ring.push(_frame(0))
+        data = ring.data
+
+        ring.clear()
+        ring.push(_frame(7))
+
+        assert ring.data is data
+        assert len(ring) == 1
+
+    def test_new_size_after_clear_reallocates(self):
+        """Test the first frame after clear() may change the frame size"""
+        ring = FrameRing(max_bytes=16 * 12 * 3 * 4)
+        ring.push(_frame(0))
+        ring.clear()
+
+        assert ring.push(_frame(5, size=(8, 6)))
+        assert ring.size == (8, 6)
+        assert ring.capacity == 16  # Budget re-applied to the smaller frames
+        assert int(ring.stack()[0][0, 0, 0]) == 5
+
+    def test_reserve_sets_the_next_capacity(self):
+        """Test reserve() overrides the byte budget until reset with None"""
+        ring = FrameRing(max_bytes=16 * 12 * 3 * 4)
+        ring.push(_frame(0))
+
+        with pytest.raises(ValueError):
+            ring.reserve(10)  # Holds a frame
+        ring.clear()
+        ring.reserve(10)
+        ring.push(_frame(1))
+        assert ring.capacity == 10
+
+        ring.clear()
+        ring.reserve(None)
+        ring.push(_frame(2))
+        assert ring.capacity == 4
+
+    def test_timestamps_follow_overwritten_frames(self):
+        """Test capture timestamps stay paired with their frames after overflow"""
+        ring = FrameRing(capacity=3)
+
+        for v in range(5):
+            ring.push(_frame(v), timestamp=v * 0.1)
+
+        assert ring.timestamps() == pytest.approx([0.2, 0.3, 0.4])
+
+    def test_missing_timestamp_disables_timestamps(self):
+        """Test timestamps() is None unless every held frame has one"""
+        ring = FrameRing(capacity=3)
+        ring.push(_frame(0), timestamp=0.0)
+        ring.push(_frame(1))
+
+        assert ring.timestamps() is None
+
+    def test_compress_to_target_reads_ring_directly(self):
+        """Test compression of the ring view matches compression of PIL copies"""
+        rng = np.random.default_rng(2)
+        base = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+        ring = FrameRing(capacity=16)
+        for i in range(12):
+            arr = base.copy()
+            arr[:8, i * 4 : i * 4 + 8] = (255, 0, 0)
+            ring.push(arr)
+
+        from_ring, _ = CWAMInspiredCompressor().compress_to_target(ring.stack(), target_mb=5)
+        from_images, _ = CWAMInspiredCompressor().compress_to_target(ring.images(), target_mb=5)
+
+        assert from_ring == from_images
@@ -0,0 +1,302 @@
+"""
+Unit tests for flashrecord.gif_writer module
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+
+from flashrecord.compression import CWAMInspiredCompressor
+from flashrecord.gif_writer import (
+    GifStreamWriter,
+    color_table_bits,
+    delta_region,
+    encode_gif,
+    sampled_gif_size,
+)
+from flashrecord.output_backends import GifBackend
+
+
+def _decode_rgb(data):
+    """Composited RGB frames as a decoder shows them"""
+    with Image.open(BytesIO(data)) as im:
+        return [np.asarray(f.convert("RGB")) for f in ImageSequence.Iterator(im)]
+
+
+def _palette_rgb(pal):
+    return np.array(list(pal) + [0] * (768 - len(pal)), dtype=np.uint8).reshape(-1, 3)
+
+
+def _moving_box_frames(n_colors, n=6, size=(80, 60)):
+    rng = np.random.default_rng(n_colors)
+    base = rng.integers(0, n_colors, (size[1], size[0])).astype(np.uint8)
+    frames = [base]
+    for i in range(1, n):
+        f = frames[-1].copy()
+        f[5 + i : 15 + i, 6 * i : 6 * i + 9] = rng.integers(0, n_colors, (10, 9))
+        frames.append(f)
+    return frames
+
+
+class TestEncodeGif:
+    """Tests for the global-palette GIF container"""
+
+    @pytest.mark.parametrize("n_colors", [2, 100, 256])
+    @pytest.mark.parametrize("delta", [True, False])
+    def test_roundtrip_exact(self, n_colors, delta):
+        """Test decoded frames equal the palette colors of the input indices"""
+        rng = np.random.default_rng(0)
+        pal = [int(v) for v in rng.integers(0, 256, n_colors * 3)]
+        frames = _moving_box_frames(n_colors)
+
+        data = encode_gif(frames, pal, [100] * len(frames), delta=delta)
+
+        decoded = _decode_rgb(data)
+        assert len(decoded) == len(frames)
+        for got, idx in zip(decoded, frames):
+            assert np.array_equal(got, _palette_rgb(pal)[idx])
+
+    def test_delta_is_smaller(self):
+        """Test dirty rectangles shrink mostly static recordings"""
+        pal = list(range(256)) * 3
+        frames = _moving_box_frames(256, n=10, size=(320, 240))
+
+        full = encode_gif(frames, pal, [100] * 10, delta=False)
+        delta = encode_gif(frames, pal, [100] * 10, delta=True)
+
+        assert len(delta) < len(full) / 3
+
+    def test_identical_frames_keep_timing(self):
+        """Test unchanged frames still occupy their duration slot"""
+        frame = np.zeros((20, 30), dtype=np.uint8)
+        data = encode_gif([frame, frame, frame], [0, 0, 0, 255, 255, 255], [100, 200, 300])
+
+        with Image.open(BytesIO(data)) as im:
+            durations = [f.info["duration"] for f in ImageSequence.Iterator(im)]
+        assert durations == [100, 200, 300]
+
+    def test_rejects_index_outside_palette(self):
+        """Test indices beyond the color table are refused"""
+        frame = np.full((4, 4), 5, dtype=np.uint8)
+
+        with pytest.raises(ValueError):
+            encode_gif([frame], [0, 0, 0, 255, 255, 255], [100])
+
+
+class TestSampledGifSize:
+    """Tests for the sampled size predictor"""
+
+    @pytest.mark.parametrize("delta", [True, False])
+    def test_exact_when_every_frame_sampled(self, delta):
+        """Test sampling all frames reproduces the encoded size"""
+        pal = list(range(256)) * 3
+        frames = _moving_box_frames(256, n=6)
+
+        predicted = sampled_gif_size(lambda i: frames[i], len(frames), pal, delta=delta)
+
+        assert predicted == len(encode_gif(frames, pal, [100] * len(frames), delta=delta))
+
+    def test_sample_extrapolates_close_to_actual(self):
+        """Test a small sample predicts a long animation within a few percent"""
+        pal = list(range(256)) * 3
+        frames = _moving_box_frames(256, n=40, size=(320, 120))
+        calls = []
+
+        def frame_at(i):
+            calls.append(i)
+            return frames[i]
+
+        predicted = sampled_gif_size(frame_at, len(frames), pal, sample=4)
+        actual = len(encode_gif(frames, pal, [100] * len(frames)))
+
+        assert abs(predicted - actual) / actual < 0.05
+        assert len(set(calls)) <= 1 + 2 * 4
+
+
+class TestGifStreamWriter:
+    """Tests for incremental GIF writing"""
+
+    def test_stream_to_path_matches_encode_gif(self, tmp_path):
+        """Test streamed file is byte-identical to the in-memory encoder"""
+        pal = list(range(256)) * 3
+        frames = _moving_box_frames(256)
+        path = tmp_path / "stream.gif"
+
+        with GifStreamWriter(str(path), pal, loop=0) as writer:
+            for f in frames:
+                writer.write_frame(f, 100)
+
+        assert path.read_bytes() == encode_gif(frames, pal, [100] * len(frames))
+        assert writer.frames_written == len(frames)
+        assert writer.bytes_written == path.stat().st_size
+
+    def test_reused_buffer_is_safe(self):
+        """Test callers can overwrite their frame buffer between writes"""
+        pal = list(range(256)) * 3
+        frames = _moving_box_frames(256)
+        buf = np.empty_like(frames[0])
+        out = BytesIO()
+
+        with GifStreamWriter(out, pal) as writer:
+            for f in frames:
+                buf[:] = f
+                writer.write_frame(buf, 100)
+
+        assert out.getvalue() == encode_gif(frames, pal, [100] * len(frames))
+
+    def test_parallel_write_frames_matches_serial(self):
+        """Test pool-encoded frame blocks stitch into the same bytes as serial encoding"""
+        pal = list(range(256)) * 3
+        frames = _moving_box_frames(256, n=12)
+        durations = [100 + 10 * i for i in range(len(frames))]
+
+        serial = encode_gif(frames, pal, durations)
+        parallel = encode_gif(frames, pal, durations, workers=2)
+
+        assert parallel == serial
+
+    def test_write_after_close_raises(self):
+        """Test a closed stream refuses more frames"""
+        writer = GifStreamWriter(BytesIO(), [0, 0, 0, 255, 255, 255])
+        writer.write_frame(np.zeros((2, 2), dtype=np.uint8), 100)
+        writer.close()
+
+        with pytest.raises(ValueError):
+            writer.write_frame(np.zeros((2, 2), dtype=np.uint8), 100)
+
+
+class TestLocalPalettes:
+    """Tests for per-frame local color tables"""
+
+    @staticmethod
+    def _two_palettes():
+        rng = np.random.default_rng(5)
+        dark = [int(v) for v in rng.integers(0, 64, 16 * 3)]
+        bright = [int(v) for v in rng.integers(192, 256, 16 * 3)]
+        return dark, bright
+
+    @pytest.mark.parametrize("delta", [True, False])
+    def test_roundtrip_with_local_tables(self, delta):
+        """Test frames decode to the colors of their own palette"""
+        dark, bright = self._two_palettes()
+        frames = _moving_box_frames(16, n=6)
+        palettes = [dark, dark, bright, bright, dark, dark]
+
+        data = encode_gif(frames, dark, [100] * len(frames), delta=delta, palettes=palettes)
+
+        for got, idx, pal in zip(_decode_rgb(data), frames, palettes):
+            assert np.array_equal(got, _palette_rgb(pal)[idx])
+
+    def test_palette_switch_writes_full_frame(self):
+        """Test the first frame under a new palette is not cropped against the old one"""
+        dark, bright = self._two_palettes()
+        frames = _moving_box_frames(16, n=3)
+
+        same = encode_gif(frames, dark, [100] * 3, palettes=[dark, dark, dark])
+        switched = encode_gif(frames, dark, [100] * 3, palettes=[dark, dark, bright])
+
+        assert same == encode_gif(frames, dark, [100] * 3)
+        assert len(switched) > len(same) + 3 * 16  # Local table + full frame
+
+    def test_sampled_size_exact_with_local_tables(self):
+        """Test the predictor reproduces the size when every frame is sampled"""
+        dark, bright = self._two_palettes()
+        frames = _moving_box_frames(16, n=6)
+        palettes = [dark, dark, bright, bright, bright, dark]
+
+        predicted = sampled_gif_size(
+            lambda i: frames[i], len(frames), dark, palette_at=lambda i: palettes[i]
+        )
+
+        assert predicted == len(encode_gif(frames, dark, [100] * 6, palettes=palettes))
+
+    def test_rejects_index_outside_local_palette(self):
+        """Test indices are checked against the frame's own table size"""
+        with GifStreamWriter(BytesIO(), list(range(256)) * 3) as writer:
+            with pytest.raises(ValueError):
+                writer.write_frame(np.full((2, 2), 9, dtype=np.uint8), 100, palette=[0] * 12)
+
+
+class TestDeltaRegion:
+    """Tests for dirty-rectangle extraction"""
+
+    def test_crop_and_transparency(self):
+        """Test the crop covers changed pixels and unchanged ones are transparent"""
+        prev = np.zeros((10, 10), dtype=np.uint8)
+        cur = prev.copy()
+        cur[2, 3] = 7
+        cur[5, 6] = 9
+
+        (x, y), crop, transparency = delta_region(prev, cur, 16)
+
+        assert (x, y) == (3, 2)
+        assert crop.shape == (4, 4)
+        assert transparency not in (7, 9)
+        assert crop[0, 0] == 7 and crop[3, 3] == 9
+        assert (crop == transparency).sum() == 14
+
+    def test_opaque_when_no_free_index(self):
+        """Test crops using every table entry fall back to opaque pixels"""
+        prev = np.array([[1, 2, 3], [0, 2, 1]], dtype=np.uint8)
+        cur = np.array([[0, 1, 2], [3, 2, 0]], dtype=np.uint8)
+
+        _, crop, transparency = delta_region(prev, cur, 1 << color_table_bits(4))
+
+        assert transparency is None
+        assert np.array_equal(crop, cur)
+
+
+class TestCompressorDelta:
+    """Tests for delta encoding through CWAMInspiredCompressor"""
+
+    def test_delta_matches_full_frames(self):
+        """Test delta output decodes to the same pixels as full-frame output"""
+        compressor = CWAMInspiredCompressor()
+        frames = [
+            Image.fromarray(np.dstack([f * 40, f * 20, 255 - f * 30]).astype(np.uint8))
+            for f in _moving_box_frames(6)
+        ]
+        pal = compressor._build_global_palette(frames, colors=16)
+        qframes = compressor._apply_global_palette(frames, pal, dither=False)
+
+        full = GifBackend(delta=False).encode(qframes, [100] * len(qframes))
+        delta = GifBackend(delta=True).encode(qframes, [100] * len(qframes))
+
+        assert len(delta) < len(full)
+        for a, b in zip(_decode_rgb(full), _decode_rgb(delta)):
+            assert np.array_equal(a, b)
+
+    def test_write_gif_streams_same_bytes(self, tmp_path):
+        """Test write_gif produces the same file as the GIF output backend"""
+        compressor = CWAMInspiredCompressor()
+        frames = [Image.fromarray((f * 40).astype(np.uint8)) for f in _moving_box_frames(6)]
+        pal = compressor._build_global_palette(frames, colors=16)
+        qframes = compressor._apply_global_palette(frames, pal, dither=False)
+        path = tmp_path / "out.gif"
+
+        written = compressor.write_gif(qframes, path, duration_ms=100)
+
+        assert written == path.stat().st_size
+        assert path.read_bytes() == GifBackend().encode(qframes, [100] * len(qframes))
+
+    def test_parallel_encoding_matches_serial(self):
+        """Test compressor workers do not change the encoded GIF"""
+        frames = [Image.fromarray((f * 40).astype(np.uint8)) for f in _moving_box_frames(6)]
+        serial = CWAMInspiredCompressor()
+        pal = serial._build_global_palette(frames, colors=16)
+        qframes = serial._apply_global_palette(frames, pal, dither=False)
+
+        expected, got = BytesIO(), BytesIO()
+        serial.write_gif(qframes, expected, duration_ms=100)
+        CWAMInspiredCompressor(workers=2).write_gif(qframes, got, duration_ms=100)
+
+        assert got.getvalue() == expected.getvalue()
+
+    def test_write_gif_rejects_rgb_frames(self, tmp_path):
+        """Test write_gif refuses frames without a shared palette"""
+        compressor = CWAMInspiredCompressor()
+
+        with pytest.raises(ValueError):
+            compressor.write_gif([Image.new("RGB", (4, 4))], tmp_path / "x.gif")
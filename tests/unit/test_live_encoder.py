@@ -0,0 +1,134 @@
+"""
+Unit tests for flashrecord.live_encoder module
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from flashrecord.compression import CWAMInspiredCompressor
+from flashrecord.live_encoder import LiveEncoder
+
+
+def _frames(n=20, size=(64, 48), cut=None):
+    rng = np.random.default_rng(6)
+    base = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    frames = []
+    for i in range(n):
+        arr = base.copy()
+        if cut is not None and i >= cut:
+            arr = (arr // 4 + np.array([0, 0, 180], dtype=np.uint8)).astype(np.uint8)
+        arr[:8, (i * 3) % 56 : (i * 3) % 56 + 8] = (255, 0, 0)
+        frames.append(arr)
+    return frames
+
+
+def _encode(frames, **kwargs):
+    encoder = LiveEncoder(CWAMInspiredCompressor(), **kwargs).start()
+    for f in frames:
+        encoder.submit(f)
+    return encoder.finish()
+
+
+class TestLiveEncoder:
+    """Tests for compression while frames are captured"""
+
+    def test_output_decodes_with_preserved_timing(self):
+        """Test finish() returns a GIF whose durations cover the recording"""
+        data, meta = _encode(_frames(20), input_fps=10, target_fps=8)
+
+        with Image.open(BytesIO(data)) as im:
+            assert im.format == "GIF"
+            assert im.n_frames == meta["frames_out"]
+            total = sum(im.seek(i) or im.info["duration"] for i in range(im.n_frames))
+        assert abs(total - 2000) <= 10
+        assert meta["orig_frames"] == 20
+
+    def test_durations_follow_capture_timestamps(self):
+        """Test timestamped frames keep their measured gaps, dropped frames included"""
+        encoder = LiveEncoder(CWAMInspiredCompressor(), input_fps=10, target_fps=5).start()
+        gaps = [0.1] * 4 + [0.5] + [0.1] * 5
+        times = np.concatenate([[0.0], np.cumsum(gaps)])
+        for f, t in zip(_frames(11), times):
+            encoder.submit(f, timestamp=t)
+
+        _, meta = encoder.finish()
+
+        # Kept frames 0, 2, 4, 6, 8, 10: frame 4 also owns the slow gap after it
+        assert meta["durations_ms"] == [200, 200, 600, 200, 200, 100]
+
+    def test_subsampling_matches_batch_pipeline(self):
+        """Test live frame-rate subsampling keeps the batch pipeline's indices"""
+        compressor = CWAMInspiredCompressor()
+        encoder = LiveEncoder(compressor, input_fps=20, target_fps=8).start()
+
+        kept = [i for i, f in enumerate(_frames(30)) if encoder.submit(f)]
+        encoder.finish()
+
+        assert kept == compressor._frame_rate_indices(30, target_fps=8, input_fps=20)
+
+    def test_duplicates_are_coalesced(self):
+        """Test identical frames merge into one longer frame"""
+        frame = _frames(1)[0]
+
+        data, meta = _encode([frame] * 6, input_fps=10, target_fps=10)
+
+        assert meta["frames_out"] == 1
+        assert meta["coalesced"] == 5
+        assert meta["durations_ms"] == [600]
+
+    def test_scene_cut_opens_second_palette(self):
+        """Test a scene change gets its own palette and is written with it"""
+        data, meta = _encode(_frames(16, cut=8), input_fps=10, target_fps=10, warmup=2)
+
+        assert meta["palettes"] == 2
+        with Image.open(BytesIO(data)) as im:
+            im.seek(im.n_frames - 1)
+            last = np.asarray(im.convert("RGB")).astype(int)
+        assert last[20:, :, 2].mean() > 150  # Blue-shifted scene
+
+    def test_palette_fixup_reduces_error(self):
+        """Test the final centroid step does not make the palette worse"""
+        frames = _frames(12)
+        compressor = CWAMInspiredCompressor()
+        encoder = LiveEncoder(compressor, input_fps=10, target_fps=10, dither="none").start()
+        for f in frames:
+            encoder.submit(f)
+        encoder._queue.put(None)
+        encoder._assembler.join()
+        encoder._open_palette()
+        provisional = np.asarray(encoder._palettes[0]["pal"]).reshape(-1, 3)[:256]
+        mapped = [e["future"].result()[0] for e in encoder._kept]
+        scaled = [
+            np.asarray(compressor._scale_frame(i, Image.fromarray(f), encoder.size))
+            for i, f in enumerate(frames)
+        ]
+        before = np.mean([(provisional[m] - s) ** 2 for m, s in zip(mapped, scaled)])
+
+        data, _ = encoder.finish()
+        with Image.open(BytesIO(data)) as im:
+            refined = np.asarray(im.getpalette()).reshape(-1, 3)
+        after = np.mean([(refined[m] - s) ** 2 for m, s in zip(mapped, scaled)])
+
+        assert after <= before
+
+    def test_submit_before_start_raises(self):
+        """Test frames cannot be submitted to an idle encoder"""
+        encoder = LiveEncoder(CWAMInspiredCompressor())
+
+        with pytest.raises(RuntimeError):
+            encoder.submit(_frames(1)[0])
+
+    def test_worker_error_surfaces_in_finish(self):
+        """Test a failing frame is reported by finish() instead of hanging"""
+        encoder = LiveEncoder(CWAMInspiredCompressor(), target_fps=10, queue_size=2).start()
+        encoder.submit(_frames(1)[0])
+        encoder.submit(np.zeros((48, 64, 5), dtype=np.uint8))  # No PIL mode for 5 channels
+        for f in _frames(6):
+            encoder.submit(f)  # Drained without blocking after the failure
+
+        # The worker's own exception is re-raised (PIL rejects 5-channel arrays)
+        with pytest.raises(TypeError, match="Cannot handle this data type"):
+            encoder.finish()
@@ -0,0 +1,218 @@
+"""
+Unit tests for flashrecord.output_backends module
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+
+from flashrecord import output_backends
+from flashrecord.compression import CWAMInspiredCompressor
+from flashrecord.output_backends import (
+    GifBackend,
+    OutputBackend,
+    available_backends,
+    get_backend,
+    register_backend,
+)
+
+
+def _frames(n=6, size=(64, 48)):
+    rng = np.random.default_rng(4)
+    base = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    frames = []
+    for i in range(n):
+        arr = base.copy()
+        arr[4:12, 4 * i : 4 * i + 8] = (255, 0, 0)
+        frames.append(Image.fromarray(arr))
+    return frames
+
+
+def _decode(data):
+    with Image.open(BytesIO(data)) as im:
+        return im.format, [
+            (np.asarray(f.convert("RGB")), f.info.get("duration"))
+            for f in ImageSequence.Iterator(im)
+        ]
+
+
+class TestBackends:
+    """Tests for the individual output formats"""
+
+    @pytest.mark.parametrize(
+        "name, fmt", [("gif", "GIF"), ("webp", "WEBP"), ("webp-lossless", "WEBP"), ("apng", "PNG")]
+    )
+    def test_roundtrip_frames_and_durations(self, name, fmt):
+        """Test every backend writes a decodable animation with per-frame durations"""
+        backend = get_backend(name)
+        if not backend.available():
+            pytest.skip(f"Pillow built without {name}")
+        frames = _frames()
+        if backend.palette:
+            compressor = CWAMInspiredCompressor()
+            pal = compressor._build_global_palette(frames, colors=64)
+            frames = compressor._apply_global_palette(frames, pal, dither=False)
+        durations = [100, 200, 100, 200, 100, 300]
+
+        got_fmt, decoded = _decode(backend.encode(frames, durations))
+
+        assert got_fmt == fmt
+        assert len(decoded) == len(frames)
+        assert [d for _, d in decoded] == durations
+
+    @pytest.mark.parametrize("name", ["webp-lossless", "apng"])
+    def test_lossless_backends_are_exact(self, name):
+        """Test lossless formats decode to the input pixels"""
+        backend = get_backend(name)
+        if not backend.available():
+            pytest.skip(f"Pillow built without {name}")
+        frames = _frames()
+
+        _, decoded = _decode(backend.encode(frames, [100] * len(frames)))
+
+        for (got, _), want in zip(decoded, frames):
+            assert np.array_equal(got, np.asarray(want))
+
+    def test_lossy_webp_quality_shrinks_file(self):
+        """Test the quality knob trades size for fidelity"""
+        backend = get_backend("webp")
+        if not backend.available():
+            pytest.skip("Pillow built without webp")
+        frames = _frames()
+
+        high = backend.encode(frames, [100] * 6, quality=backend.qualities[0])
+        low = backend.encode(frames, [100] * 6, quality=backend.qualities[-1])
+
+        assert len(low) < len(high)
+
+    def test_gif_backend_rejects_rgb_frames(self):
+        """Test the GIF backend refuses frames that were not quantized"""
+        with pytest.raises(ValueError):
+            get_backend("gif").encode(_frames(), [100] * 6)
+
+    def test_duration_count_must_match(self):
+        """Test a durations list of the wrong length is rejected"""
+        with pytest.raises(ValueError):
+            get_backend("apng").encode(_frames(), [100])
+
+    def test_save_writes_path(self, tmp_path):
+        """Test save() writes the encoded bytes to a path"""
+        path = tmp_path / "out.png"
+
+        written = get_backend("apng").save(_frames(), str(path), [100] * 6)
+
+        assert written == path.stat().st_size
+
+    def test_gif_save_streams_the_encoded_bytes(self, tmp_path):
+        """Test the GIF backend's save() writes exactly what encode() returns"""
+        compressor = CWAMInspiredCompressor()
+        frames = _frames()
+        frames = compressor._apply_global_palette(
+            frames, compressor._build_global_palette(frames, colors=64), dither=False
+        )
+        path = tmp_path / "out.gif"
+
+        written = get_backend("gif").save(frames, str(path), [100] * 6)
+
+        assert path.read_bytes() == get_backend("gif").encode(frames, [100] * 6)
+        assert written == path.stat().st_size
+
+
+class TestRegistry:
+    """Tests for backend lookup and registration"""
+
+    def test_unknown_format_raises(self):
+        """Test lookup of an unregistered format fails loudly"""
+        with pytest.raises(ValueError):
+            get_backend("bmp")
+
+    def test_builtin_backends_listed(self):
+        """Test the built-in formats are registered"""
+        assert {"gif", "apng"} <= set(available_backends())
+
+    def test_register_custom_backend(self, monkeypatch):
+        """Test a registered backend is reachable by name"""
+        monkeypatch.setattr(output_backends, "_BACKENDS", dict(output_backends._BACKENDS))
+
+        class RawBackend(OutputBackend):
+            name = "raw-test"
+
+            def encode(self, frames, durations_ms, loop=0, quality=None):
+                return b"".join(f.tobytes() for f in frames)
+
+        register_backend(RawBackend())
+
+        assert isinstance(get_backend("raw-test"), RawBackend)
+
+
+class TestCompressToTargetFormats:
+    """Tests for target-size compression through output backends"""
+
+    @pytest.mark.parametrize("name", ["webp", "webp-lossless", "apng"])
+    def test_backend_output_and_metadata(self, name):
+        """Test non-GIF formats come back in their container with format metadata"""
+        if name not in available_backends():
+            pytest.skip(f"Pillow built without {name}")
+        compressor = CWAMInspiredCompressor()
+
+        data, meta = compressor.compress_to_target(_frames(12), target_mb=5, format=name)
+
+        assert meta["format"] == name
+        assert meta["size_mb"] == round(len(data) / (1024 * 1024), 4)
+        with Image.open(BytesIO(data)) as im:
+            assert im.n_frames == meta["frames_out"]
+
+    def test_lossy_target_lowers_quality_before_resolution(self):
+        """Test a tight WebP target walks the quality ladder first"""
+        if "webp" not in available_backends():
+            pytest.skip("Pillow built without webp")
+        compressor = CWAMInspiredCompressor()
+        backend = get_backend("webp")
+
+        _, meta = compressor.compress_to_target(
+            _frames(12), target_mb=0.0001, max_iterations=len(backend.qualities), format="webp"
+        )
+
+        assert meta["quality"] == backend.qualities[-1]
+        assert meta["scale_factor"] == 0.5
+
+    def test_gif_metadata_names_format(self):
+        """Test the default GIF path reports its format"""
+        _, meta = CWAMInspiredCompressor().compress_to_target(_frames(12), target_mb=5)
+
+        assert meta["format"] == "gif"
+
+    def test_gif_goes_through_registered_backend(self, monkeypatch):
+        """Test format='gif' encodes with the registered GIF backend and the call's delta"""
+        monkeypatch.setattr(output_backends, "_BACKENDS", dict(output_backends._BACKENDS))
+        seen = []
+
+        class CountingGif(GifBackend):
+            def encode(self, frames, durations_ms, loop=0, quality=None):
+                seen.append(self.delta)
+                return super().encode(frames, durations_ms, loop=loop, quality=quality)
+
+        register_backend(CountingGif())
+
+        data, meta = CWAMInspiredCompressor().compress_to_target(
+            _frames(12), target_mb=5, delta=False
+        )
+
+        assert seen == [False]
+        assert meta["delta"] is False
+        assert data[:6] == b"GIF89a"
+
+    def test_gif_only_options_warn_for_other_formats(self, caplog):
+        """Test delta/scenes are reported as ignored instead of silently dropped"""
+        compressor = CWAMInspiredCompressor()
+
+        with caplog.at_level("WARNING", logger="flashrecord.compression"):
+            compressor.compress_to_target(
+                _frames(12), target_mb=5, format="apng", delta=True, scenes=True
+            )
+
+        messages = [r.getMessage() for r in caplog.records]
+        assert any("delta= applies to GIF only" in m for m in messages)
+        assert any("scenes= applies to GIF only" in m for m in messages)
@@ -0,0 +1,77 @@
+"""
+Unit tests for flashrecord.scheduler module
+"""
+
+import pytest
+
+from flashrecord.scheduler import FrameScheduler
+
+
+class FakeClock:
+    """Manual clock: sleep() and work() advance time"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def work(self, seconds):
+        self.now += seconds
+
+
+def _scheduler(fps=10):
+    clock = FakeClock()
+    return FrameScheduler(fps, clock=clock, sleep=clock.sleep).start(), clock
+
+
+class TestFrameScheduler:
+    """Tests for deadline-based capture pacing"""
+
+    def test_deadlines_do_not_drift(self):
+        """Test slow-but-in-budget grabs keep every tick on its absolute slot"""
+        scheduler, clock = _scheduler(fps=10)
+
+        ticks = []
+        for _ in range(50):
+            ticks.append(scheduler.wait())
+            clock.work(0.07)  # Grab cost below the 100ms interval
+
+        assert ticks[-1] == pytest.approx(4.9)
+        assert scheduler.dropped_slots == 0
+
+    def test_missed_slots_are_skipped_not_bunched(self):
+        """Test a stall drops the slots it covered instead of firing them back to back"""
+        scheduler, clock = _scheduler(fps=10)
+
+        scheduler.wait()
+        clock.work(0.35)  # Misses slots 1-3
+        late = scheduler.wait()
+        following = scheduler.wait()
+
+        assert scheduler.dropped_slots == 2
+        assert late == pytest.approx(0.35)  # Slot 3, served at once
+        assert following == pytest.approx(0.4)  # Back on the grid
+
+    def test_stats_report_rate_jitter_and_drops(self):
+        """Test stats() summarizes achieved fps, lateness percentiles and drops"""
+        scheduler, clock = _scheduler(fps=10)
+
+        for i in range(20):
+            scheduler.wait()
+            clock.work(0.25 if i == 10 else 0.01)
+
+        stats = scheduler.stats()
+        assert stats["frames"] == 20
+        assert stats["dropped_slots"] == 1
+        assert stats["achieved_fps"] == pytest.approx(20 / 2.1, abs=0.01)
+        assert stats["jitter_ms"]["p50"] == 0.0
+        assert stats["jitter_ms"]["max"] == pytest.approx(50.0)
+
+    def test_invalid_fps_raises(self):
+        """Test a non-positive rate is rejected"""
+        with pytest.raises(ValueError):
+            FrameScheduler(0)
@@ -4,11 +4,40 @@ Unit tests for flashrecord.screen_recorder module
 
 import inspect
 
+import numpy as np
 import pytest
+from PIL import Image
 
+from flashrecord.capture_backends import CaptureBackend
+from flashrecord.capture_sources import SyntheticBackend
+from flashrecord.output_backends import GifBackend
 from flashrecord.screen_recorder import ScreenRecorder, record_screen_to_gif
 
 
+def _moving_frames(n, size=(64, 48)):
+    base = np.random.default_rng(1).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(n):
+        arr = base.copy()
+        arr[:8, (i * 4) % 56 : (i * 4) % 56 + 8] = (255, 0, 0)
+        yield arr
+
+
+class _MovingCapture(CaptureBackend):
+    """Capture backend replaying _moving_frames; counts close() calls"""
+
+    name = "moving-test"
+
+    def __init__(self):
+        self.frames = _moving_frames(400)
+        self.closed = 0
+
+    def grab(self):
+        return self._crop(next(self.frames))
+
+    def close(self):
+        self.closed += 1
+
+
 class TestScreenRecorder:
     """Tests for ScreenRecorder class"""
 
@@ -28,6 +57,224 @@ class TestScreenRecorder:
         recorder = ScreenRecorder()
         assert recorder.frames == []
 
+    @staticmethod
+    def _record(recorder, n=8):
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+        for i in range(n):
+            arr = base.copy()
+            arr[:8, i * 4 : i * 4 + 8] = (255, 0, 0)
+            recorder.frames.append(Image.fromarray(arr))
+
+    def test_save_gif_streams_compressed_frames(self, tmp_path):
+        """Test save_gif writes a decodable GIF from captured frames"""
+        recorder = ScreenRecorder(fps=10)
+        self._record(recorder)
+        path = tmp_path / "gifs" / "rec.gif"
+
+        assert recorder.save_gif(str(path))
+        with Image.open(path) as im:
+            assert im.format == "GIF"
+            assert im.n_frames >= 1
+
+    def test_save_gif_uses_recorder_fps(self, tmp_path):
+        """Test the capture fps drives the GIF timing instead of a 10fps default"""
+        recorder = ScreenRecorder(fps=20)
+        self._record(recorder)
+        path = tmp_path / "rec.gif"
+
+        assert recorder.save_gif(str(path))
+        with Image.open(path) as im:
+            total = sum(im.seek(i) or im.info["duration"] for i in range(im.n_frames))
+        assert abs(total - 8 * 1000 / 20) <= 10
+        assert recorder.get_stats()["last_save"]["input_fps"] == 20
+
+    def test_captured_frames_go_to_ring_buffer(self, tmp_path):
+        """Test frames pushed by the capture loop are saved from the ring buffer"""
+        recorder = ScreenRecorder(fps=10, buffer_frames=4)
+        for i in range(6):
+            arr = np.zeros((24, 32, 3), dtype=np.uint8)
+            arr[:, i * 4 : i * 4 + 4] = 255
+            recorder.store.push(arr)
+        path = tmp_path / "ring.gif"
+
+        stats = recorder.get_stats()
+        assert recorder.save_gif(str(path))
+        assert stats["frame_count"] == 4
+        assert stats["buffer_capacity"] == 4
+        assert stats["dropped_frames"] == 2
+        assert recorder.last_save["frames_in"] == 4
+
+    def test_live_recording_encodes_during_capture(self, tmp_path):
+        """Test live mode feeds the encoder from the capture loop and saves its GIF"""
+        recorder = ScreenRecorder(fps=50, live=True, capture_backend=_MovingCapture())
+        path = tmp_path / "live.gif"
+
+        recorder.start_recording(duration=0.3)
+        recorder._capture_thread.join()
+        frames_in = recorder.get_stats()["frame_count"]
+
+        assert frames_in > 0
+        assert len(recorder.store) == 0  # Nothing buffered at full size
+        assert recorder.save_gif(str(path))
+        saved = recorder.last_save
+        assert saved["live"] and saved["frames_in"] == frames_in
+        with Image.open(path) as im:
+            assert im.n_frames == saved["frames_out"]
+
+    def test_capture_records_timestamps_and_pacing_stats(self, tmp_path):
+        """Test captured frames carry timestamps and get_stats() reports pacing"""
+        capture = _MovingCapture()
+        recorder = ScreenRecorder(fps=20, compression="none", capture_backend=capture)
+
+        recorder.start_recording(duration=0.3)
+        recorder._capture_thread.join()
+        stats = recorder.get_stats()
+        times = recorder.store.timestamps()
+
+        assert times is not None and len(times) == stats["frame_count"]
+        assert np.all(np.diff(times) > 0)
+        assert stats["achieved_fps"] > 0
+        assert {"p50", "p95", "p99", "max"} <= set(stats["jitter_ms"])
+        assert stats["dropped_slots"] >= 0
+        assert stats["capture_backend"] == "moving-test"
+        assert capture.closed == 1  # Released when the capture loop ends
+        assert recorder.save_gif(str(tmp_path / "paced.gif"))
+
+    def test_region_records_only_its_pixels(self, tmp_path):
+        """Test a region crops every captured frame and is reported in stats"""
+        recorder = ScreenRecorder(
+            fps=20, compression="none", capture_backend=_MovingCapture(), region="32x24+8+4"
+        )
+
+        assert recorder.start_recording(duration=0.2)
+        recorder._capture_thread.join()
+
+        assert recorder.store.size == (32, 24)
+        assert recorder.get_stats()["region"] == (8, 4, 40, 28)
+        path = tmp_path / "region.gif"
+        assert recorder.save_gif(str(path))
+        with Image.open(path) as im:
+            assert im.size == (32, 24)
+
+    def test_full_buffer_stops_recording_visibly(self, capsys):
+        """Test the default policy ends the recording with a message instead of dropping"""
+        recorder = ScreenRecorder(fps=50, buffer_frames=4, capture_backend=_MovingCapture())
+
+        recorder.start_recording(duration=5)
+        recorder._capture_thread.join(timeout=5)
+
+        assert not recorder.is_recording
+        assert recorder.get_stats()["frame_count"] == 4
+        assert "Capture buffer full after 4 frames" in capsys.readouterr().out
+
+    def test_timed_recording_buffers_its_whole_duration(self):
+        """Test a duration sizes the buffer instead of the default budget"""
+        recorder = ScreenRecorder(fps=20, compression="none", capture_backend=_MovingCapture())
+
+        recorder.start_recording(duration=0.3)
+        recorder._capture_thread.join()
+
+        assert recorder.store.capacity == 6
+        assert recorder.get_stats()["dropped_frames"] == 0
+
+    def test_explicit_budget_too_small_for_duration_warns(self, capsys):
+        """Test a buffer_mb that cannot hold the duration is reported up front"""
+        recorder = ScreenRecorder(
+            fps=50, buffer_mb=64 * 48 * 3 * 3 / 2**20, capture_backend=_MovingCapture()
+        )
+
+        recorder.start_recording(duration=0.5)
+        recorder._capture_thread.join(timeout=5)
+
+        out = capsys.readouterr().out
+        assert "Capture buffer holds 3 frames" in out
+        assert "recording will stop early" in out
+
+    def test_drop_oldest_reports_dropped_frames_on_save(self, tmp_path, capsys):
+        """Test an overflowing drop-oldest recording says what was cut"""
+        recorder = ScreenRecorder(
+            fps=50,
+            compression="none",
+            buffer_frames=4,
+            overflow="drop-oldest",
+            capture_backend=_MovingCapture(),
+        )
+        recorder.start_recording(duration=0.3)
+        recorder._capture_thread.join()
+        dropped = recorder.get_stats()["dropped_frames"]
+
+        assert dropped > 0
+        assert recorder.save_gif(str(tmp_path / "cut.gif"))
+        assert f"{dropped} oldest frames dropped" in capsys.readouterr().out
+
+    def test_second_recording_at_a_new_size(self, tmp_path):
+        """Test one recorder can record again after the capture size changes"""
+        recorder = ScreenRecorder(fps=20, compression="none")
+        for size in ((320, 240), (200, 100)):
+            recorder.capture_backend = SyntheticBackend(size=size)
+            recorder.start_recording(duration=0.2)
+            recorder._capture_thread.join()
+            path = tmp_path / f"{size[0]}.gif"
+
+            assert recorder.get_stats()["frame_count"] > 0
+            assert recorder.save_gif(str(path))
+            with Image.open(path) as im:
+                assert im.size == size
+
+    def test_bad_region_does_not_start(self):
+        """Test an unresolvable region is reported instead of recording"""
+        recorder = ScreenRecorder(capture_backend=_MovingCapture(), region="monitor:99")
+
+        assert not recorder.start_recording(duration=0.2)
+        assert not recorder.is_recording
+
+    def test_bad_backend_does_not_start(self, tmp_path, capsys):
+        """Test an unknown backend leaves the recorder idle and able to start again"""
+        recorder = ScreenRecorder(capture_backend="nope", live=True)
+
+        assert not recorder.start_recording(duration=0.2)
+        assert not recorder.is_recording
+        assert recorder.live is None  # No encoder started (and leaked)
+        assert "Unknown capture backend" in capsys.readouterr().out
+
+        recorder.capture_backend = _MovingCapture()
+        assert recorder.start_recording(duration=0.1)
+        recorder._capture_thread.join()
+        assert recorder.save_gif(str(tmp_path / "retry.gif"))
+
+    def test_compressed_save_streams_to_the_file(self, tmp_path, monkeypatch):
+        """Test the compressed path never builds the whole GIF in memory"""
+
+        def in_memory(*args, **kwargs):
+            raise AssertionError("GIF encoded to bytes")
+
+        monkeypatch.setattr(GifBackend, "encode", in_memory)
+        recorder = ScreenRecorder(fps=10)
+        self._record(recorder)
+        path = tmp_path / "streamed.gif"
+
+        assert recorder.save_gif(str(path))
+        assert recorder.last_save["size_bytes"] == path.stat().st_size
+        with Image.open(path) as im:
+            assert im.n_frames == recorder.last_save["frames_out"]
+
+    @pytest.mark.parametrize("compression", ["balanced", "none"])
+    def test_save_stats_report_size_and_timings(self, tmp_path, compression):
+        """Test get_stats() carries the final size and per-stage timings"""
+        recorder = ScreenRecorder(fps=10, compression=compression)
+        self._record(recorder)
+        path = tmp_path / "rec.gif"
+
+        assert recorder.save_gif(str(path))
+        saved = recorder.get_stats()["last_save"]
+        assert saved["size_bytes"] == path.stat().st_size
+        assert {"quantize", "write", "total"} <= set(saved["timings_ms"])
+        with Image.open(path) as im:
+            assert im.n_frames == saved["frames_out"]
+        if compression == "none":
+            assert saved["frames_out"] == 8
+
 
 class TestRecordFunction:
     """Tests for record_screen_to_gif function"""
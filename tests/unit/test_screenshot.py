@@ -41,3 +41,30 @@ class TestScreenshotHelpers:
         assert hasattr(screenshot, "_capture_macos")
         assert hasattr(screenshot, "_capture_linux")
         assert hasattr(screenshot, "_save_image")
+
+
+class TestScreenshotRegion:
+    """Tests for capturing part of the screen"""
+
+    def test_region_crops_screenshot(self, tmp_path):
+        """Test a region limits the saved screenshot to its box"""
+        from PIL import Image
+
+        from flashrecord.capture_sources import SyntheticBackend
+        from flashrecord.screenshot import take_screenshot
+
+        path = take_screenshot(
+            output_dir=str(tmp_path), backend=SyntheticBackend(size=(64, 48)), region="20x10+4+8"
+        )
+
+        with Image.open(path) as img:
+            assert img.size == (20, 10)
+
+    def test_bad_region_fails(self, tmp_path):
+        """Test an invalid region is reported as a failed screenshot"""
+        from flashrecord.capture_sources import SyntheticBackend
+        from flashrecord.screenshot import take_screenshot
+
+        source = SyntheticBackend(size=(64, 48))
+
+        assert take_screenshot(output_dir=str(tmp_path), backend=source, region="0,0") is None